@@ -0,0 +1,66 @@
+"""
+Compares two results of the load benchmark.
+
+Usage:
+    python -m benchmarks.compare results/baseline.json results/candidate.json
+"""
+import argparse
+import json
+
+from typing import Any, Dict
+
+
+def load(path: str) -> Dict[str, Any]:
+    """
+    Loads the results of a run.
+
+    Args:
+        path (str): The path of the JSON results.
+
+    Returns:
+        Dict[str, Any]: The results.
+    """
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def change(before: float, after: float) -> str:
+    """
+    Formats the relative change between two values.
+
+    Args:
+        before (float): The baseline value.
+        after (float): The candidate value.
+
+    Returns:
+        str: The change in percent, or "n/a" if the baseline is zero.
+    """
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main() -> None:
+    """
+    Prints the throughput and the latency percentiles of both runs side by side.
+    """
+    parser = argparse.ArgumentParser(description="Compares two results of the load benchmark.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+
+    before, after = baseline["throughput_updates_per_s"], candidate["throughput_updates_per_s"]
+    print(f"{'throughput (updates/s)':<32}{before:>12}{after:>12}{change(before, after):>10}")
+
+    for name, flow in baseline["flows"].items():
+        other = candidate["flows"].get(name)
+        if other is None:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            print(f"{name + ' ' + key:<32}{flow[key]:>12}{other[key]:>12}{change(flow[key], other[key]):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import asyncio
+import time
+
+from collections import Counter
+from itertools import count
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import GetUpdates, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Message, Update, User
+
+
+class FakeTelegramSession(BaseSession):
+    """
+    This class is a Bot API session answering every request locally instead of calling Telegram.
+
+    Methods returning a message get a message built from the request, so the dialogs keep working, and
+    the last message carrying an inline keyboard is remembered per chat, so simulated users can press its buttons.
+    Updates put in `pending_updates` are returned by the next `getUpdates` request, for runs using polling.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Initializes a new instance of the `FakeTelegramSession` class.
+
+        Args:
+            latency (float): The number of seconds every request takes. Defaults to 0.0.
+        """
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.keyboards: Dict[int, Message] = {}
+        self.pending_updates: List[Update] = []
+        self._message_ids = count(1)
+
+    async def close(self) -> None:
+        """
+        Closes the session, there is nothing to release.
+        """
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        """
+        Streams no content, files are never downloaded in the benchmark.
+        """
+        yield b""
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[TelegramType],
+                           timeout: Optional[int] = None) -> TelegramType:
+        """
+        Answers a Bot API request.
+
+        Args:
+            bot (Bot): The bot sending the request.
+            method (TelegramMethod[TelegramType]): The request.
+            timeout (Optional[int]): The timeout of the request, ignored. Defaults to None.
+
+        Returns:
+            TelegramType: The response Telegram would give.
+        """
+        self.calls[type(method).__name__] += 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        returning = str(method.__returning__)
+
+        if isinstance(method, GetUpdates):
+            updates, self.pending_updates = self.pending_updates, []
+            if not updates:
+                await asyncio.sleep(0.05)
+            return updates
+
+        if method.__returning__ is User:
+            return User(id=bot.id, is_bot=True, first_name="Benchmark")
+
+        if "Message" not in returning or "MessageId" in returning:
+            if type(method).__name__ == "DeleteMessage":
+                message = self.keyboards.get(method.chat_id)
+                if message and message.message_id == method.message_id:
+                    del self.keyboards[method.chat_id]
+            return True
+
+        return self._build_message(bot, method)
+
+    def _build_message(self, bot: Bot, method: TelegramMethod[Any]) -> Message:
+        """
+        Builds the message sent or edited by a request.
+
+        Args:
+            bot (Bot): The bot sending the request.
+            method (TelegramMethod[Any]): The request.
+
+        Returns:
+            Message: The message.
+        """
+        chat_id = method.chat_id
+        message_id = getattr(method, "message_id", None) or next(self._message_ids)
+        previous = self.keyboards.get(chat_id)
+
+        photo = getattr(method, "photo", None) or getattr(getattr(method, "media", None), "media", None)
+        if photo is None and previous is not None and previous.message_id == message_id and previous.photo:
+            photo = previous.photo[-1].file_id
+
+        data: Dict[str, Any] = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": bot.id, "is_bot": True, "first_name": "Benchmark"},
+            "text": getattr(method, "text", None),
+            "caption": getattr(method, "caption", None),
+        }
+
+        if photo is not None:
+            data["photo"] = [{"file_id": f"photo-{message_id}", "file_unique_id": f"photo-{message_id}",
+                              "width": 500, "height": 750}]
+
+        reply_markup = getattr(method, "reply_markup", None)
+        if reply_markup is not None and hasattr(reply_markup, "inline_keyboard"):
+            data["reply_markup"] = reply_markup.model_dump(exclude_none=True)
+
+        message = Message.model_validate(data, context={"bot": bot})
+
+        if message.reply_markup is not None:
+            self.keyboards[chat_id] = message
+        elif previous is not None and previous.message_id == message_id:
+            del self.keyboards[chat_id]
+
+        return message
+
+
+class UpdateFactory:
+    """
+    This class builds the updates a private chat user would send.
+    """
+
+    def __init__(self, bot: Bot):
+        """
+        Initializes a new instance of the `UpdateFactory` class.
+
+        Args:
+            bot (Bot): The bot receiving the updates.
+        """
+        self.bot = bot
+        self._update_ids = count(1)
+        self._message_ids = count(1_000_000_000)
+
+    def _user(self, user_id: int, language_code: str) -> Dict[str, Any]:
+        """
+        Builds the sender of the updates.
+
+        Args:
+            user_id (int): The ID of the user.
+            language_code (str): The language of the user.
+
+        Returns:
+            Dict[str, Any]: The user in the Bot API format.
+        """
+        return {"id": user_id, "is_bot": False, "first_name": "User", "last_name": str(user_id),
+                "language_code": language_code}
+
+    def message(self, user_id: int, text: str, language_code: str = "en") -> Update:
+        """
+        Builds an update with a text message.
+
+        Args:
+            user_id (int): The ID of the user, also the ID of the private chat.
+            text (str): The text of the message.
+            language_code (str): The language of the user. Defaults to "en".
+
+        Returns:
+            Update: The update.
+        """
+        data: Dict[str, Any] = {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": self._user(user_id, language_code),
+                "text": text,
+            },
+        }
+
+        if text.startswith("/"):
+            data["message"]["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+
+        return Update.model_validate(data, context={"bot": self.bot})
+
+    def callback(self, user_id: int, message: Message, callback_data: str, language_code: str = "en") -> Update:
+        """
+        Builds an update with a press of an inline button.
+
+        Args:
+            user_id (int): The ID of the user.
+            message (Message): The message carrying the button.
+            callback_data (str): The callback data of the button.
+            language_code (str): The language of the user. Defaults to "en".
+
+        Returns:
+            Update: The update.
+        """
+        data = {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self._user(user_id, language_code),
+                "chat_instance": str(user_id),
+                "message": message.model_dump(by_alias=True, exclude_none=True, mode="json"),
+                "data": callback_data,
+            },
+        }
+
+        return Update.model_validate(data, context={"bot": self.bot})
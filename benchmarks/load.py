@@ -0,0 +1,544 @@
+"""
+Synthetic load benchmark of the bot.
+
+The benchmark builds the real dispatcher, routers and middlewares of `run.py` and drives simulated users
+through scripted flows. The Bot API is replaced by `FakeTelegramSession`, TMDB by the stand-in server of
+`tmdb_stub`, the database by a temporary SQLite file and Redis by a local server or an in-memory fake
+(`pip install "fakeredis[lua]"`).
+
+TMDB responses can be recorded once with `--tmdb-mode record` and replayed offline with `--tmdb-mode replay`,
+optionally with injected latencies, 429 responses and timeouts, to see how the list and the details windows
+(`get_movies_list` and `get_movie_details`, the `page_list` and `open_details` flows) behave when TMDB is slow.
+
+The fake Redis can be given a round trip latency with `--redis-latency`, to compare the event isolations
+of `--isolation`: the Redis locks cost round trips on every update, the local locks none.
+
+Usage:
+    python -m benchmarks.load --users 2000 --concurrency 200 --output results/baseline.json
+    python -m benchmarks.load --tmdb-mode record
+    python -m benchmarks.load --redis-latency 1 --isolation redis --output results/redis-isolation.json
+    python -m benchmarks.load --tmdb-mode replay --tmdb-replay-latency lognormal:80:0.6 --tmdb-429-rate 0.02
+    python -m benchmarks.compare results/baseline.json results/candidate.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+    Returns:
+        argparse.Namespace: The arguments.
+    """
+    parser = argparse.ArgumentParser(description="Drives simulated users through the bot and reports latencies.")
+    parser.add_argument("--users", type=int, default=1000, help="number of simulated users")
+    parser.add_argument("--concurrency", type=int, default=100, help="number of users active at once")
+    parser.add_argument("--movies-per-user", type=int, default=3, help="number of movies every user adds")
+    parser.add_argument("--redis", choices=("fake", "local"), default="fake",
+                        help="in-memory fake Redis or the server configured by REDIS_HOST and REDIS_PORT")
+    parser.add_argument("--redis-latency", type=float, default=0.0,
+                        help="round trip latency of the fake Redis in milliseconds")
+    parser.add_argument("--isolation", choices=("local", "redis", "none"), default="local",
+                        help="event isolation of the updates of a chat, see EVENT_ISOLATION")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="Bot API latency in milliseconds")
+    parser.add_argument("--tmdb-latency", type=float, default=0.0, help="latency of the TMDB stand-in in milliseconds")
+    parser.add_argument("--tmdb-mode", choices=("stub", "record", "replay"), default="stub",
+                        help="call the TMDB stand-in, record its responses to the cassette or replay the cassette")
+    parser.add_argument("--tmdb-cassette", default="benchmarks/cassettes/tmdb", help="directory of the TMDB cassette")
+    parser.add_argument("--tmdb-replay-latency", default="fixed:0",
+                        help="latency distribution of replayed responses, e.g. lognormal:80:0.6")
+    parser.add_argument("--tmdb-429-rate", type=float, default=0.0, help="share of replayed requests answered with 429")
+    parser.add_argument("--tmdb-timeout-rate", type=float, default=0.0, help="share of replayed requests timing out")
+    parser.add_argument("--tmdb-rate-limit", type=float, default=10_000.0,
+                        help="TMDB requests per second allowed by the shared rate limiter")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the simulated users")
+    parser.add_argument("--log-level", default="WARNING", help="level of the bot logs during the run")
+    parser.add_argument("--output", help="path of the JSON results, defaults to benchmarks/results/<time>.json")
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace, database_path: str) -> None:
+    """
+    Overrides the settings of the bot before its modules are imported.
+
+    Args:
+        args (argparse.Namespace): The arguments.
+        database_path (str): The path of the temporary SQLite database.
+    """
+    os.environ["TOKEN"] = "123456789:benchmark"
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{database_path}"
+    os.environ["TMDB_RATE_LIMIT"] = str(args.tmdb_rate_limit)
+    os.environ["TMDB_RATE_BURST"] = str(int(args.tmdb_rate_limit))
+    os.environ["METRICS_PORT"] = "0"
+    os.environ["TRACING_ENABLED"] = "false"
+    os.environ["EVENT_ISOLATION"] = args.isolation
+
+    if args.tmdb_mode != "stub":
+        os.environ["TMDB_CASSETTE_MODE"] = args.tmdb_mode
+        os.environ["TMDB_CASSETTE_DIR"] = args.tmdb_cassette
+        os.environ["TMDB_REPLAY_LATENCY"] = args.tmdb_replay_latency
+        os.environ["TMDB_REPLAY_429_RATE"] = str(args.tmdb_429_rate)
+        os.environ["TMDB_REPLAY_TIMEOUT_RATE"] = str(args.tmdb_timeout_rate)
+
+
+def percentile(values: List[float], share: float) -> float:
+    """
+    Computes a percentile with the nearest-rank method.
+
+    Args:
+        values (List[float]): The sorted values.
+        share (float): The percentile as a share, between 0 and 1.
+
+    Returns:
+        float: The percentile, or 0.0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    rank = max(1, round(share * len(values) + 0.5))
+    return values[min(rank, len(values)) - 1]
+
+
+Flow = Callable[["SimulatedUser"], Awaitable[None]]
+
+
+class FlowError(Exception):
+    """
+    Raised when a simulated user cannot continue its flow.
+    """
+
+
+class SimulatedUser:
+    """
+    This class is a user of a private chat sending messages and pressing the buttons of the dialog message.
+    """
+
+    def __init__(self, harness: "Harness", user_id: int, rng: random.Random):
+        """
+        Initializes a new instance of the `SimulatedUser` class.
+
+        Args:
+            harness (Harness): The harness feeding the updates.
+            user_id (int): The Telegram ID of the user.
+            rng (random.Random): The random generator of the user.
+        """
+        self.harness = harness
+        self.user_id = user_id
+        self.rng = rng
+
+    async def send(self, text: str) -> None:
+        """
+        Sends a text message.
+
+        Args:
+            text (str): The text of the message.
+        """
+        await self.harness.feed(self.harness.updates.message(self.user_id, text))
+
+    def buttons(self, widget_id: str) -> List[str]:
+        """
+        Returns the callback data of the buttons of a widget on the dialog message.
+
+        Args:
+            widget_id (str): The ID of the widget.
+
+        Returns:
+            List[str]: The callback data of the matching buttons.
+        """
+        message = self.harness.session.keyboards.get(self.user_id)
+        if message is None:
+            return []
+
+        matching = []
+        for row in message.reply_markup.inline_keyboard:
+            for button in row:
+                data = (button.callback_data or "").split("\x1d", 1)[-1]
+                if data == widget_id or data.startswith(widget_id + ":"):
+                    matching.append(button.callback_data)
+        return matching
+
+    async def click(self, widget_id: str) -> None:
+        """
+        Presses a random button of a widget on the dialog message.
+
+        Args:
+            widget_id (str): The ID of the widget.
+
+        Raises:
+            FlowError: If the dialog message has no such button.
+        """
+        buttons = self.buttons(widget_id)
+        if not buttons:
+            raise FlowError(f"no {widget_id!r} button for user {self.user_id}")
+
+        message = self.harness.session.keyboards[self.user_id]
+        await self.harness.feed(self.harness.updates.callback(self.user_id, message, self.rng.choice(buttons)))
+
+    async def mash(self, widget_id: str, times: int) -> None:
+        """
+        Presses a button of a widget several times without waiting for the bot, as an impatient user does.
+
+        Args:
+            widget_id (str): The ID of the widget.
+            times (int): The number of clicks.
+
+        Raises:
+            FlowError: If the dialog message has no such button.
+        """
+        buttons = self.buttons(widget_id)
+        if not buttons:
+            raise FlowError(f"no {widget_id!r} button for user {self.user_id}")
+
+        message = self.harness.session.keyboards[self.user_id]
+        await asyncio.gather(*(self.harness.feed(self.harness.updates.callback(self.user_id, message, buttons[0]))
+                               for _ in range(times)))
+
+
+async def flow_start(user: SimulatedUser) -> None:
+    """
+    Sends /start, chooses English and opens the list of movies.
+    """
+    await user.send("/start")
+    await user.click("en")
+    await user.click("start_workflow")
+
+
+async def flow_add_movie(user: SimulatedUser) -> None:
+    """
+    Searches a movie, opens a result, adds it to the list and goes back to the list.
+    """
+    await user.send(f"movie {user.rng.randint(1, 500)}")
+    await user.click("s_movies_to_add")
+    await user.click("add_found_movie")
+    await user.click("go_back")
+
+
+async def flow_page_list(user: SimulatedUser) -> None:
+    """
+    Pages through the list of movies and changes the sorting.
+    """
+    for _ in range(3):
+        await user.click("arrow_right")
+    await user.click("sorting_type")
+
+
+async def flow_mash_arrows(user: SimulatedUser) -> None:
+    """
+    Clicks the right arrow of the list five times in a burst.
+    """
+    await user.mash("arrow_right", 5)
+
+
+async def flow_filter_list(user: SimulatedUser) -> None:
+    """
+    Filters the list of movies by a genre and shows all movies again.
+    """
+    await user.click("filter_genres")
+    await user.click("genre")
+    await user.click("movies_with_genres")
+    await user.click("reset_filter")
+
+
+async def flow_open_details(user: SimulatedUser) -> None:
+    """
+    Opens the details of a movie of the list and goes back.
+    """
+    await user.click("s_movies")
+    await user.click("go_back")
+
+
+async def flow_mark_watched(user: SimulatedUser) -> None:
+    """
+    Opens a movie of the list, toggles its watched state, declines to review it and goes back.
+    """
+    await user.click("s_movies")
+    await user.click("is_watched")
+    if user.buttons("no"):
+        await user.click("no")
+    await user.click("go_back")
+
+
+async def flow_random(user: SimulatedUser) -> None:
+    """
+    Asks for a random unwatched movie and goes back to the list.
+    """
+    await user.send("/random")
+    await user.click("go_back")
+
+
+async def flow_movies_on_genre(user: SimulatedUser) -> None:
+    """
+    Picks a genre, lists its movies and goes back to the genres.
+    """
+    await user.send("/movies_on_genre")
+    await user.click("genre")
+    await user.click("movies_with_genres")
+    await user.click("go_back_genres")
+
+
+async def flow_stats(user: SimulatedUser) -> None:
+    """
+    Shows the statistics of the list and goes back to the list.
+    """
+    await user.send("/stats")
+    await user.click("go_back")
+
+
+async def flow_trending(user: SimulatedUser) -> None:
+    """
+    Shows the movies trending today and this week and goes back to the list.
+    """
+    await user.send("/trending")
+    await user.click("trending_window")
+    await user.click("go_back")
+
+
+def user_script(movies_per_user: int) -> List[Tuple[str, Flow]]:
+    """
+    Returns the flows every simulated user goes through, in order.
+
+    Args:
+        movies_per_user (int): The number of movies every user adds.
+
+    Returns:
+        List[Tuple[str, Flow]]: The names and the functions of the flows.
+    """
+    return [("start", flow_start)] + [("add_movie", flow_add_movie)] * movies_per_user + [
+        ("page_list", flow_page_list),
+        ("mash_arrows", flow_mash_arrows),
+        ("filter_list", flow_filter_list),
+        ("open_details", flow_open_details),
+        ("mark_watched", flow_mark_watched),
+        ("random", flow_random),
+        ("movies_on_genre", flow_movies_on_genre),
+        ("stats", flow_stats),
+        ("trending", flow_trending),
+    ]
+
+
+class Harness:
+    """
+    This class feeds the updates of the simulated users to the dispatcher and records the flow latencies.
+    """
+
+    def __init__(self, dp: Any, bot: Any, session: Any, updates: Any):
+        """
+        Initializes a new instance of the `Harness` class.
+
+        Args:
+            dp (Dispatcher): The dispatcher of the bot.
+            bot (Bot): The bot.
+            session (FakeTelegramSession): The Bot API session of the bot.
+            updates (UpdateFactory): The builder of the updates.
+        """
+        self.dp = dp
+        self.bot = bot
+        self.session = session
+        self.updates = updates
+        self.updates_fed = 0
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def feed(self, update: Any) -> None:
+        """
+        Feeds an update to the dispatcher.
+
+        Args:
+            update (Update): The update.
+        """
+        self.updates_fed += 1
+        await self.dp.feed_update(self.bot, update)
+
+    async def run_user(self, user: SimulatedUser, script: List[Tuple[str, Flow]]) -> None:
+        """
+        Runs the flows of a user in order, stopping at the first failed one.
+
+        Args:
+            user (SimulatedUser): The user.
+            script (List[Tuple[str, Flow]]): The names and the functions of the flows.
+        """
+        for name, flow in script:
+            start = time.perf_counter()
+            try:
+                await flow(user)
+            except Exception as e:
+                self.errors[name][type(e).__name__] += 1
+                return
+            self.latencies[name].append((time.perf_counter() - start) * 1000)
+
+
+def summarize(latencies: List[float], errors: Dict[str, int], duration: float) -> Dict[str, Any]:
+    """
+    Summarizes the latencies of a flow.
+
+    Args:
+        latencies (List[float]): The latencies of the successful runs in milliseconds.
+        errors (Dict[str, int]): The number of failed runs by exception type.
+        duration (float): The duration of the benchmark in seconds.
+
+    Returns:
+        Dict[str, Any]: The number of runs, the throughput and the latency percentiles.
+    """
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "errors": dict(errors),
+        "throughput_per_s": round(len(values) / duration, 2),
+        "mean_ms": round(sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50), 3),
+        "p95_ms": round(percentile(values, 0.95), 3),
+        "p99_ms": round(percentile(values, 0.99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+
+
+def git_revision() -> Optional[str]:
+    """
+    Returns the current git commit, used to tell the runs apart.
+
+    Returns:
+        Optional[str]: The commit hash, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def create_redis(kind: str, latency: float = 0.0) -> Any:
+    """
+    Creates the Redis connection of the benchmark.
+
+    Args:
+        kind (str): "fake" for an in-memory fake, "local" for the configured server.
+        latency (float): The number of seconds every round trip to the fake takes, a pipeline being a single one.
+
+    Returns:
+        Redis[Any]: The Redis connection.
+    """
+    if kind == "fake":
+        from fakeredis import FakeAsyncRedis
+        from fakeredis.aioredis import FakeAsyncRedisConnection
+
+        class LatentConnection(FakeAsyncRedisConnection):
+            async def send_packed_command(self, *args: Any, **kwargs: Any) -> None:
+                await asyncio.sleep(latency)
+                await super().send_packed_command(*args, **kwargs)
+
+        return FakeAsyncRedis(connection_class=LatentConnection if latency else FakeAsyncRedisConnection)
+
+    from run import create_redis as create_bot_redis
+
+    redis = create_bot_redis()
+    await redis.flushdb()
+    return redis
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Runs the benchmark.
+
+    Args:
+        args (argparse.Namespace): The arguments.
+
+    Returns:
+        Dict[str, Any]: The results.
+    """
+    from benchmarks.fake_telegram import FakeTelegramSession, UpdateFactory
+    from benchmarks.tmdb_stub import start_tmdb_stub
+    from database.engine import create_db, engine
+    from run import create_bot, create_dispatcher, create_tmdb_client, setup_instrumentation
+    from settings import settings
+    from utils.logger import configure_logging
+
+    configure_logging(level=args.log_level, levels=settings.LOG_LEVELS, json_output=True,
+                      sample_burst=settings.LOG_SAMPLE_BURST, sample_interval=settings.LOG_SAMPLE_INTERVAL,
+                      stream=sys.stderr)
+
+    setup_instrumentation()
+
+    tmdb_runner, base_url = None, None
+    if args.tmdb_mode != "replay":
+        tmdb_runner = await start_tmdb_stub(latency=args.tmdb_latency / 1000)
+        host, port = tmdb_runner.addresses[0][:2]
+        base_url = f"http://{host}:{port}/3"
+
+    redis = await create_redis(args.redis, latency=args.redis_latency / 1000)
+    await create_db()
+
+    tmdb_client = create_tmdb_client(redis, base_url=base_url)
+    session = FakeTelegramSession(latency=args.telegram_latency / 1000)
+    bot = create_bot(session=session, token=os.environ["TOKEN"])
+    dp = create_dispatcher(redis, tmdb_client)
+
+    harness = Harness(dp, bot, session, UpdateFactory(bot))
+    script = user_script(args.movies_per_user)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_user(user_id: int) -> None:
+        async with semaphore:
+            await harness.run_user(SimulatedUser(harness, user_id, random.Random(args.seed + user_id)), script)
+
+    await dp.emit_startup(bot=bot, bots=[bot], dispatcher=dp, **dp.workflow_data)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_user(100_000 + index) for index in range(args.users)))
+    finally:
+        duration = time.perf_counter() - start
+        await dp.emit_shutdown(bot=bot, bots=[bot], dispatcher=dp, **dp.workflow_data)
+        if tmdb_runner:
+            await tmdb_runner.cleanup()
+        await redis.aclose()
+        await engine.dispose()
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "duration_s": round(duration, 3),
+        "updates": harness.updates_fed,
+        "throughput_updates_per_s": round(harness.updates_fed / duration, 2),
+        "flows": {name: summarize(harness.latencies[name], harness.errors[name], duration)
+                  for name, _ in dict.fromkeys(script)},
+        "bot_api_calls": dict(session.calls),
+        "tmdb_single_flight": tmdb_client.single_flight.stats(),
+    }
+
+
+def main() -> None:
+    """
+    Runs the benchmark and writes the results as JSON.
+    """
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure_environment(args, os.path.join(directory, "benchmark.sqlite3"))
+        results = asyncio.run(benchmark(args))
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+
+    print(json.dumps({"throughput_updates_per_s": results["throughput_updates_per_s"],
+                      "flows": {name: {key: flow[key] for key in ("count", "p50_ms", "p95_ms", "p99_ms")}
+                                for name, flow in results["flows"].items()}}, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Startup benchmark of the bot.
+
+Every run starts a fresh process that goes through the startup path of `run.py` against a fake Bot API session
+answering with a configurable latency, a SQLite database and fakeredis or a local Redis, and then handles a single
+/start update from polling. The time from spawning the process to the end of that update is the time to first
+update. The first run starts on an empty database, so it includes the schema creation, the following runs reuse
+the database like a restart during a deploy.
+
+Usage:
+    python -m benchmarks.startup --runs 10 --output results/startup.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+    Returns:
+        argparse.Namespace: The arguments.
+    """
+    parser = argparse.ArgumentParser(description="Measures the time from process start to the first handled update.")
+    parser.add_argument("--runs", type=int, default=10, help="number of restarts measured after the first boot")
+    parser.add_argument("--redis", choices=("fake", "local"), default="fake",
+                        help="in-memory fake Redis or the server configured by REDIS_HOST and REDIS_PORT")
+    parser.add_argument("--telegram-latency", type=float, default=50.0, help="Bot API latency in milliseconds")
+    parser.add_argument("--output", help="path of the JSON results, defaults to benchmarks/results/startup-<time>.json")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+async def run_child(args: argparse.Namespace) -> Dict[str, float]:
+    """
+    Starts the bot in the current process and handles a single update.
+
+    Args:
+        args (argparse.Namespace): The arguments.
+
+    Returns:
+        Dict[str, float]: The wall clock times of the milestones of the startup.
+    """
+    from benchmarks.fake_telegram import FakeTelegramSession, UpdateFactory
+    import run
+
+    imported_at = time.time()
+
+    run.setup_instrumentation()
+    session = FakeTelegramSession(latency=args.telegram_latency / 1000)
+    bot = run.create_bot(session=session, token=os.environ["TOKEN"])
+
+    if args.redis == "fake":
+        from fakeredis import FakeAsyncRedis
+
+        redis = FakeAsyncRedis()
+    else:
+        redis = run.create_redis()
+
+    dp, _ = await run.startup(bot, redis)
+    ready_at = time.time()
+
+    handled = asyncio.Event()
+
+    async def notify(handler, event, data):
+        try:
+            return await handler(event, data)
+        finally:
+            handled.set()
+
+    dp.update.outer_middleware(notify)
+    session.pending_updates.append(UpdateFactory(bot).message(1, "/start"))
+
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
+    await handled.wait()
+    first_update_at = time.time()
+
+    await dp.stop_polling()
+    await polling
+
+    return {"imported_at": imported_at, "ready_at": ready_at, "first_update_at": first_update_at}
+
+
+def measure(args: argparse.Namespace, database: str) -> Dict[str, float]:
+    """
+    Spawns a bot process and measures its startup.
+
+    Args:
+        args (argparse.Namespace): The arguments.
+        database (str): The path of the SQLite database.
+
+    Returns:
+        Dict[str, float]: The durations of the startup phases in seconds.
+    """
+    env = dict(os.environ,
+               TOKEN="123456789:benchmark",
+               DATABASE_URL=f"sqlite+aiosqlite:///{database}",
+               METRICS_PORT="0",
+               TRACING_ENABLED="false",
+               LOG_LEVEL="WARNING")
+    command = [sys.executable, "-m", "benchmarks.startup", "--child", "--redis", args.redis,
+               "--telegram-latency", str(args.telegram_latency)]
+
+    spawned_at = time.time()
+    result = subprocess.run(command, env=env, capture_output=True, text=True, check=True)
+    milestones = json.loads(result.stdout.strip().splitlines()[-1])
+
+    return {
+        "imports_s": milestones["imported_at"] - spawned_at,
+        "startup_s": milestones["ready_at"] - milestones["imported_at"],
+        "first_update_s": milestones["first_update_at"] - milestones["ready_at"],
+        "time_to_first_update_s": milestones["first_update_at"] - spawned_at,
+    }
+
+
+def summarize(runs: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """
+    Summarizes the durations of several runs.
+
+    Args:
+        runs (List[Dict[str, float]]): The durations of the runs.
+
+    Returns:
+        Dict[str, Dict[str, float]]: The minimum, the median and the maximum of every phase.
+    """
+    return {
+        phase: {
+            "min": round(min(run[phase] for run in runs), 4),
+            "median": round(statistics.median(run[phase] for run in runs), 4),
+            "max": round(max(run[phase] for run in runs), 4),
+        }
+        for phase in runs[0]
+    }
+
+
+def main() -> None:
+    """
+    Runs the benchmark, or a single measured bot process with `--child`, and writes the results as JSON.
+    """
+    args = parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_child(args))))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, "benchmark.sqlite3")
+        first_boot = measure(args, database)
+        restarts = [measure(args, database) for _ in range(args.runs)]
+
+    results: Dict[str, Any] = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "child")},
+        "first_boot": {phase: round(value, 4) for phase, value in first_boot.items()},
+        "restarts": summarize(restarts) if restarts else {},
+    }
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"startup-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import asyncio
+import random
+
+from typing import Any, Dict, List
+
+from aiohttp import web
+
+
+GENRES = [
+    (28, "Action"), (12, "Adventure"), (16, "Animation"), (35, "Comedy"), (80, "Crime"),
+    (99, "Documentary"), (18, "Drama"), (10751, "Family"), (14, "Fantasy"), (36, "History"),
+    (27, "Horror"), (10402, "Music"), (9648, "Mystery"), (10749, "Romance"), (878, "Science Fiction"),
+    (10770, "TV Movie"), (53, "Thriller"), (10752, "War"), (37, "Western"),
+]
+
+CATALOG_SIZE = 10_000
+PAGE_SIZE = 20
+
+
+def movie_summary(movie_id: int) -> Dict[str, Any]:
+    """
+    Builds the deterministic search result of a movie of the stand-in catalog.
+
+    Args:
+        movie_id (int): The ID of the movie.
+
+    Returns:
+        Dict[str, Any]: The movie as listed by the search and discover endpoints.
+    """
+    rng = random.Random(movie_id)
+
+    return {
+        "id": movie_id,
+        "title": f"Movie {movie_id}",
+        "original_title": f"Movie {movie_id}",
+        "original_language": "en",
+        "release_date": f"{rng.randint(1950, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "vote_average": round(rng.uniform(1, 10), 1),
+        "poster_path": f"/poster-{movie_id}.jpg",
+        "genre_ids": [genre_id for genre_id, _ in rng.sample(GENRES, 2)],
+    }
+
+
+def movie_details(movie_id: int) -> Dict[str, Any]:
+    """
+    Builds the deterministic details of a movie of the stand-in catalog.
+
+    Args:
+        movie_id (int): The ID of the movie.
+
+    Returns:
+        Dict[str, Any]: The movie as returned by the movie details endpoint.
+    """
+    movie = movie_summary(movie_id)
+    rng = random.Random(movie_id)
+
+    movie.update({
+        "adult": False,
+        "genres": [{"id": genre_id, "name": name} for genre_id, name in GENRES if genre_id in movie["genre_ids"]],
+        "production_countries": [{"iso_3166_1": "US", "name": "United States of America"}],
+        "runtime": rng.randint(80, 180),
+        "tagline": f"The tagline of movie {movie_id}.",
+        "overview": f"The overview of movie {movie_id}. " * 5,
+    })
+
+    return movie
+
+
+def page_of(movie_ids: List[int], page: int) -> Dict[str, Any]:
+    """
+    Builds a page of movies in the TMDB list format.
+
+    Args:
+        movie_ids (List[int]): The IDs of the movies on the page.
+        page (int): The number of the page.
+
+    Returns:
+        Dict[str, Any]: The page.
+    """
+    return {
+        "page": page,
+        "results": [movie_summary(movie_id) for movie_id in movie_ids],
+        "total_pages": 500,
+        "total_results": 500 * PAGE_SIZE,
+    }
+
+
+def create_app(latency: float = 0.0) -> web.Application:
+    """
+    Creates a stand-in for the TMDB endpoints used by the bot, serving a deterministic catalog.
+
+    Args:
+        latency (float): The number of seconds every response is delayed. Defaults to 0.0.
+
+    Returns:
+        web.Application: The application.
+    """
+    routes = web.RouteTableDef()
+
+    @web.middleware
+    async def delay(request: web.Request, handler):
+        if latency:
+            await asyncio.sleep(latency)
+        return await handler(request)
+
+    @routes.get("/3/movie/changes")
+    async def changes(request: web.Request) -> web.Response:
+        return web.json_response({"results": [], "page": 1, "total_pages": 1, "total_results": 0})
+
+    @routes.get("/3/movie/{movie_id:\\d+}")
+    async def details(request: web.Request) -> web.Response:
+        movie_id = int(request.match_info["movie_id"])
+        if not 0 < movie_id <= CATALOG_SIZE:
+            return web.json_response({"status_code": 34, "status_message": "Not found"}, status=404)
+        return web.json_response(movie_details(movie_id))
+
+    @routes.get("/3/search/movie")
+    async def search(request: web.Request) -> web.Response:
+        rng = random.Random(request.query.get("query", ""))
+        page = int(request.query.get("page", 1))
+        return web.json_response(page_of(rng.sample(range(1, CATALOG_SIZE + 1), PAGE_SIZE), page))
+
+    @routes.get("/3/discover/movie")
+    async def discover(request: web.Request) -> web.Response:
+        rng = random.Random(request.query.get("with_genres", ""))
+        page = int(request.query.get("page", 1))
+        first = rng.randint(1, CATALOG_SIZE // 2) + (page - 1) * PAGE_SIZE
+        return web.json_response(page_of(list(range(first, first + PAGE_SIZE)), page))
+
+    @routes.get("/3/genre/movie/list")
+    async def genres(request: web.Request) -> web.Response:
+        return web.json_response({"genres": [{"id": genre_id, "name": name} for genre_id, name in GENRES]})
+
+    app = web.Application(middlewares=[delay])
+    app.add_routes(routes)
+
+    return app
+
+
+async def start_tmdb_stub(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0) -> web.AppRunner:
+    """
+    Starts the TMDB stand-in server.
+
+    Args:
+        host (str): The host to listen on. Defaults to "127.0.0.1".
+        port (int): The port to listen on, 0 picks a free one. Defaults to 0.
+        latency (float): The number of seconds every response is delayed. Defaults to 0.0.
+
+    Returns:
+        web.AppRunner: The runner of the server, its `addresses` hold the chosen port.
+    """
+    runner = web.AppRunner(create_app(latency), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    return runner
@@ -15,6 +15,10 @@ async def set_bot_commands(bot: Bot, i18n: I18nContext) -> None:
         BotCommand(command="language", description=i18n.get("command-language")),
         BotCommand(command="random", description=i18n.get("command-random")),
         BotCommand(command="movies_on_genre", description=i18n.get("command-movies-on-genre")),
+        BotCommand(command="find", description=i18n.get("command-find")),
+        BotCommand(command="recommend", description=i18n.get("command-recommend")),
+        BotCommand(command="stats", description=i18n.get("command-stats")),
+        BotCommand(command="trending", description=i18n.get("command-trending")),
     ]
 
     await bot.set_my_commands(commands)
\ No newline at end of file
@@ -1,24 +1,104 @@
+from typing import Dict, List, Optional
+
+from sqlalchemy import Connection, delete, inspect, insert, select, text
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
 
-from database.models import Base
+from database.models import Base, SchemaVersion
 from settings import settings
+from utils.logger import setup_logger
+
+
+logger = setup_logger(__name__)
 
 engine = create_async_engine(settings.DATABASE_URL, echo=False)
 
 async_session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
 
+SCHEMA_VERSION = 6
+"""
+Version of the database schema, increased with every change of the models.
+"""
+
+MIGRATIONS: Dict[int, List[str]] = {
+    4: [
+        "ALTER TABLE movies ADD COLUMN genre_mask BIGINT",
+    ],
+}
+"""
+SQL statements upgrading an existing database to a schema version, by version.
+New tables are created by `create_all`, so the migrations only alter or fill the tables that existed before.
+"""
+
+DIALECT_MIGRATIONS: Dict[str, Dict[int, List[str]]] = {
+    "sqlite": {
+        2: [
+            """
+            INSERT INTO user_movie_search (user_tg_id, movie_tmdb_id, title, original_title)
+            SELECT a.user_tg_id, a.movie_tmdb_id,
+                   m.movie_name || ' ' || coalesce(group_concat(md.title, ' '), ''),
+                   coalesce(max(md.original_title), '')
+            FROM user_movie_association a
+            JOIN movies m ON m.tmdb_id = a.movie_tmdb_id
+            LEFT JOIN movie_metadata md ON md.tmdb_id = a.movie_tmdb_id
+            GROUP BY a.user_tg_id, a.movie_tmdb_id
+            """,
+        ],
+    },
+}
+"""
+SQL statements upgrading an existing database to a schema version, by dialect and version, applied after
+the ones of `MIGRATIONS`. The FTS5 search index only exists on SQLite.
+"""
+
+
+def _get_schema_version(conn: Connection) -> Optional[int]:
+    """
+    Reads the stored schema version.
+
+    :param conn: Synchronous connection.
+    :return: The stored version, 0 for a database created before versioning, or None for an empty database.
+    """
+    tables = inspect(conn).get_table_names()
+
+    if SchemaVersion.__tablename__ in tables:
+        return conn.execute(select(SchemaVersion.version)).scalar() or 0
+
+    return 0 if tables else None
+
 
 async def create_db():
     """
-    Asynchronously create a database.
+    Asynchronously create or upgrade a database.
+
+    A database whose stored schema version matches `SCHEMA_VERSION` is left untouched,
+    so a restart costs a single query.
     """
     async with engine.begin() as conn:
+        version = await conn.run_sync(_get_schema_version)
+
+        if version == SCHEMA_VERSION:
+            return
+
+        if version is not None and version > SCHEMA_VERSION:
+            logger.warning("Database schema version=%s is newer than version=%s", version, SCHEMA_VERSION)
+            return
+
         await conn.run_sync(Base.metadata.create_all)
 
+        if version is not None:
+            for upgrade in range(version + 1, SCHEMA_VERSION + 1):
+                for statement in MIGRATIONS.get(upgrade, []) + \
+                        DIALECT_MIGRATIONS.get(conn.dialect.name, {}).get(upgrade, []):
+                    await conn.execute(text(statement))
+
+        await conn.execute(delete(SchemaVersion))
+        await conn.execute(insert(SchemaVersion).values(version=SCHEMA_VERSION))
+        logger.info("Database schema upgraded from version=%s to version=%s", version, SCHEMA_VERSION)
+
 
 async def drop_db():
     """
     Asynchronously drop a database.
     """
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.drop_all)
@@ -1,6 +1,7 @@
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Optional
 
-from sqlalchemy import BigInteger, String, Table, ForeignKey, Column, DateTime, func, Boolean
+from sqlalchemy import BigInteger, String, Table, ForeignKey, Column, DateTime, func, Boolean, Float, DDL, event, JSON
 from sqlalchemy.orm import relationship, Mapped, DeclarativeBase, mapped_column
 
 
@@ -51,12 +52,14 @@ class Movie(Base):
     Attributes:
         tmdb_id: TMDB ID of the movie.
         movie_name: Name of the movie.
+        genre_mask: Bitmask of the TMDB genres of the movie, see `utils.genres`, None if not fetched yet.
         users: List of users who liked the movie.
     """
     __tablename__ = 'movies'
 
     tmdb_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
     movie_name: Mapped[str] = mapped_column(String)
+    genre_mask: Mapped[Optional[int]] = mapped_column(BigInteger, default=None)
     users: Mapped[List["User"]] = relationship(
         secondary=user_movie_association,
         back_populates="liked_movies"
@@ -80,12 +83,113 @@ class Movie(Base):
         }
 
 
+class MovieMetadata(Base):
+    """
+    Localized TMDB metadata of a movie kept in the database.
+
+    Attributes:
+        tmdb_id: TMDB ID of the movie.
+        language: Language the metadata was fetched in.
+        title: Localized title of the movie.
+        original_title: Original title of the movie.
+        vote_average: Average TMDB rating of the movie.
+        release_date: Release date of the movie in YYYY-MM-DD format.
+        poster_path: Path of the movie poster on the TMDB image server.
+        updated_at: Time when the metadata was last refreshed from TMDB.
+    """
+    __tablename__ = 'movie_metadata'
+
+    tmdb_id: Mapped[int] = mapped_column(ForeignKey('movies.tmdb_id'), primary_key=True)
+    language: Mapped[str] = mapped_column(String(8), primary_key=True)
+    title: Mapped[str] = mapped_column(String)
+    original_title: Mapped[str] = mapped_column(String)
+    vote_average: Mapped[float] = mapped_column(Float, default=0.0)
+    release_date: Mapped[Optional[str]] = mapped_column(String, default=None)
+    poster_path: Mapped[Optional[str]] = mapped_column(String, default=None)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class MovieSimilarity(Base):
+    """
+    Precomputed nearest neighbours of a movie by the lists of the users who saved it.
+
+    Attributes:
+        movie_tmdb_id: TMDB ID of the movie.
+        similar_tmdb_id: TMDB ID of a movie saved by the same users.
+        score: Cosine similarity of the two movies over the users' lists.
+    """
+    __tablename__ = 'movie_similarity'
+
+    movie_tmdb_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    similar_tmdb_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True)
+    score: Mapped[float] = mapped_column(Float)
+
+
+class UserStats(Base):
+    """
+    Summary of a user's list, kept up to date in the transactions changing the list.
 
+    Attributes:
+        tg_id: Telegram ID of the user.
+        saved: Number of movies in the list.
+        watched: Number of watched movies in the list.
+        rating_counts: Number of movies by personal rating.
+        genre_counts: Number of movies by TMDB genre id.
+        month_counts: Number of movies by the month they were added in, in YYYY-MM format.
+    """
+    __tablename__ = 'user_stats'
+
+    tg_id: Mapped[int] = mapped_column(ForeignKey('users.tg_id'), primary_key=True)
+    saved: Mapped[int] = mapped_column(default=0)
+    watched: Mapped[int] = mapped_column(default=0)
+    rating_counts: Mapped[Dict[str, int]] = mapped_column(JSON, default=dict)
+    genre_counts: Mapped[Dict[str, int]] = mapped_column(JSON, default=dict)
+    month_counts: Mapped[Dict[str, int]] = mapped_column(JSON, default=dict)
+
+
+class Reminder(Base):
+    """
+    Release reminder a user asked for about a movie in the user's list.
+
+    Attributes:
+        user_tg_id: Telegram ID of the user.
+        movie_tmdb_id: TMDB ID of the movie.
+        release_date: Release date of the movie in YYYY-MM-DD format, as known when the reminder was set.
+        days_before: Number of days before the release the reminder is sent.
+        fire_at: Time the reminder is due, the scheduler looks up the reminders by it.
+    """
+    __tablename__ = 'reminders'
 
+    user_tg_id: Mapped[int] = mapped_column(ForeignKey('users.tg_id'), primary_key=True)
+    movie_tmdb_id: Mapped[int] = mapped_column(ForeignKey('movies.tmdb_id'), primary_key=True)
+    release_date: Mapped[str] = mapped_column(String)
+    days_before: Mapped[int] = mapped_column(default=0)
+    fire_at: Mapped[datetime] = mapped_column(DateTime, index=True)
 
 
+class SchemaVersion(Base):
+    """
+    Single row model holding the version of the database schema.
 
+    Attributes:
+        version: Version of the schema the database was created or upgraded to.
+    """
+    __tablename__ = 'schema_version'
 
+    version: Mapped[int] = mapped_column(primary_key=True)
 
 
+user_movie_search_ddl = DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS user_movie_search USING fts5("
+    "user_tg_id, movie_tmdb_id UNINDEXED, title, original_title, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+"""
+SQLite FTS5 index of the titles of the movies in the lists of the users, with a row per user and movie.
+The title column holds the localized titles of the movie in every language, the user id is indexed,
+so a search matches it together with the query instead of scanning the rows of all users.
+"""
 
+event.listen(Base.metadata, "after_create", user_movie_search_ddl.execute_if(dialect="sqlite"))
+event.listen(Base.metadata, "before_drop",
+             DDL("DROP TABLE IF EXISTS user_movie_search").execute_if(dialect="sqlite"))
@@ -1,15 +1,20 @@
 import datetime
+import re
 
-from typing import List
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from utils.genres import mask_genre_ids
+from utils.list_view_cache import ListViewCache
 from utils.logger import setup_logger
+from utils.trending import ADD_WEIGHT, WATCHED_WEIGHT, TrendingTracker
 
-from sqlalchemy import select
-from database.models import User, Movie, user_movie_association
+from sqlalchemy import and_, delete, exists, func, insert, or_, select, text, tuple_, update
+from sqlalchemy.orm import aliased
+from database.models import User, Movie, MovieMetadata, MovieSimilarity, Reminder, UserStats, user_movie_association
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
-logger = setup_logger()
+logger = setup_logger(__name__)
 
 
 async def db_add_user(session: AsyncSession, data: dict):
@@ -32,6 +37,7 @@ async def db_add_user(session: AsyncSession, data: dict):
     )
 
     session.add(new_user)
+    session.add(UserStats(tg_id=data["tg_id"], rating_counts={}, genre_counts={}, month_counts={}))
     await session.commit()
     logger.info("New user added to database id=%s", new_user.tg_id)
 
@@ -47,12 +53,13 @@ async def db_get_all_movies(session: AsyncSession):
     return movies.scalars().all()
 
 
-async def db_get_users_movies(session: AsyncSession, tg_id: int):
+async def db_get_users_movies(session: AsyncSession, tg_id: int, genre_mask: int = 0):
     """
     Asynchronously get all movies associated with a user.
 
     :param session: AsyncSession instance.
     :param tg_id: Telegram ID of the user.
+    :param genre_mask: Bitmask of the genres every returned movie must have, 0 returns all movies.
     :return: List of movies associated with the user.
     """
     user = await session.execute(select(User).where(User.tg_id == tg_id))
@@ -65,18 +72,24 @@ async def db_get_users_movies(session: AsyncSession, tg_id: int):
 
     # Query movies associated with the user
     stmt = select(Movie).join(user_movie_association).filter(user_movie_association.c.user_tg_id == user_tg_id)
+    if genre_mask:
+        stmt = stmt.filter(Movie.genre_mask.op("&")(genre_mask) == genre_mask)
     result = await session.execute(stmt)
 
     return result.scalars().all()
 
 
-async def db_add_movie_to_user(session: AsyncSession, tg_id: int, data: dict):
+async def db_add_movie_to_user(session: AsyncSession, tg_id: int, data: dict,
+                               trending: Optional[TrendingTracker] = None, list_views: Optional[ListViewCache] = None):
     """
     Asynchronously add a movie to a user's list.
 
     :param session: AsyncSession instance.
     :param tg_id: Telegram ID of the user.
-    :param data: Dictionary containing movie data.
+    :param data: Dictionary containing movie data, optionally with the localized `titles` and the `original_title`
+                 indexed for the search in the user's list.
+    :param trending: TrendingTracker instance the saved movie is recorded in, if any.
+    :param list_views: ListViewCache instance whose views of the user's list are invalidated, if any.
     """
     user = await session.execute(select(User).where(User.tg_id == tg_id))
     user_in_db = user.scalars().first()
@@ -92,6 +105,11 @@ async def db_add_movie_to_user(session: AsyncSession, tg_id: int, data: dict):
 
     if not movie_in_db:
         await db_add_movie(session, data)
+    elif movie_in_db.genre_mask is None and data.get('genre_mask') is not None:
+        await _db_update_genre_counts(session, data['tmdb_id'], None, data['genre_mask'])
+        movie_in_db.genre_mask = data['genre_mask']
+    genre_mask = data.get('genre_mask') if movie_in_db is None or movie_in_db.genre_mask is None \
+        else movie_in_db.genre_mask
 
     logger.info("Movie tmdb_id=%s found in the database", data['tmdb_id'])
 
@@ -108,9 +126,20 @@ async def db_add_movie_to_user(session: AsyncSession, tg_id: int, data: dict):
                           insert().
                           values(user_tg_id=tg_id,
                                  movie_tmdb_id=data['tmdb_id']))
+    await _db_index_user_movie(session, tg_id, data['tmdb_id'],
+                               titles=[data['movie_name'], *data.get('titles', [])],
+                               original_title=data.get('original_title', ''))
+    await _db_update_user_stats(session, tg_id, saved=1,
+                                genres=mask_genre_ids(genre_mask or 0),
+                                month=datetime.datetime.utcnow().strftime("%Y-%m"))
     await session.commit()
     logger.info("Movie tmdb_id=%s added to user tg_id=%s", data['tmdb_id'], tg_id)
 
+    if list_views:
+        await list_views.invalidate(tg_id)
+    if trending:
+        await trending.record(data['tmdb_id'], ADD_WEIGHT)
+
 
 async def db_add_movie(session: AsyncSession, data: dict):
     """
@@ -126,7 +155,7 @@ async def db_add_movie(session: AsyncSession, data: dict):
         logger.info("Movie tmdb_id=%s already exists in the database", data['tmdb_id'])
         return
 
-    new_movie = Movie(tmdb_id=data['tmdb_id'], movie_name=data['movie_name'])
+    new_movie = Movie(tmdb_id=data['tmdb_id'], movie_name=data['movie_name'], genre_mask=data.get('genre_mask'))
     session.add(new_movie)
     await session.commit()
     logger.info("New movie tmdb_id=%s added to the database", data['tmdb_id'])
@@ -147,19 +176,49 @@ async def db_get_movie_added_time(session: AsyncSession, tg_id: int, movie_id: i
     return result.scalar()
 
 
-async def db_delete_movie_from_user(session, tg_id, movie_id):
+async def db_delete_movie_from_user(session, tg_id, movie_id, trending: Optional[TrendingTracker] = None,
+                                    list_views: Optional[ListViewCache] = None):
     """
     Asynchronously delete a movie from a user's list.
 
     :param session: AsyncSession instance.
     :param tg_id: Telegram ID of the user.
     :param movie_id: TMDB ID of the movie.
+    :param trending: TrendingTracker instance in which the save of the movie, and its watch, are cancelled, if any.
+    :param list_views: ListViewCache instance whose views of the user's list are invalidated, if any.
     """
+    result = await session.execute(
+        select(user_movie_association.c.is_watched, user_movie_association.c.personal_rating,
+               user_movie_association.c.added_at, Movie.genre_mask)
+        .join(Movie, Movie.tmdb_id == user_movie_association.c.movie_tmdb_id)
+        .where(user_movie_association.c.user_tg_id == tg_id, user_movie_association.c.movie_tmdb_id == movie_id))
+    user_movie = result.first()
+    if user_movie is None:
+        return
+
     await session.execute(user_movie_association.delete().where(user_movie_association.c.user_tg_id == tg_id,
                                                                 user_movie_association.c.movie_tmdb_id == movie_id))
+    await session.execute(delete(Reminder).where(Reminder.user_tg_id == tg_id, Reminder.movie_tmdb_id == movie_id))
+    if _has_search_index(session):
+        await session.execute(text("DELETE FROM user_movie_search WHERE rowid IN ("
+                                   "SELECT rowid FROM user_movie_search "
+                                   "WHERE user_movie_search MATCH :match AND movie_tmdb_id = :movie_id)"),
+                              {"match": f'user_tg_id:"{int(tg_id)}"', "movie_id": int(movie_id)})
+    await _db_update_user_stats(session, tg_id, sign=-1, saved=1,
+                                watched=int(bool(user_movie.is_watched)),
+                                rating=user_movie.personal_rating,
+                                genres=mask_genre_ids(user_movie.genre_mask or 0),
+                                month=user_movie.added_at.strftime("%Y-%m") if user_movie.added_at else None)
     await session.commit()
     logger.info("Movie tmdb_id=%s deleted from user tg_id=%s", movie_id, tg_id)
 
+    if list_views:
+        await list_views.invalidate(tg_id)
+    if trending:
+        await trending.record(movie_id, -ADD_WEIGHT, at=user_movie.added_at)
+        if user_movie.is_watched:
+            await trending.record(movie_id, -WATCHED_WEIGHT)
+
 
 async def db_get_users_movie_data(session: AsyncSession, tg_id: int, movie_id: int):
     """
@@ -198,12 +257,13 @@ async def db_get_users_movie_data(session: AsyncSession, tg_id: int, movie_id: i
         "in_database": True
     }
 
-    logger.info(f"User movie data: {data}")
+    logger.debug("User tg_id=%s movie tmdb_id=%s data: %s", tg_id, movie_id, data)
 
     return data
 
 
-async def db_change_movie_state(session: AsyncSession, tg_id: int, movie_id: int, state: bool):
+async def db_change_movie_state(session: AsyncSession, tg_id: int, movie_id: int, state: bool,
+                                trending: Optional[TrendingTracker] = None, list_views: Optional[ListViewCache] = None):
     """
     Asynchronously change the watched state of a movie for a user.
 
@@ -211,6 +271,8 @@ async def db_change_movie_state(session: AsyncSession, tg_id: int, movie_id: int
     :param tg_id: Telegram ID of the user.
     :param movie_id: TMDB ID of the movie.
     :param state: Current watched state of the movie.
+    :param trending: TrendingTracker instance the watch, or its cancellation, is recorded in, if any.
+    :param list_views: ListViewCache instance whose views of the user's list are invalidated, if any.
     """
     new_state = not state
 
@@ -218,14 +280,20 @@ async def db_change_movie_state(session: AsyncSession, tg_id: int, movie_id: int
                           where(user_movie_association.c.user_tg_id == tg_id,
                                 user_movie_association.c.movie_tmdb_id == movie_id).
                           values(is_watched=new_state))
-    await session.commit()
+    await _db_update_user_stats(session, tg_id, sign=1 if new_state else -1, watched=1)
 
     if new_state:
+        await session.commit()
         logger.info("Movie tmdb_id=%s marked as watched for user tg_id=%s", movie_id, tg_id)
     else:
         await db_remove_personal_data(session, tg_id, movie_id)
         logger.info("Movie tmdb_id=%s marked as unwatched for user tg_id=%s", movie_id, tg_id)
 
+    if list_views:
+        await list_views.invalidate(tg_id)
+    if trending:
+        await trending.record(movie_id, WATCHED_WEIGHT if new_state else -WATCHED_WEIGHT)
+
 
 async def db_get_movie_state_for_user(session: AsyncSession, tg_id: int, movie_id: int):
 
@@ -243,7 +311,8 @@ async def db_get_movie_state_for_user(session: AsyncSession, tg_id: int, movie_i
     return result.scalar()
 
 
-async def db_leave_review(session: AsyncSession, tg_id: int, movie_id: int, data: dict):
+async def db_leave_review(session: AsyncSession, tg_id: int, movie_id: int, data: dict,
+                          list_views: Optional[ListViewCache] = None):
     """
    Asynchronously leave a review for a movie.
 
@@ -251,15 +320,23 @@ async def db_leave_review(session: AsyncSession, tg_id: int, movie_id: int, data
    :param tg_id: Telegram ID of the user.
    :param movie_id: TMDB ID of the movie.
    :param data: Dictionary containing review data.
+   :param list_views: ListViewCache instance whose views of the user's list are invalidated, if any.
    """
+    previous_rating = await _db_get_personal_rating(session, tg_id, movie_id)
+
     await session.execute(user_movie_association.update().
                           where(user_movie_association.c.user_tg_id == tg_id,
                                 user_movie_association.c.movie_tmdb_id == movie_id).
                           values(personal_rating=data['rating'],
                                  personal_review=data['review']))
+    await _db_update_user_stats(session, tg_id, sign=-1, rating=previous_rating)
+    await _db_update_user_stats(session, tg_id, rating=data['rating'])
     await session.commit()
     logger.info("User tg_id=%s left a review for movie tmdb_id=%s", tg_id, movie_id)
 
+    if list_views:
+        await list_views.invalidate(tg_id)
+
 
 async def db_remove_personal_data(session: AsyncSession, tg_id: int, movie_id: int):
     """
@@ -269,16 +346,537 @@ async def db_remove_personal_data(session: AsyncSession, tg_id: int, movie_id: i
    :param tg_id: Telegram ID of the user.
    :param movie_id: TMDB ID of the movie.
    """
+    previous_rating = await _db_get_personal_rating(session, tg_id, movie_id)
+
     await session.execute(user_movie_association.update().
                           where(user_movie_association.c.user_tg_id == tg_id,
                                 user_movie_association.c.movie_tmdb_id == movie_id).
                           values(personal_rating=None,
                                  personal_review=None))
+    await _db_update_user_stats(session, tg_id, sign=-1, rating=previous_rating)
     await session.commit()
     logger.info("Personal data removed for user tg_id=%s and movie tmdb_id=%s", tg_id, movie_id)
 
 
+async def db_get_existing_movie_ids(session: AsyncSession, movie_ids: Iterable[int]) -> List[int]:
+    """
+    Asynchronously select the ids that belong to movies stored in the database.
+
+    :param session: AsyncSession instance.
+    :param movie_ids: TMDB IDs of the movies to look for.
+    :return: List of TMDB IDs present in the movies table.
+    """
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return []
+
+    result = await session.execute(select(Movie.tmdb_id).where(Movie.tmdb_id.in_(movie_ids)))
+    return list(result.scalars().all())
+
+
+async def db_get_movies_without_genres(session: AsyncSession, limit: int, after: int = 0) -> List[int]:
+    """
+    Asynchronously select movies whose genre mask was not fetched yet, in the order of their TMDB IDs.
+
+    :param session: AsyncSession instance.
+    :param limit: Maximum number of returned movies.
+    :param after: TMDB ID the returned movies follow.
+    :return: List of TMDB IDs of the movies.
+    """
+    result = await session.execute(select(Movie.tmdb_id)
+                                   .where(Movie.genre_mask.is_(None), Movie.tmdb_id > after)
+                                   .order_by(Movie.tmdb_id)
+                                   .limit(limit))
+    return list(result.scalars().all())
+
+
+async def db_set_movie_genre_masks(session: AsyncSession, genre_masks: Dict[int, int]):
+    """
+    Asynchronously store the genre masks of movies, updating the genres counted in the summaries
+    of the users who saved them.
+
+    :param session: AsyncSession instance.
+    :param genre_masks: Dictionary of genre masks by TMDB ID.
+    """
+    if not genre_masks:
+        return
+
+    result = await session.execute(select(Movie.tmdb_id, Movie.genre_mask).where(Movie.tmdb_id.in_(genre_masks)))
+    for movie_id, old_mask in result.all():
+        await _db_update_genre_counts(session, movie_id, old_mask, genre_masks[movie_id])
+
+    await session.execute(update(Movie), [{"tmdb_id": movie_id, "genre_mask": mask}
+                                          for movie_id, mask in genre_masks.items()])
+    await session.commit()
+
+
+async def db_upsert_movie_metadata(session: AsyncSession, entries: List[dict]):
+    """
+    Asynchronously insert or update localized metadata of movies.
+
+    :param session: AsyncSession instance.
+    :param entries: List of dictionaries containing movie metadata.
+    """
+    for entry in entries:
+        await session.merge(MovieMetadata(**entry))
+
+    await session.commit()
+    logger.info("Metadata of %s movie entries refreshed", len(entries))
+
+
+def _has_search_index(session: AsyncSession) -> bool:
+    """
+    Check whether the database has the FTS5 search index, which only SQLite supports.
+
+    :param session: AsyncSession instance.
+    :return: True if the database is SQLite.
+    """
+    return session.bind.dialect.name == "sqlite"
+
+
+async def _db_index_user_movie(session: AsyncSession, tg_id: int, movie_id: int, titles: List[str],
+                               original_title: str):
+    """
+    Asynchronously add a movie of a user's list to the search index, without committing.
+    Nothing is indexed on the databases without the index.
+
+    :param session: AsyncSession instance.
+    :param tg_id: Telegram ID of the user.
+    :param movie_id: TMDB ID of the movie.
+    :param titles: Localized titles of the movie.
+    :param original_title: Original title of the movie.
+    """
+    if not _has_search_index(session):
+        return
+
+    await session.execute(text("INSERT INTO user_movie_search (user_tg_id, movie_tmdb_id, title, original_title) "
+                               "VALUES (:tg_id, :movie_id, :title, :original_title)"),
+                          {"tg_id": int(tg_id), "movie_id": int(movie_id),
+                           "title": " ".join(dict.fromkeys(title for title in titles if title)),
+                           "original_title": original_title or ""})
+
+
+def _build_search_match(tg_id: int, query: str) -> Optional[str]:
+    """
+    Build the FTS5 expression matching the movies of a user whose titles contain every word of the query
+    as a word prefix.
+
+    :param tg_id: Telegram ID of the user.
+    :param query: Text typed by the user.
+    :return: The FTS5 expression, or None if the query has no words.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+
+    terms = " ".join(f'"{word}"*' for word in words)
+    return f'user_tg_id:"{int(tg_id)}" AND {{title original_title}}: ({terms})'
+
+
+async def db_search_users_movies(session: AsyncSession, tg_id: int, query: str, language: str, limit: int):
+    """
+    Asynchronously search the titles of the movies in a user's list.
+
+    Matches in the localized titles rank above matches in the original title. The databases without
+    the FTS5 index are searched with `ILIKE` instead, the titles containing every word of the query are
+    returned by name.
+
+    :param session: AsyncSession instance.
+    :param tg_id: Telegram ID of the user.
+    :param query: Text typed by the user.
+    :param language: Language of the returned titles, the stored name is returned if there is no such metadata.
+    :param limit: Maximum number of movies returned.
+    :return: List of rows with the `tmdb_id`, the `title` and the `release_date` of the best matching movies.
+    """
+    if not _has_search_index(session):
+        return await _db_search_users_movies_by_like(session, tg_id, query, language, limit)
+
+    match = _build_search_match(tg_id, query)
+    if match is None:
+        return []
+
+    result = await session.execute(text(
+        "SELECT s.movie_tmdb_id AS tmdb_id, coalesce(md.title, m.movie_name) AS title, md.release_date "
+        "FROM user_movie_search s "
+        "JOIN movies m ON m.tmdb_id = s.movie_tmdb_id "
+        "LEFT JOIN movie_metadata md ON md.tmdb_id = s.movie_tmdb_id AND md.language = :language "
+        "WHERE user_movie_search MATCH :match "
+        "ORDER BY bm25(user_movie_search, 0.0, 0.0, 2.0, 1.0) "
+        "LIMIT :limit"
+    ), {"match": match, "language": language, "limit": limit})
+
+    return result.all()
+
+
+async def _db_search_users_movies_by_like(session: AsyncSession, tg_id: int, query: str, language: str, limit: int):
+    """
+    Asynchronously search the titles of the movies in a user's list with `ILIKE`, for the databases
+    without the FTS5 index.
+
+    :param session: AsyncSession instance.
+    :param tg_id: Telegram ID of the user.
+    :param query: Text typed by the user.
+    :param language: Language of the returned titles, the stored name is returned if there is no such metadata.
+    :param limit: Maximum number of movies returned.
+    :return: List of rows with the `tmdb_id`, the `title` and the `release_date` of the matching movies.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return []
+
+    localized = aliased(MovieMetadata)
+    conditions = []
+    for word in words:
+        pattern = "%" + word.replace("_", "\\_") + "%"
+        conditions.append(or_(
+            Movie.movie_name.ilike(pattern, escape="\\"),
+            exists().where(MovieMetadata.tmdb_id == Movie.tmdb_id,
+                           or_(MovieMetadata.title.ilike(pattern, escape="\\"),
+                               MovieMetadata.original_title.ilike(pattern, escape="\\"))),
+        ))
+
+    result = await session.execute(
+        select(Movie.tmdb_id.label("tmdb_id"),
+               func.coalesce(localized.title, Movie.movie_name).label("title"),
+               localized.release_date)
+        .join(user_movie_association, and_(user_movie_association.c.movie_tmdb_id == Movie.tmdb_id,
+                                           user_movie_association.c.user_tg_id == tg_id))
+        .outerjoin(localized, and_(localized.tmdb_id == Movie.tmdb_id, localized.language == language))
+        .where(*conditions)
+        .order_by(Movie.movie_name)
+        .limit(limit))
+
+    return result.all()
+
+
+async def db_get_user_movie_pairs(session: AsyncSession) -> List[Tuple[int, int]]:
+    """
+    Asynchronously get every movie saved by every user.
+
+    :param session: AsyncSession instance.
+    :return: List of pairs of the Telegram ID of a user and the TMDB ID of a movie in the user's list.
+    """
+    result = await session.execute(select(user_movie_association.c.user_tg_id,
+                                          user_movie_association.c.movie_tmdb_id))
+    return [tuple(row) for row in result.all()]
+
+
+async def db_get_movies_similar_to(session: AsyncSession, movie_ids: Iterable[int]) -> List[int]:
+    """
+    Asynchronously select the movies that have any of the given movies among their stored neighbours.
 
+    :param session: AsyncSession instance.
+    :param movie_ids: TMDB IDs of the neighbours.
+    :return: List of TMDB IDs of the movies.
+    """
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return []
 
+    result = await session.execute(select(MovieSimilarity.movie_tmdb_id).distinct()
+                                   .where(MovieSimilarity.similar_tmdb_id.in_(movie_ids)))
+    return list(result.scalars().all())
 
 
+async def db_replace_movie_similarities(session: AsyncSession, movie_ids: List[int], entries: List[dict]):
+    """
+    Asynchronously replace the stored neighbours of movies in a single transaction.
+
+    :param session: AsyncSession instance.
+    :param movie_ids: TMDB IDs of the movies whose neighbours are replaced.
+    :param entries: List of dictionaries with the new neighbours of these movies.
+    """
+    if movie_ids:
+        await session.execute(delete(MovieSimilarity).where(MovieSimilarity.movie_tmdb_id.in_(movie_ids)))
+    if entries:
+        await session.execute(insert(MovieSimilarity), entries)
+
+    await session.commit()
+
+
+async def db_get_recommendations(session: AsyncSession, tg_id: int, language: str, limit: int):
+    """
+    Asynchronously get the movies most similar to a user's list from the precomputed neighbours.
+
+    The score of a recommended movie is the sum of its similarities to the movies in the list,
+    the movies already in the list are not recommended.
+
+    :param session: AsyncSession instance.
+    :param tg_id: Telegram ID of the user.
+    :param language: Language of the returned titles, the stored name is returned if there is no such metadata.
+    :param limit: Maximum number of movies returned.
+    :return: List of rows with the `tmdb_id`, the `title` and the `release_date` of the recommended movies.
+    """
+    users_movies = select(user_movie_association.c.movie_tmdb_id).where(user_movie_association.c.user_tg_id == tg_id)
+    scores = (select(MovieSimilarity.similar_tmdb_id.label("tmdb_id"), func.sum(MovieSimilarity.score).label("score"))
+              .where(MovieSimilarity.movie_tmdb_id.in_(users_movies),
+                     MovieSimilarity.similar_tmdb_id.not_in(users_movies))
+              .group_by(MovieSimilarity.similar_tmdb_id)
+              .order_by(func.sum(MovieSimilarity.score).desc())
+              .limit(limit)
+              .subquery())
+
+    result = await session.execute(
+        select(scores.c.tmdb_id,
+               func.coalesce(MovieMetadata.title, Movie.movie_name).label("title"),
+               MovieMetadata.release_date)
+        .join(Movie, Movie.tmdb_id == scores.c.tmdb_id)
+        .outerjoin(MovieMetadata, (MovieMetadata.tmdb_id == scores.c.tmdb_id) & (MovieMetadata.language == language))
+        .order_by(scores.c.score.desc())
+    )
+    return result.all()
+
+
+async def db_get_movies_titles(session: AsyncSession, movie_ids: List[int], language: str) -> Dict[int, Any]:
+    """
+    Asynchronously get the titles of movies by their TMDB IDs.
+
+    :param session: AsyncSession instance.
+    :param movie_ids: TMDB IDs of the movies.
+    :param language: Language of the returned titles, the stored name is returned if there is no such metadata.
+    :return: Dictionary of rows with the `tmdb_id`, the `title` and the `release_date` by TMDB ID.
+    """
+    if not movie_ids:
+        return {}
+
+    result = await session.execute(
+        select(Movie.tmdb_id,
+               func.coalesce(MovieMetadata.title, Movie.movie_name).label("title"),
+               MovieMetadata.release_date)
+        .outerjoin(MovieMetadata, (MovieMetadata.tmdb_id == Movie.tmdb_id) & (MovieMetadata.language == language))
+        .where(Movie.tmdb_id.in_(movie_ids))
+    )
+    return {row.tmdb_id: row for row in result}
+
+
+def _add_counts(counts: Dict[str, int], keys: Iterable[Any], delta: int) -> Dict[str, int]:
+    """
+    Add a delta to the counters of keys, dropping the counters that reach zero.
+
+    :param counts: Dictionary of counters by key.
+    :param keys: Keys whose counters change.
+    :param delta: Change of every counter.
+    :return: New dictionary of counters.
+    """
+    counts = dict(counts or {})
+    for key in map(str, keys):
+        value = counts.get(key, 0) + delta
+        if value > 0:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+
+    return counts
+
+
+async def _db_get_personal_rating(session: AsyncSession, tg_id: int, movie_id: int) -> Optional[int]:
+    """
+    Asynchronously get the personal rating a user gave to a movie.
+
+    :param session: AsyncSession instance.
+    :param tg_id: Telegram ID of the user.
+    :param movie_id: TMDB ID of the movie.
+    :return: The rating, or None if the movie is not rated.
+    """
+    result = await session.execute(select(user_movie_association.c.personal_rating)
+                                   .where(user_movie_association.c.user_tg_id == tg_id,
+                                          user_movie_association.c.movie_tmdb_id == movie_id))
+    return result.scalar()
+
+
+async def _db_update_user_stats(session: AsyncSession, tg_id: int, sign: int = 1, saved: int = 0, watched: int = 0,
+                                rating: Optional[Any] = None, genres: Iterable[int] = (),
+                                month: Optional[str] = None):
+    """
+    Asynchronously apply a change of a user's list to the user's summary, without committing,
+    so the summary is written in the transaction of the change.
+
+    Users without a summary, who joined before summaries were kept, are skipped,
+    their summary is built from the list on the first request.
+
+    :param session: AsyncSession instance.
+    :param tg_id: Telegram ID of the user.
+    :param sign: 1 if the values are added, -1 if they are removed.
+    :param saved: Number of saved movies.
+    :param watched: Number of watched movies.
+    :param rating: Personal rating given or removed.
+    :param genres: TMDB genre ids of a saved or removed movie.
+    :param month: Month a saved or removed movie was added in, in YYYY-MM format.
+    """
+    stats = await session.get(UserStats, tg_id, with_for_update=True)
+    if stats is None:
+        return
+
+    stats.saved += sign * saved
+    stats.watched += sign * watched
+    if rating is not None:
+        stats.rating_counts = _add_counts(stats.rating_counts, [int(rating)], sign)
+    if genres:
+        stats.genre_counts = _add_counts(stats.genre_counts, genres, sign)
+    if month:
+        stats.month_counts = _add_counts(stats.month_counts, [month], sign)
+
+
+async def _db_update_genre_counts(session: AsyncSession, movie_id: int, old_mask: Optional[int], new_mask: int):
+    """
+    Asynchronously apply a change of a movie's genre mask to the summaries of the users who saved the movie,
+    without committing.
+
+    A movie saved before its mask was fetched counted no genres, so its genres are counted once the mask is set
+    and removing the movie later subtracts exactly what was added.
+
+    :param session: AsyncSession instance.
+    :param movie_id: TMDB ID of the movie.
+    :param old_mask: Stored genre mask of the movie, None if it was not fetched yet.
+    :param new_mask: New genre mask of the movie.
+    """
+    old_mask = old_mask or 0
+    added = mask_genre_ids(new_mask & ~old_mask)
+    removed = mask_genre_ids(old_mask & ~new_mask)
+    if not added and not removed:
+        return
+
+    result = await session.execute(select(user_movie_association.c.user_tg_id)
+                                   .where(user_movie_association.c.movie_tmdb_id == movie_id))
+    for tg_id in result.scalars().all():
+        await _db_update_user_stats(session, tg_id, genres=added)
+        await _db_update_user_stats(session, tg_id, sign=-1, genres=removed)
+
+
+async def db_rebuild_user_stats(session: AsyncSession, tg_id: int) -> UserStats:
+    """
+    Asynchronously build a user's summary from the user's list and store it.
+
+    :param session: AsyncSession instance.
+    :param tg_id: Telegram ID of the user.
+    :return: The summary.
+    """
+    result = await session.execute(
+        select(user_movie_association.c.is_watched, user_movie_association.c.personal_rating,
+               user_movie_association.c.added_at, Movie.genre_mask)
+        .join(Movie, Movie.tmdb_id == user_movie_association.c.movie_tmdb_id)
+        .where(user_movie_association.c.user_tg_id == tg_id))
+    rows = result.all()
+
+    stats = await session.get(UserStats, tg_id) or UserStats(tg_id=tg_id)
+    stats.saved = len(rows)
+    stats.watched = sum(1 for row in rows if row.is_watched)
+    stats.rating_counts = _add_counts({}, [int(row.personal_rating) for row in rows
+                                          if row.personal_rating is not None], 1)
+    stats.genre_counts = _add_counts({}, [genre for row in rows for genre in mask_genre_ids(row.genre_mask or 0)], 1)
+    stats.month_counts = _add_counts({}, [row.added_at.strftime("%Y-%m") for row in rows if row.added_at], 1)
+
+    session.add(stats)
+    await session.commit()
+    logger.info("Statistics of user tg_id=%s rebuilt from %s movies", tg_id, len(rows))
+
+    return stats
+
+
+async def db_get_user_stats(session: AsyncSession, tg_id: int) -> UserStats:
+    """
+    Asynchronously get a user's summary, building it on the first request of a user who joined before summaries
+    were kept.
+
+    :param session: AsyncSession instance.
+    :param tg_id: Telegram ID of the user.
+    :return: The summary.
+    """
+    stats = await session.get(UserStats, tg_id)
+    if stats is None:
+        stats = await db_rebuild_user_stats(session, tg_id)
+
+    return stats
+
+
+async def db_set_reminder(session: AsyncSession, tg_id: int, movie_id: int, release_date: str, days_before: int,
+                          fire_at: datetime.datetime):
+    """
+    Asynchronously set the release reminder of a user about a movie, replacing the previous one.
+
+    :param session: AsyncSession instance.
+    :param tg_id: Telegram ID of the user.
+    :param movie_id: TMDB ID of the movie.
+    :param release_date: Release date of the movie in YYYY-MM-DD format.
+    :param days_before: Number of days before the release the reminder is sent.
+    :param fire_at: Time the reminder is due, in UTC.
+    """
+    reminder = await session.get(Reminder, (tg_id, movie_id))
+    if reminder is None:
+        reminder = Reminder(user_tg_id=tg_id, movie_tmdb_id=movie_id)
+        session.add(reminder)
+
+    reminder.release_date = release_date
+    reminder.days_before = days_before
+    reminder.fire_at = fire_at
+
+    await session.commit()
+    logger.info("Reminder about movie tmdb_id=%s set for user tg_id=%s at %s", movie_id, tg_id, fire_at)
+
+
+async def db_get_reminder(session: AsyncSession, tg_id: int, movie_id: int) -> Optional[Reminder]:
+    """
+    Asynchronously get the release reminder of a user about a movie.
+
+    :param session: AsyncSession instance.
+    :param tg_id: Telegram ID of the user.
+    :param movie_id: TMDB ID of the movie.
+    :return: The reminder, or None if there is no reminder.
+    """
+    return await session.get(Reminder, (tg_id, movie_id))
+
+
+async def db_delete_reminders(session: AsyncSession, keys: Iterable[Tuple[int, int]]):
+    """
+    Asynchronously delete release reminders.
+
+    :param session: AsyncSession instance.
+    :param keys: Pairs of the Telegram ID of the user and the TMDB ID of the movie of the reminders.
+    """
+    keys = list(keys)
+    if not keys:
+        return
+
+    await session.execute(delete(Reminder).where(tuple_(Reminder.user_tg_id, Reminder.movie_tmdb_id).in_(keys)))
+    await session.commit()
+
+
+async def db_get_next_reminder_time(session: AsyncSession) -> Optional[datetime.datetime]:
+    """
+    Asynchronously get the time the earliest reminder is due, read from the index on the due times.
+
+    :param session: AsyncSession instance.
+    :return: The time, or None if there are no reminders.
+    """
+    result = await session.execute(select(func.min(Reminder.fire_at)))
+    return result.scalar()
+
+
+async def db_get_due_reminders(session: AsyncSession, until: datetime.datetime, limit: int) -> List[Reminder]:
+    """
+    Asynchronously get the reminders due until a time, the earliest first.
+
+    :param session: AsyncSession instance.
+    :param until: Time in UTC until which the reminders are due.
+    :param limit: Maximum number of reminders returned.
+    :return: List of reminders.
+    """
+    result = await session.execute(select(Reminder)
+                                   .where(Reminder.fire_at <= until)
+                                   .order_by(Reminder.fire_at)
+                                   .limit(limit))
+    return list(result.scalars())
+
+
+async def db_get_user_ids_after(session: AsyncSession, after: int, limit: int) -> List[int]:
+    """
+    Asynchronously get the Telegram IDs of the users following a given ID, in order, so all users are
+    walked through in batches by the primary key without an offset.
+
+    :param session: AsyncSession instance.
+    :param after: Telegram ID after which the users are returned.
+    :param limit: Maximum number of IDs returned.
+    :return: List of Telegram IDs.
+    """
+    result = await session.execute(select(User.tg_id).where(User.tg_id > after).order_by(User.tg_id).limit(limit))
+    return list(result.scalars())
@@ -1,17 +1,23 @@
 """
-This module imports and exposes the Language, SortingType, and Commands enums.
+This module imports and exposes the Language, SortingType, Commands, CassetteMode, and IsolationMode enums.
 
 Modules:
     Language: Enum representing different languages.
     SortingType: Enum representing different types of sorting.
     Commands: Enum representing different commands.
+    CassetteMode: Enum representing the modes of the TMDB cassette.
+    IsolationMode: Enum representing the ways the updates of a chat are isolated.
 """
 
 from .language import Language
 from .sorting import SortingType
 from .commands import Commands
+from .cassette import CassetteMode
+from .isolation import IsolationMode
 __all__ = [
     "Language",
     "SortingType",
-    "Commands"
+    "Commands",
+    "CassetteMode",
+    "IsolationMode"
     ]
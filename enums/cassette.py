@@ -0,0 +1,13 @@
+from enum import Enum
+
+
+class CassetteMode(str, Enum):
+    """
+    Enum representing the modes of the TMDB cassette.
+
+    Attributes:
+        RECORD: Requests go to TMDB and their responses are saved to the cassette.
+        REPLAY: Requests are served from the cassette without calling TMDB.
+    """
+    RECORD = "record"
+    REPLAY = "replay"
@@ -0,0 +1,15 @@
+from enum import Enum
+
+
+class IsolationMode(str, Enum):
+    """
+    Enum representing the ways the updates of a chat are kept from being handled concurrently.
+
+    Attributes:
+        LOCAL: An asyncio lock per chat in the process, enough for a single polling process.
+        REDIS: A Redis lock per chat, for several processes handling the updates of the same bot.
+        NONE: No lock, for stateless handlers.
+    """
+    LOCAL = "local"
+    REDIS = "redis"
+    NONE = "none"
@@ -0,0 +1,309 @@
+import asyncio
+import time
+import uuid
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram_i18n.cores import FluentRuntimeCore
+from aiogram_i18n.exceptions import KeyNotFoundError
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.requests import db_get_user_ids_after
+from utils.logger import setup_logger
+from utils.rate_limiter import BOT_SEND_RATE_KEY, RateLimitExceeded, RedisTokenBucket
+from utils.redis_manager import RedisManager
+
+
+logger = setup_logger(__name__)
+
+LATEST_KEY = "broadcast:latest"
+"""
+Redis key holding the ID of the latest broadcast, resumed on startup while its status is running.
+"""
+
+MAX_ATTEMPTS = 5
+"""
+The number of times a message is sent before the recipient is counted as failed.
+"""
+
+
+class Broadcaster:
+    """
+    This class sends a message to every user of the bot, in the locale of every user.
+
+    The users are read from the database in batches ordered by their Telegram ID. The locales of a batch are read
+    with a single `MGET` and the messages are sent by a pool of workers sharing the token bucket of the messages
+    the bot sends on its own. A `retry_after` answer pauses every worker for the time the Bot API asks.
+
+    The state of a broadcast, with the ID of the last user of the last finished batch as its cursor, lives in
+    a Redis hash updated after every batch, so a broadcast interrupted by a restart resumes from its last batch.
+    The users of that batch may get the message twice, never not at all.
+    """
+
+    def __init__(self, redis: "Redis[Any]", session_pool: async_sessionmaker, core: FluentRuntimeCore,
+                 default_locale: str, rate: float, workers: int, batch_size: int):
+        """
+        Initializes a new instance of the `Broadcaster` class.
+
+        Args:
+            redis (Redis[Any]): The Redis connection holding the state of the broadcasts, the locales
+                and the send budget.
+            session_pool (async_sessionmaker): Pool of database sessions.
+            core (FluentRuntimeCore): The Fluent core translating the messages.
+            default_locale (str): The locale of the users who have not chosen one.
+            rate (float): The number of messages the bot sends per second on its own.
+            workers (int): The number of messages sent at once.
+            batch_size (int): The number of users loaded at once.
+        """
+        self.redis = redis
+        self.session_pool = session_pool
+        self.core = core
+        self.locales = RedisManager(redis, default_locale)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.limiter = RedisTokenBucket(redis, BOT_SEND_RATE_KEY, rate=rate, capacity=max(1, int(rate)),
+                                        max_wait=60.0)
+        self.task: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+
+    @staticmethod
+    def state_key(broadcast_id: str) -> str:
+        """
+        Returns the Redis key of the state of a broadcast.
+
+        Args:
+            broadcast_id (str): The ID of the broadcast.
+
+        Returns:
+            str: The key.
+        """
+        return f"broadcast:{broadcast_id}"
+
+    async def start(self, bot: Bot, message_id: str) -> Optional[str]:
+        """
+        Starts broadcasting a message to every user.
+
+        Args:
+            bot (Bot): The bot sending the messages.
+            message_id (str): The ID of the Fluent message sent, rendered in the locale of every user.
+
+        Returns:
+            Optional[str]: The ID of the broadcast, or None if another broadcast is running.
+
+        Raises:
+            KeyNotFoundError: If the message is missing from a locale.
+        """
+        if not all(bundle.has_message(message_id) for bundle in self.core.locales.values()):
+            raise KeyNotFoundError(message_id)
+
+        if self.running:
+            return None
+
+        broadcast_id = uuid.uuid4().hex[:12]
+        await self.redis.hset(self.state_key(broadcast_id), mapping={
+            "message_id": message_id,
+            "status": "running",
+            "cursor": 0,
+            "sent": 0,
+            "failed": 0,
+            "started_at": int(time.time()),
+        })
+        await self.redis.set(LATEST_KEY, broadcast_id)
+
+        self._spawn(bot, broadcast_id)
+        logger.info("Broadcast id=%s of message=%s started", broadcast_id, message_id)
+
+        return broadcast_id
+
+    async def resume(self, bot: Bot) -> Optional[str]:
+        """
+        Resumes the latest broadcast if it was interrupted while running.
+
+        Args:
+            bot (Bot): The bot sending the messages.
+
+        Returns:
+            Optional[str]: The ID of the resumed broadcast, or None if there is nothing to resume.
+        """
+        state = await self.status()
+        if not state or state["status"] != "running" or self.running:
+            return None
+
+        self._spawn(bot, state["id"])
+        logger.info("Broadcast id=%s resumed after user tg_id=%s", state["id"], state["cursor"])
+
+        return state["id"]
+
+    async def cancel(self) -> bool:
+        """
+        Cancels the running broadcast, it is not resumed afterwards.
+
+        Returns:
+            bool: True if a broadcast was running.
+        """
+        state = await self.status()
+        if not state or state["status"] != "running":
+            return False
+
+        await self.redis.hset(self.state_key(state["id"]), "status", "cancelled")
+        await self.stop()
+        logger.info("Broadcast id=%s cancelled", state["id"])
+
+        return True
+
+    async def stop(self) -> None:
+        """
+        Stops the running broadcast on shutdown, it is resumed from its cursor on the next startup.
+        """
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def status(self) -> Optional[Dict[str, str]]:
+        """
+        Returns the state of the latest broadcast.
+
+        Returns:
+            Optional[Dict[str, str]]: The state with its `id`, or None if nothing was ever broadcast.
+        """
+        broadcast_id = await self.redis.get(LATEST_KEY)
+        if broadcast_id is None:
+            return None
+
+        broadcast_id = broadcast_id.decode("utf-8") if isinstance(broadcast_id, bytes) else broadcast_id
+        state = await self.redis.hgetall(self.state_key(broadcast_id))
+
+        return {"id": broadcast_id, **{
+            (key.decode("utf-8") if isinstance(key, bytes) else key):
+                (value.decode("utf-8") if isinstance(value, bytes) else value)
+            for key, value in state.items()
+        }}
+
+    @property
+    def running(self) -> bool:
+        """
+        Whether a broadcast is being sent by this process.
+        """
+        return self.task is not None and not self.task.done()
+
+    def _spawn(self, bot: Bot, broadcast_id: str) -> None:
+        """
+        Starts the task sending a broadcast.
+
+        Args:
+            bot (Bot): The bot sending the messages.
+            broadcast_id (str): The ID of the broadcast.
+        """
+        self.task = asyncio.create_task(self.run(bot, broadcast_id))
+
+    async def run(self, bot: Bot, broadcast_id: str) -> None:
+        """
+        Sends a broadcast from its cursor to the last user.
+
+        Args:
+            bot (Bot): The bot sending the messages.
+            broadcast_id (str): The ID of the broadcast.
+        """
+        key = self.state_key(broadcast_id)
+        state = await self.redis.hmget(key, "message_id", "cursor")
+        message_id = state[0].decode("utf-8") if isinstance(state[0], bytes) else state[0]
+        cursor = int(state[1])
+
+        start = time.perf_counter()
+        queue: "asyncio.Queue[Tuple[int, str]]" = asyncio.Queue(maxsize=self.batch_size)
+        results: List[bool] = []
+        workers = [asyncio.create_task(self._worker(bot, queue, results)) for _ in range(self.workers)]
+
+        try:
+            while True:
+                async with self.session_pool() as session:
+                    user_ids = await db_get_user_ids_after(session, after=cursor, limit=self.batch_size)
+                if not user_ids:
+                    break
+
+                locales = await self.locales.get_locales_by_user_ids(user_ids)
+                texts = {locale: self.core.get(message_id, locale) for locale in set(locales.values())}
+
+                results.clear()
+                for user_id in user_ids:
+                    await queue.put((user_id, texts[locales[user_id]]))
+                await queue.join()
+
+                cursor = user_ids[-1]
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.hset(key, "cursor", cursor)
+                    pipe.hincrby(key, "sent", sum(results))
+                    pipe.hincrby(key, "failed", len(results) - sum(results))
+                    await pipe.execute()
+
+            await self.redis.hset(key, "status", "done")
+            state = await self.status()
+            logger.info("Broadcast id=%s done in %.3f s: %s sent, %s failed", broadcast_id,
+                        time.perf_counter() - start, state["sent"], state["failed"])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Broadcast id=%s failed after user tg_id=%s, it is resumed on the next startup",
+                             broadcast_id, cursor)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _worker(self, bot: Bot, queue: "asyncio.Queue[Tuple[int, str]]", results: List[bool]) -> None:
+        """
+        Sends the messages of the queue until the task is cancelled.
+
+        Args:
+            bot (Bot): The bot sending the messages.
+            queue (asyncio.Queue[Tuple[int, str]]): The queue of the recipients and their messages.
+            results (List[bool]): The list the outcome of every message is appended to.
+        """
+        while True:
+            user_id, text = await queue.get()
+            try:
+                results.append(await self._send(bot, user_id, text))
+            finally:
+                queue.task_done()
+
+    async def _send(self, bot: Bot, user_id: int, text: str) -> bool:
+        """
+        Sends a message within the send budget, pausing every worker for as long as the Bot API asks
+        on flood errors.
+
+        Args:
+            bot (Bot): The bot sending the message.
+            user_id (int): The Telegram ID of the recipient.
+            text (str): The text of the message.
+
+        Returns:
+            bool: True if the message was sent, False if it failed, for any reason.
+        """
+        loop = asyncio.get_running_loop()
+
+        for _ in range(MAX_ATTEMPTS):
+            if self._paused_until > loop.time():
+                await asyncio.sleep(self._paused_until - loop.time())
+
+            try:
+                await self.limiter.acquire()
+                await bot.send_message(user_id, text)
+                return True
+            except RateLimitExceeded:
+                continue
+            except TelegramRetryAfter as e:
+                logger.warning("Broadcast throttled for %s s", e.retry_after)
+                self._paused_until = max(self._paused_until, loop.time() + e.retry_after)
+            except TelegramAPIError as e:
+                logger.info("Broadcast message to user tg_id=%s failed: %s", user_id, e.message)
+                return False
+            except Exception:
+                # A failing worker would leave its messages unacknowledged and the broadcast waiting forever.
+                logger.exception("Broadcast message to user tg_id=%s failed", user_id)
+                return False
+
+        return False
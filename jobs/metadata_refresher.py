@@ -0,0 +1,235 @@
+import asyncio
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Set
+
+from redis.asyncio import Redis
+from requests import HTTPError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.requests import db_get_existing_movie_ids, db_get_movies_without_genres, db_set_movie_genre_masks, \
+    db_upsert_movie_metadata
+from enums import Language
+from utils.genres import genre_mask
+from utils.logger import setup_logger
+from utils.tmdb_client import TMDBClient
+
+
+logger = setup_logger(__name__)
+
+WATERMARK_KEY = "tmdb:changes:watermark"
+"""
+Redis key holding the end of the last fully synchronized period of the TMDB change feed.
+"""
+
+MAX_CHANGES_PERIOD = timedelta(days=14)
+"""
+The longest period TMDB accepts in a single change feed request.
+"""
+
+LOOKUP_CHUNK_SIZE = 500
+
+
+class MetadataRefresher:
+    """
+    This class is a background job that keeps the local copy of movie metadata in sync with TMDB.
+
+    Periodically it reads the TMDB "changed movies" feed since the stored watermark, intersects the changed ids
+    with the movies stored in the database and refreshes only those entries in rate-limited batches.
+    The watermark is advanced only after a period was fully processed, so a restart resumes from it.
+    Afterwards the movies stored without a genre mask are fetched once to fill it in.
+    """
+
+    def __init__(
+        self,
+        redis: "Redis[Any]",
+        tmdb_client: TMDBClient,
+        session_pool: async_sessionmaker,
+        interval: int,
+        batch_size: int,
+        batch_delay: float,
+    ):
+        """
+        Initializes a new instance of the `MetadataRefresher` class.
+
+        Args:
+            redis (Redis[Any]): The Redis connection used to store the watermark.
+            tmdb_client (TMDBClient): The TMDB client.
+            session_pool (async_sessionmaker): Pool of database sessions.
+            interval (int): The number of seconds between two synchronizations.
+            batch_size (int): The number of movies refreshed concurrently.
+            batch_delay (float): The number of seconds to wait between two batches.
+        """
+        self.redis = redis
+        self.tmdb_client = tmdb_client
+        self.session_pool = session_pool
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+
+    async def run(self) -> None:
+        """
+        Runs the synchronization loop until the task is cancelled.
+        """
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Movie metadata refresh failed")
+
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> None:
+        """
+        Refreshes the metadata of the stored movies changed on TMDB since the watermark.
+        """
+        now = datetime.now(timezone.utc)
+        start = await self._get_watermark() or now - timedelta(days=1)
+
+        while start < now:
+            end = min(start + MAX_CHANGES_PERIOD, now)
+
+            changed_ids = await self._fetch_changed_ids(start, end)
+            movie_ids = await self._filter_known_ids(changed_ids)
+            logger.info("TMDB reported %s changed movies since %s, %s of them are stored",
+                        len(changed_ids), start.isoformat(), len(movie_ids))
+
+            for i in range(0, len(movie_ids), self.batch_size):
+                await self._refresh_batch(movie_ids[i:i + self.batch_size])
+                await asyncio.sleep(self.batch_delay)
+
+            await self._set_watermark(end)
+            start = end
+
+        await self._backfill_genres()
+
+    async def _backfill_genres(self) -> None:
+        """
+        Fetches the movies stored before their genre masks were kept, in rate-limited batches.
+        Every movie is fetched once per pass, the ones that failed are fetched again by the next refresh.
+        """
+        last_id = 0
+
+        while True:
+            async with self.session_pool() as session:
+                movie_ids = await db_get_movies_without_genres(session, self.batch_size, after=last_id)
+
+            if not movie_ids:
+                return
+
+            logger.info("Fetching the genres of %s stored movies", len(movie_ids))
+            await self._refresh_batch(movie_ids)
+            last_id = movie_ids[-1]
+            await asyncio.sleep(self.batch_delay)
+
+    async def _fetch_changed_ids(self, start: datetime, end: datetime) -> Set[int]:
+        """
+        Reads all pages of the TMDB change feed for the given period.
+
+        Args:
+            start (datetime): The start of the period.
+            end (datetime): The end of the period.
+
+        Returns:
+            Set[int]: The ids of the changed movies.
+        """
+        changed_ids = set()
+        page, total_pages = 1, 1
+
+        while page <= total_pages:
+            response = await self.tmdb_client.movie_changes(start.date(), end.date(), page=page)
+            changed_ids.update(movie["id"] for movie in response["results"])
+            total_pages = response.get("total_pages", 1)
+            page += 1
+
+        return changed_ids
+
+    async def _filter_known_ids(self, changed_ids: Set[int]) -> List[int]:
+        """
+        Selects the changed ids that belong to movies stored in the database.
+
+        Args:
+            changed_ids (Set[int]): The ids of the changed movies.
+
+        Returns:
+            List[int]: The ids of the stored movies among the changed ones.
+        """
+        changed_ids = sorted(changed_ids)
+        movie_ids = []
+
+        async with self.session_pool() as session:
+            for i in range(0, len(changed_ids), LOOKUP_CHUNK_SIZE):
+                movie_ids += await db_get_existing_movie_ids(session, changed_ids[i:i + LOOKUP_CHUNK_SIZE])
+
+        return movie_ids
+
+    async def _refresh_batch(self, movie_ids: List[int]) -> None:
+        """
+        Fetches the details of a batch of movies in every supported language and stores them with their genre masks.
+        The genre mask of a movie is only stored if at least one of its languages was fetched, so the movies
+        whose every request failed are fetched again by the next genre backfill.
+
+        Args:
+            movie_ids (List[int]): The ids of the movies to refresh.
+        """
+        requests = [(movie_id, language) for movie_id in movie_ids for language in Language]
+        responses = await asyncio.gather(
+            *(self.tmdb_client.movie_info(movie_id, language=language.value) for movie_id, language in requests),
+            return_exceptions=True,
+        )
+
+        entries = []
+        genre_masks = {}
+        for (movie_id, language), movie in zip(requests, responses):
+            if isinstance(movie, HTTPError):
+                logger.warning("Failed to refresh movie tmdb_id=%s language=%s: %s", movie_id, language, movie)
+                continue
+            if isinstance(movie, BaseException):
+                raise movie
+
+            genre_masks[movie_id] = genre_mask(genre["id"] for genre in movie["genres"])
+
+            entries.append({
+                "tmdb_id": movie_id,
+                "language": language.value,
+                "title": movie["title"],
+                "original_title": movie["original_title"],
+                "vote_average": movie["vote_average"],
+                "release_date": movie["release_date"] or None,
+                "poster_path": movie["poster_path"],
+            })
+
+        async with self.session_pool() as session:
+            if entries:
+                await db_upsert_movie_metadata(session, entries)
+            if genre_masks:
+                await db_set_movie_genre_masks(session, genre_masks)
+
+    async def _get_watermark(self) -> Optional[datetime]:
+        """
+        Reads the watermark from Redis. A watermark stored without a timezone is in UTC.
+
+        Returns:
+            Optional[datetime]: The end of the last synchronized period, or None if there was no synchronization yet.
+        """
+        value = await self.redis.get(WATERMARK_KEY)
+
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+
+        if not value:
+            return None
+
+        watermark = datetime.fromisoformat(value)
+        return watermark if watermark.tzinfo else watermark.replace(tzinfo=timezone.utc)
+
+    async def _set_watermark(self, value: datetime) -> None:
+        """
+        Stores the watermark in Redis.
+
+        Args:
+            value (datetime): The end of the synchronized period.
+        """
+        await self.redis.set(WATERMARK_KEY, value.isoformat())
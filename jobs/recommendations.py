@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import time
+
+from typing import Any, Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from redis.asyncio import Redis
+from scipy.sparse import csr_matrix
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.requests import db_get_movies_similar_to, db_get_user_movie_pairs, db_replace_movie_similarities
+from utils.logger import setup_logger
+
+
+logger = setup_logger(__name__)
+
+FINGERPRINTS_KEY = "recommendations:fingerprints"
+"""
+Redis hash holding, by movie, the fingerprint of the set of users who saved the movie at the last build.
+"""
+
+LOOKUP_CHUNK_SIZE = 500
+
+
+def fingerprint_columns(matrix: csr_matrix, user_ids: np.ndarray, movie_ids: np.ndarray) -> Dict[str, str]:
+    """
+    Computes a fingerprint of the users of every movie, so the movies whose users changed can be found.
+
+    Args:
+        matrix (csr_matrix): The binary user×movie matrix.
+        user_ids (np.ndarray): The Telegram IDs of the users by row.
+        movie_ids (np.ndarray): The TMDB IDs of the movies by column.
+
+    Returns:
+        Dict[str, str]: The fingerprints by TMDB ID.
+    """
+    columns = matrix.tocsc()
+    columns.sort_indices()
+
+    return {
+        str(movie_id): hashlib.blake2b(
+            user_ids[columns.indices[columns.indptr[j]:columns.indptr[j + 1]]].tobytes(), digest_size=8).hexdigest()
+        for j, movie_id in enumerate(movie_ids)
+    }
+
+
+def build_matrix(pairs: Sequence[Tuple[int, int]]) -> Tuple[csr_matrix, np.ndarray, np.ndarray]:
+    """
+    Builds the binary sparse user×movie matrix of the users' lists.
+
+    Args:
+        pairs (Sequence[Tuple[int, int]]): The pairs of a user and a movie in the user's list.
+
+    Returns:
+        Tuple[csr_matrix, np.ndarray, np.ndarray]: The matrix, the sorted Telegram IDs of its rows
+        and the sorted TMDB IDs of its columns.
+    """
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    user_ids, rows = np.unique(pairs[:, 0], return_inverse=True)
+    movie_ids, columns = np.unique(pairs[:, 1], return_inverse=True)
+
+    matrix = csr_matrix((np.ones(len(pairs), dtype=np.float32), (rows, columns)),
+                        shape=(len(user_ids), len(movie_ids)))
+    matrix.data[:] = 1.0
+
+    return matrix, user_ids, movie_ids
+
+
+def compute_neighbours(matrix: csr_matrix, movie_ids: np.ndarray, targets: Sequence[int],
+                       top_k: int) -> List[Dict[str, Any]]:
+    """
+    Computes the `top_k` most similar movies of the target movies by the cosine similarity of their columns,
+    that is the number of users who saved both movies divided by the geometric mean of their numbers of users.
+
+    Only the rows of the targets are multiplied, so the cost depends on the number of changed movies
+    and not on the size of the catalog.
+
+    Args:
+        matrix (csr_matrix): The binary user×movie matrix.
+        movie_ids (np.ndarray): The sorted TMDB IDs of the columns.
+        targets (Sequence[int]): The TMDB IDs of the movies whose neighbours are computed.
+        top_k (int): The number of neighbours kept per movie.
+
+    Returns:
+        List[Dict[str, Any]]: The neighbours as rows of the `movie_similarity` table.
+    """
+    targets = np.asarray(targets, dtype=np.int64)
+    positions = np.searchsorted(movie_ids, targets[np.isin(targets, movie_ids)])
+    if not len(positions):
+        return []
+
+    columns = matrix.tocsc()
+    norms = np.sqrt(np.asarray(columns.sum(axis=0)).ravel())
+
+    co_occurrence = (columns[:, positions].T @ matrix).tocsr()
+    entries = []
+
+    for i, position in enumerate(positions):
+        start, end = co_occurrence.indptr[i], co_occurrence.indptr[i + 1]
+        neighbours = co_occurrence.indices[start:end]
+        scores = co_occurrence.data[start:end] / (norms[position] * norms[neighbours])
+
+        keep = neighbours != position
+        neighbours, scores = neighbours[keep], scores[keep]
+
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+            neighbours, scores = neighbours[best], scores[best]
+
+        entries.extend(
+            {"movie_tmdb_id": int(movie_ids[position]), "similar_tmdb_id": int(movie_ids[neighbour]),
+             "score": float(score)}
+            for neighbour, score in zip(neighbours, scores)
+        )
+
+    return entries
+
+
+class RecommendationBuilder:
+    """
+    This class is a background job that keeps the item-item similarity table of the recommendations up to date.
+
+    Every run loads the users' lists into a sparse user×movie matrix and compares the users of every movie with
+    the fingerprints stored in Redis at the previous run. Only the movies whose users changed, the movies saved
+    together with them and the movies that had them as neighbours get their neighbours recomputed and replaced.
+    The first run, without fingerprints, builds the whole table.
+    """
+
+    def __init__(self, redis: "Redis[Any]", session_pool: async_sessionmaker, interval: int, top_k: int):
+        """
+        Initializes a new instance of the `RecommendationBuilder` class.
+
+        Args:
+            redis (Redis[Any]): The Redis connection used to store the fingerprints.
+            session_pool (async_sessionmaker): Pool of database sessions.
+            interval (int): The number of seconds between two builds.
+            top_k (int): The number of neighbours kept per movie.
+        """
+        self.redis = redis
+        self.session_pool = session_pool
+        self.interval = interval
+        self.top_k = top_k
+
+    async def run(self) -> None:
+        """
+        Runs the build loop until the task is cancelled.
+        """
+        while True:
+            try:
+                await self.build()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Recommendations build failed")
+
+            await asyncio.sleep(self.interval)
+
+    async def build(self) -> None:
+        """
+        Recomputes the neighbours of the movies affected by the changes of the users' lists since the last build.
+        """
+        start = time.perf_counter()
+
+        async with self.session_pool() as session:
+            pairs = await db_get_user_movie_pairs(session)
+
+        matrix, user_ids, movie_ids = await asyncio.to_thread(build_matrix, pairs)
+        fingerprints = await asyncio.to_thread(fingerprint_columns, matrix, user_ids, movie_ids)
+
+        stored = {key.decode("utf-8") if isinstance(key, bytes) else key:
+                  value.decode("utf-8") if isinstance(value, bytes) else value
+                  for key, value in (await self.redis.hgetall(FINGERPRINTS_KEY)).items()}
+
+        changed = {int(movie_id) for movie_id, value in fingerprints.items() if stored.get(movie_id) != value}
+        removed = {int(movie_id) for movie_id in stored.keys() - fingerprints.keys()}
+        if not changed and not removed:
+            return
+
+        targets = changed | removed
+        targets |= await asyncio.to_thread(self._co_saved, matrix, movie_ids, changed)
+        async with self.session_pool() as session:
+            dirty = sorted(changed | removed)
+            for i in range(0, len(dirty), LOOKUP_CHUNK_SIZE):
+                targets.update(await db_get_movies_similar_to(session, dirty[i:i + LOOKUP_CHUNK_SIZE]))
+
+        targets = sorted(targets)
+        entries = await asyncio.to_thread(compute_neighbours, matrix, movie_ids, targets, self.top_k)
+
+        async with self.session_pool() as session:
+            await db_replace_movie_similarities(session, targets, entries)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if changed:
+                pipe.hset(FINGERPRINTS_KEY, mapping={movie_id: fingerprints[movie_id]
+                                                     for movie_id in map(str, changed)})
+            if removed:
+                pipe.hdel(FINGERPRINTS_KEY, *map(str, removed))
+            await pipe.execute()
+
+        logger.info("Recomputed the neighbours of %s of %s movies in %.3f s, %s changed",
+                    len(targets), len(movie_ids), time.perf_counter() - start, len(changed) + len(removed))
+
+    @staticmethod
+    def _co_saved(matrix: csr_matrix, movie_ids: np.ndarray, movies: Set[int]) -> Set[int]:
+        """
+        Selects the movies saved by at least one user together with any of the given movies.
+
+        Args:
+            matrix (csr_matrix): The binary user×movie matrix.
+            movie_ids (np.ndarray): The sorted TMDB IDs of the columns.
+            movies (Set[int]): The TMDB IDs of the movies.
+
+        Returns:
+            Set[int]: The TMDB IDs of the movies saved together with them.
+        """
+        if not movies:
+            return set()
+
+        positions = np.searchsorted(movie_ids, sorted(movies))
+        users = np.unique(matrix.tocsc()[:, positions].indices)
+        return set(movie_ids[np.unique(matrix[users].indices)].tolist())
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import time
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from utils.logger import setup_logger
+
+
+logger = setup_logger(__name__)
+
+DIALOG_STACK_MARKER = ":aiogd:stack:"
+DIALOG_CONTEXT_MARKER = ":aiogd:context:"
+
+
+def key_family(key: str) -> str:
+    """
+    Returns the family of a Redis key of the bot, the unit of the memory report.
+
+    The FSM keys are split into the dialog stacks, the dialog contexts, the states, the data and the locks,
+    the other keys are grouped by their first segment, e.g. "listview" or "trending".
+
+    Args:
+        key (str): The key.
+
+    Returns:
+        str: The family.
+    """
+    if key.startswith("fsm:"):
+        if DIALOG_STACK_MARKER in key:
+            return "dialog_stack"
+        if DIALOG_CONTEXT_MARKER in key:
+            return "dialog_context"
+        return "fsm_" + key.rsplit(":", 1)[-1]
+
+    if key.startswith("i18n:") and key.endswith(":locale"):
+        return "locale"
+
+    return key.split(":", 1)[0]
+
+
+@dataclass
+class FamilyReport:
+    """
+    The memory used by a family of keys.
+
+    Attributes:
+        keys: Number of keys.
+        bytes: Memory used by the keys as reported by `MEMORY USAGE`, None if the server does not support it.
+        without_ttl: Number of keys that never expire.
+    """
+    keys: int = 0
+    bytes: Optional[int] = 0
+    without_ttl: int = 0
+
+
+class RedisCompactor:
+    """
+    This class is a background job keeping the memory of the Redis database of the bot bounded.
+
+    Every run scans the keys once, in batches of `scan_count`, and
+    - reports the number of keys, the memory and the keys without a TTL of every key family,
+    - sets the configured TTL on the FSM, dialog, locale and list version keys written before the TTLs were configured,
+    - removes the dialog contexts no dialog stack refers to anymore.
+
+    A dialog context is saved before the stack referring to it, so a context is only removed when it was already
+    orphaned in the previous run.
+    """
+
+    def __init__(self, redis: "Redis[Any]", interval: float, scan_count: int, ttls: Dict[str, Optional[int]]):
+        """
+        Initializes a new instance of the `RedisCompactor` class.
+
+        Args:
+            redis (Redis[Any]): The Redis connection.
+            interval (float): The number of seconds between two runs.
+            scan_count (int): The number of keys read by every `SCAN` step.
+            ttls (Dict[str, Optional[int]]): The TTLs set on the keys without one by key family, None keeps
+                the keys of a family forever.
+        """
+        self.redis = redis
+        self.interval = interval
+        self.scan_count = scan_count
+        self.ttls = {family: ttl for family, ttl in ttls.items() if ttl}
+        self.report: Dict[str, FamilyReport] = {}
+        self._orphans: Set[str] = set()
+        self._memory_usage = True
+
+    async def run(self) -> None:
+        """
+        Runs the compaction loop until the task is cancelled.
+        """
+        while True:
+            try:
+                await self.compact()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Redis compaction failed")
+
+            await asyncio.sleep(self.interval)
+
+    async def compact(self) -> Dict[str, FamilyReport]:
+        """
+        Scans the keys once, reporting their memory, setting the missing TTLs and removing the orphaned contexts.
+
+        Returns:
+            Dict[str, FamilyReport]: The report by key family.
+        """
+        start = time.perf_counter()
+        report: Dict[str, FamilyReport] = defaultdict(FamilyReport)
+        contexts: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        stacks: Dict[str, List[str]] = defaultdict(list)
+        expired = 0
+
+        async for keys in self._scan():
+            families = [key_family(key) for key in keys]
+            ttls, sizes = await self._inspect(keys)
+
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, family, ttl, size in zip(keys, families, ttls, sizes):
+                    family_report = report[family]
+                    family_report.keys += 1
+                    family_report.bytes = None if size is None or family_report.bytes is None \
+                        else family_report.bytes + size
+
+                    if ttl == -1 and family in self.ttls:
+                        pipe.expire(key, self.ttls[family])
+                        expired += 1
+                    elif ttl == -1:
+                        family_report.without_ttl += 1
+
+                    if family == "dialog_context":
+                        owner, _, rest = key.partition(DIALOG_CONTEXT_MARKER)
+                        contexts[owner].append((key, rest.rsplit(":", 1)[0]))
+                    elif family == "dialog_stack":
+                        stacks[key.partition(DIALOG_STACK_MARKER)[0]].append(key)
+
+                await pipe.execute()
+
+        removed = await self._remove_orphans(contexts, stacks)
+
+        self.report = dict(report)
+        logger.info("Redis compaction done in %.3f s: %s TTLs set, %s orphaned dialog contexts removed, %s",
+                    time.perf_counter() - start, expired, removed,
+                    ", ".join(f"{family}={item.keys} keys/{item.bytes if item.bytes is not None else '?'} B/"
+                              f"{item.without_ttl} without TTL" for family, item in sorted(self.report.items())))
+
+        return self.report
+
+    async def _scan(self):
+        """
+        Iterates over the keys of the database in batches.
+
+        Yields:
+            List[str]: The keys of a `SCAN` step.
+        """
+        cursor = 0
+        while True:
+            cursor, keys = await self.redis.scan(cursor, count=self.scan_count)
+            if keys:
+                yield [key.decode("utf-8") if isinstance(key, bytes) else key for key in keys]
+            if not cursor:
+                return
+
+    async def _inspect(self, keys: List[str]) -> Tuple[List[int], List[Optional[int]]]:
+        """
+        Reads the TTLs and the memory usage of keys in a single round trip.
+
+        Args:
+            keys (List[str]): The keys.
+
+        Returns:
+            Tuple[List[int], List[Optional[int]]]: The TTLs of the keys, -1 for the keys without one,
+            and their memory usage, None if the server does not report it.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.ttl(key)
+                if self._memory_usage:
+                    pipe.memory_usage(key)
+            results = await pipe.execute(raise_on_error=False)
+
+        if not self._memory_usage:
+            return results, [None] * len(keys)
+
+        ttls, sizes = results[0::2], results[1::2]
+        if any(isinstance(size, ResponseError) for size in sizes):
+            logger.info("The Redis server does not support MEMORY USAGE, the memory is not reported")
+            self._memory_usage = False
+            return ttls, [None] * len(keys)
+
+        return ttls, sizes
+
+    async def _remove_orphans(self, contexts: Dict[str, List[Tuple[str, str]]],
+                              stacks: Dict[str, List[str]]) -> int:
+        """
+        Removes the dialog contexts no dialog stack of their chat refers to in this run and the previous one.
+
+        Args:
+            contexts (Dict[str, List[Tuple[str, str]]]): The keys and the intent IDs of the contexts by chat prefix.
+            stacks (Dict[str, List[str]]): The keys of the stacks by chat prefix.
+
+        Returns:
+            int: The number of removed contexts.
+        """
+        orphans: Set[str] = set()
+
+        for owner, owner_contexts in contexts.items():
+            intents: Set[str] = set()
+            if stacks.get(owner):
+                for value in await self.redis.mget(stacks[owner]):
+                    if value:
+                        intents.update(json.loads(value).get("intents", []))
+
+            orphans.update(key for key, intent_id in owner_contexts if intent_id not in intents)
+
+        confirmed = orphans & self._orphans
+        self._orphans = orphans - confirmed
+
+        if confirmed:
+            await self.redis.delete(*confirmed)
+
+        return len(confirmed)
@@ -0,0 +1,257 @@
+import asyncio
+import time
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from html import escape
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError, TelegramNotFound, \
+    TelegramRetryAfter
+from aiogram_i18n.cores import FluentRuntimeCore
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database.models import Reminder
+from database.requests import db_delete_reminders, db_get_due_reminders, db_get_movies_titles, \
+    db_get_next_reminder_time
+from utils.logger import setup_logger
+from utils.rate_limiter import BOT_SEND_RATE_KEY, RateLimitExceeded, RedisTokenBucket
+from utils.redis_manager import RedisManager
+
+
+logger = setup_logger(__name__)
+
+SLOT_SECONDS = 60
+"""
+The length in seconds of the time slots of the scheduler. The reminders due in a slot are sent together
+when the slot starts, one message per user.
+"""
+
+
+def reminder_fire_time(release_date: str, days_before: int, hour: int) -> datetime:
+    """
+    Computes the time a release reminder is due.
+
+    Args:
+        release_date (str): The release date of the movie in YYYY-MM-DD format.
+        days_before (int): The number of days before the release the reminder is sent.
+        hour (int): The hour of the day, in UTC, reminders are sent at.
+
+    Returns:
+        datetime: The naive UTC time the reminder is due.
+    """
+    release = datetime.strptime(release_date, "%Y-%m-%d")
+    return release - timedelta(days=days_before) + timedelta(hours=hour)
+
+
+def utcnow() -> datetime:
+    """
+    Returns the current naive UTC time, as the reminder times are stored.
+
+    Returns:
+        datetime: The current time.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class ReminderScheduler:
+    """
+    This class is a background job sending the release reminders of the users.
+
+    The reminders are stored in the database, indexed by the time they are due, so they survive restarts.
+    The scheduler sleeps until the start of the slot of the earliest reminder, or until `wake` is called
+    because a reminder was set, and never longer than `max_sleep` seconds. When it wakes up it sends every
+    reminder due in the current slot, merging the reminders of a user into a single message, so a chat gets
+    at most one message per slot. The messages of all users share a token bucket of `rate` messages per second
+    below the global limit of the Bot API.
+    """
+
+    def __init__(self, redis: "Redis[Any]", session_pool: async_sessionmaker, core: FluentRuntimeCore,
+                 default_locale: str, batch_size: int, max_sleep: float, rate: float):
+        """
+        Initializes a new instance of the `ReminderScheduler` class.
+
+        Args:
+            redis (Redis[Any]): The Redis connection holding the user locales and the send budget.
+            session_pool (async_sessionmaker): Pool of database sessions.
+            core (FluentRuntimeCore): The Fluent core translating the reminders.
+            default_locale (str): The locale of the users who have not chosen one.
+            batch_size (int): The number of due reminders loaded at once.
+            max_sleep (float): The largest number of seconds the scheduler sleeps.
+            rate (float): The number of messages the bot sends per second on its own.
+        """
+        self.session_pool = session_pool
+        self.core = core
+        self.locales = RedisManager(redis, default_locale)
+        self.batch_size = batch_size
+        self.max_sleep = max_sleep
+        self.rate = rate
+        self.limiter = RedisTokenBucket(redis, BOT_SEND_RATE_KEY, rate=rate, capacity=max(1, int(rate)),
+                                        max_wait=max_sleep)
+        self._wake = asyncio.Event()
+
+    def wake(self) -> None:
+        """
+        Wakes the scheduler up, so a reminder due earlier than the ones it waits for is not missed.
+        """
+        self._wake.set()
+
+    async def run(self, bot: Bot) -> None:
+        """
+        Runs the scheduler loop until the task is cancelled.
+
+        Args:
+            bot (Bot): The bot sending the reminders.
+        """
+        while True:
+            self._wake.clear()
+
+            try:
+                delay = await self.tick(bot)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Sending reminders failed")
+                delay = self.max_sleep
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def tick(self, bot: Bot) -> float:
+        """
+        Sends the reminders due in the current slot.
+
+        Args:
+            bot (Bot): The bot sending the reminders.
+
+        Returns:
+            float: The number of seconds until the slot of the next reminder, at most `max_sleep`.
+            The reminders left unsent are retried in the next slot.
+        """
+        start = time.perf_counter()
+        slot_end = datetime.fromtimestamp((time.time() // SLOT_SECONDS + 1) * SLOT_SECONDS, timezone.utc)
+        slot_end = slot_end.replace(tzinfo=None)
+        sent = 0
+
+        while True:
+            async with self.session_pool() as session:
+                due = await db_get_due_reminders(session, until=slot_end, limit=self.batch_size)
+            if not due:
+                break
+
+            done = await self._send_batch(bot, due)
+            async with self.session_pool() as session:
+                await db_delete_reminders(session, done)
+
+            sent += len(done)
+            if len(done) < len(due) or len(due) < self.batch_size:
+                break
+
+        if sent:
+            logger.info("Sent %s reminders in %.3f s", sent, time.perf_counter() - start)
+
+        async with self.session_pool() as session:
+            next_time = await db_get_next_reminder_time(session)
+
+        if next_time is None:
+            return self.max_sleep
+
+        return min(self.max_sleep, max(0.0, (max(next_time, slot_end) - utcnow()).total_seconds()))
+
+    async def _send_batch(self, bot: Bot, reminders: List[Reminder]) -> List[Tuple[int, int]]:
+        """
+        Sends a batch of reminders, one message per user.
+
+        Args:
+            bot (Bot): The bot sending the reminders.
+            reminders (List[Reminder]): The due reminders.
+
+        Returns:
+            List[Tuple[int, int]]: The keys of the reminders that were sent or can never be sent,
+            such as the reminders of users who blocked the bot. The others stay for the next slot.
+        """
+        by_user: Dict[int, List[Reminder]] = defaultdict(list)
+        for reminder in reminders:
+            by_user[reminder.user_tg_id].append(reminder)
+
+        locales = await self.locales.get_locales_by_user_ids(by_user)
+
+        titles: Dict[str, Dict[int, Any]] = {}
+        async with self.session_pool() as session:
+            for locale in set(locales.values()):
+                titles[locale] = await db_get_movies_titles(
+                    session, [reminder.movie_tmdb_id for user_id, user_reminders in by_user.items()
+                              if locales[user_id] == locale for reminder in user_reminders], language=locale)
+
+        semaphore = asyncio.Semaphore(max(1, int(self.rate)))
+
+        async def send(user_id: int, user_reminders: List[Reminder]) -> Optional[List[Tuple[int, int]]]:
+            text = self._render(user_reminders, locales[user_id], titles[locales[user_id]])
+            async with semaphore:
+                if not await self._send(bot, user_id, text):
+                    return None
+
+            return [(user_id, reminder.movie_tmdb_id) for reminder in user_reminders]
+
+        results = await asyncio.gather(*(send(user_id, user_reminders) for user_id, user_reminders in by_user.items()))
+        return [key for keys in results if keys for key in keys]
+
+    async def _send(self, bot: Bot, user_id: int, text: str) -> bool:
+        """
+        Sends a reminder message within the send budget, waiting as long as the Bot API asks on flood errors.
+
+        Args:
+            bot (Bot): The bot sending the message.
+            user_id (int): The Telegram ID of the user.
+            text (str): The text of the message.
+
+        Returns:
+            bool: False if the message should be retried in a later slot, after a network or a server error.
+        """
+        for _ in range(3):
+            try:
+                await self.limiter.acquire()
+                await bot.send_message(user_id, text)
+                return True
+            except RateLimitExceeded:
+                return False
+            except TelegramRetryAfter as e:
+                logger.warning("Reminder to user tg_id=%s throttled for %s s", user_id, e.retry_after)
+                await asyncio.sleep(e.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest, TelegramNotFound):
+                logger.warning("Reminder to user tg_id=%s can never be sent", user_id, exc_info=True)
+                return True
+            except TelegramAPIError:
+                logger.warning("Failed to send a reminder to user tg_id=%s, retrying in the next slot", user_id,
+                               exc_info=True)
+                return False
+
+        return False
+
+    def _render(self, reminders: List[Reminder], locale: str, titles: Dict[int, Any]) -> str:
+        """
+        Renders the message of the reminders of a user.
+
+        Args:
+            reminders (List[Reminder]): The due reminders of the user.
+            locale (str): The locale of the user.
+            titles (Dict[int, Any]): The titles of the movies by TMDB ID.
+
+        Returns:
+            str: The text of the message.
+        """
+        today = utcnow().date()
+        lines = [self.core.get("reminder", locale)]
+
+        for reminder in sorted(reminders, key=lambda item: item.release_date):
+            release = datetime.strptime(reminder.release_date, "%Y-%m-%d").date()
+            title = titles[reminder.movie_tmdb_id].title if reminder.movie_tmdb_id in titles \
+                else str(reminder.movie_tmdb_id)
+            days = self.core.get("reminder-days", locale, days=max(0, (release - today).days))
+            lines.append(f"🎬 <b>{escape(title)}</b> {release.strftime('%d.%m.%Y')}, {days}")
+
+        return "\n".join(lines)
@@ -114,6 +114,10 @@ greeting-message =
     /start - start command 🏁
     /random - get random unwatched movie from your list 🍿
     /movies_on_genre - get movies by genre or genres 📼
+    /find - find a movie in your list 🔎
+    /recommend - movies saved by users with similar taste 🤝
+    /stats - statistics of your list 📊
+    /trending - movies trending among our users 🔥
 
 choose-genre =
     For which genres would you like to see the list of movies? 😌
@@ -126,4 +130,95 @@ found-movies =
 no-found-movies =
     Oops! We didn't find movies that match your criterias 😓
 add-movie =
-    Add movie 🎬
\ No newline at end of file
+    Add movie 🎬
+tmdb-unavailable =
+    The movie service is not responding right now 😓 Please, try again in a minute ⏳
+command-find =
+    Find a movie in your list 🔎
+find-usage =
+    Type what you are looking for after the command, e.g. /find matrix 🔎
+search-results =
+    Here are the movies from your list matching your search ⬇️
+no-search-results =
+    Oops! No movies in your list match your search 😓
+command-recommend =
+    Movies saved by users with similar taste 🤝
+recommendations =
+    Users who saved the movies from your list also saved these ⬇️
+no-recommendations =
+    We don't have recommendations for you yet 😓 Add more movies to your list and come back later!
+filter-genres =
+    Filter by genres 🎭
+reset-filter =
+    ✖️ Show all movies
+no-movies-with-genres =
+    None of the movies in your list has all the chosen genres 😓
+command-stats =
+    Statistics of your list 📊
+no-stats =
+    Your list is empty, so there are no statistics yet 📊 Add some movies first!
+stats-summary =
+    <b>Your list in numbers</b> 📊
+
+    🎬 Saved: { $saved }
+    ✅ Watched: { $watched }
+    ⭐️ Average rating: { $average } of { $rated } rated
+stats-ratings =
+    <b>Your ratings</b>
+stats-genres =
+    <b>Top genres</b>
+stats-months =
+    <b>Movies added by month</b>
+command-trending =
+    Movies trending among our users 🔥
+trending-day =
+    The movies our users saved and watched the most today 🔥
+trending-week =
+    The movies our users saved and watched the most this week 🔥
+no-trending =
+    Nothing is trending yet 😓 Come back later!
+show-trending-day =
+    📅 Today
+show-trending-week =
+    🗓 This week
+set-reminder =
+    🔔 Remind me about the release
+change-reminder =
+    🔔 Change the reminder
+choose-reminder =
+    When should I remind you about the release? 🔔
+reminder-option =
+    { $days ->
+        [0] On the release day
+        [one] { $days } day before
+       *[other] { $days } days before
+    }
+cancel-reminder =
+    🔕 Cancel the reminder
+reminder-set =
+    I will remind you 🔔
+reminder =
+    🔔 Coming to the screens soon:
+reminder-days =
+    { $days ->
+        [0] today!
+        [one] in { $days } day
+       *[other] in { $days } days
+    }
+broadcast-usage =
+    Send the ID of a message of the locale files after the command, e.g. /broadcast broadcast-maintenance
+broadcast-unknown-message =
+    The message { $message_id } is missing from a locale 😓
+broadcast-running =
+    Another broadcast is running, see /broadcast_status or stop it with /broadcast_cancel
+broadcast-started =
+    Broadcast { $broadcast_id } started 📣 See /broadcast_status
+broadcast-none =
+    There is no broadcast running 📣
+broadcast-status =
+    Broadcast { $broadcast_id } of { $message_id }: { $status }
+    Sent: { $sent }, failed: { $failed }
+broadcast-cancelled =
+    The broadcast is cancelled 📣
+broadcast-maintenance =
+    🛠 The bot will be down for maintenance for a few minutes. Thank you for your patience!
\ No newline at end of file
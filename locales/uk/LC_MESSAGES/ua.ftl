@@ -114,6 +114,10 @@ greeting-message =
     /start - команда-старт 🏁
     /random - отримати випадковий неперглянутий фільм із твого списку 🍿
     /movies_on_genre - знайти фільми за жанрами 🎥
+    /find - знайти фільм у своєму списку 🔎
+    /recommend - фільми від користувачів зі схожими смаками 🤝
+    /stats - статистика вашого списку 📊
+    /trending - фільми, популярні серед наших користувачів 🔥
 choose-genre =
     За якими жанрами ви хотіли би побачити список фільмів? 😌
 command-movies-on-genre =
@@ -125,4 +129,97 @@ found-movies =
 no-found-movies =
     Ой! Нажаль, ми не знайшли фільми, які задовольняють ваші критерії 😓
 add-movie =
-    Додати фільм 🎬
\ No newline at end of file
+    Додати фільм 🎬
+tmdb-unavailable =
+    Сервіс фільмів зараз не відповідає 😓 Будь ласка, спробуйте ще раз за хвилину ⏳
+command-find =
+    Знайти фільм у своєму списку 🔎
+find-usage =
+    Напишіть після команди, що шукаєте, наприклад /find matrix 🔎
+search-results =
+    Фільми з вашого списку, які відповідають пошуку ⬇️
+no-search-results =
+    Ой! У вашому списку немає фільмів, які відповідають пошуку 😓
+command-recommend =
+    Фільми від користувачів зі схожими смаками 🤝
+recommendations =
+    Користувачі, які зберегли фільми з вашого списку, також зберегли ці ⬇️
+no-recommendations =
+    Поки що у нас немає рекомендацій для вас 😓 Додайте більше фільмів до списку та поверніться пізніше!
+filter-genres =
+    Фільтр за жанрами 🎭
+reset-filter =
+    ✖️ Показати всі фільми
+no-movies-with-genres =
+    Жоден фільм у вашому списку не має всіх обраних жанрів 😓
+command-stats =
+    Статистика вашого списку 📊
+no-stats =
+    Ваш список порожній, тож статистики ще немає 📊 Спершу додайте кілька фільмів!
+stats-summary =
+    <b>Ваш список у цифрах</b> 📊
+
+    🎬 Збережено: { $saved }
+    ✅ Переглянуто: { $watched }
+    ⭐️ Середня оцінка: { $average } з { $rated } оцінених
+stats-ratings =
+    <b>Ваші оцінки</b>
+stats-genres =
+    <b>Топ жанрів</b>
+stats-months =
+    <b>Додано фільмів за місяцями</b>
+command-trending =
+    Фільми, популярні серед наших користувачів 🔥
+trending-day =
+    Фільми, які наші користувачі найбільше зберігали й дивились сьогодні 🔥
+trending-week =
+    Фільми, які наші користувачі найбільше зберігали й дивились цього тижня 🔥
+no-trending =
+    Поки що нічого не в тренді 😓 Завітайте пізніше!
+show-trending-day =
+    📅 Сьогодні
+show-trending-week =
+    🗓 Цього тижня
+set-reminder =
+    🔔 Нагадати про вихід
+change-reminder =
+    🔔 Змінити нагадування
+choose-reminder =
+    Коли вам нагадати про вихід фільму? 🔔
+reminder-option =
+    { $days ->
+        [0] У день виходу
+        [one] За { $days } день
+        [few] За { $days } дні
+       *[other] За { $days } днів
+    }
+cancel-reminder =
+    🔕 Скасувати нагадування
+reminder-set =
+    Я нагадаю вам 🔔
+reminder =
+    🔔 Незабаром на екранах:
+reminder-days =
+    { $days ->
+        [0] сьогодні!
+        [one] через { $days } день
+        [few] через { $days } дні
+       *[other] через { $days } днів
+    }
+broadcast-usage =
+    Надішліть після команди ID повідомлення з файлів локалізації, наприклад /broadcast broadcast-maintenance
+broadcast-unknown-message =
+    Повідомлення { $message_id } відсутнє в одній з локалізацій 😓
+broadcast-running =
+    Інша розсилка ще триває, дивіться /broadcast_status або зупиніть її командою /broadcast_cancel
+broadcast-started =
+    Розсилку { $broadcast_id } розпочато 📣 Дивіться /broadcast_status
+broadcast-none =
+    Зараз немає розсилки 📣
+broadcast-status =
+    Розсилка { $broadcast_id } повідомлення { $message_id }: { $status }
+    Надіслано: { $sent }, помилок: { $failed }
+broadcast-cancelled =
+    Розсилку скасовано 📣
+broadcast-maintenance =
+    🛠 Бот буде недоступний кілька хвилин через технічні роботи. Дякуємо за терпіння!
\ No newline at end of file
@@ -0,0 +1,154 @@
+import asyncio
+import random
+import time
+
+from typing import Dict, Optional, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+
+from utils.logger import setup_logger
+from utils.metrics import bot_api_errors, bot_api_latency, bot_api_retries
+
+
+logger = setup_logger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({
+    "EditMessageText", "EditMessageCaption", "EditMessageMedia", "EditMessageReplyMarkup",
+    "DeleteMessage", "SetMyCommands", "DeleteMyCommands", "SetChatMenuButton", "DeleteWebhook",
+})
+"""
+The Bot API methods, besides the `get*` ones, whose repetition has the same effect as a single call,
+so they are retried after network and server errors, which may happen after Telegram executed them.
+"""
+
+MAX_PAUSED_CHATS = 1000
+"""
+The number of chats under flood control above which the pauses that are over are forgotten.
+"""
+
+
+def is_idempotent(method: TelegramMethod) -> bool:
+    """
+    Checks whether a Bot API method may be sent twice.
+
+    :param method: Bot API method.
+    :return: True if repeating the method has no further effect.
+    """
+    name = type(method).__name__
+    return name.startswith("Get") or name in IDEMPOTENT_METHODS
+
+
+class BotApiRetryMiddleware(BaseRequestMiddleware):
+    """
+    Bot session middleware retrying the Bot API calls and recording their latency by method.
+
+    A `retry_after` answer means Telegram did not execute the call, so every method is retried after
+    the time Telegram asks, as long as it is at most `max_retry_after` seconds. Longer waits are raised
+    to the caller, such as the broadcaster pausing its workers. The pause also delays the other calls
+    to the same chat, which would be throttled as well. Network and server errors are retried
+    with jittered exponential backoff only for idempotent methods, a message may have been sent
+    before the connection broke.
+
+    Attributes:
+        max_retries: Number of retries of a call.
+        max_retry_after: Largest number of seconds a call waits for flood control before the error is raised.
+        backoff: Number of seconds before the first retry after a network or server error, doubled on every retry.
+        backoff_max: Largest number of seconds between two retries after network or server errors.
+    """
+
+    def __init__(self, max_retries: int, max_retry_after: float, backoff: float, backoff_max: float = 10.0):
+        """
+        Initialize the middleware.
+
+        :param max_retries: Number of retries of a call.
+        :param max_retry_after: Largest number of seconds a call waits for flood control before the error is raised.
+        :param backoff: Number of seconds before the first retry after a network or server error.
+        :param backoff_max: Largest number of seconds between two retries after network or server errors.
+        """
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self._paused_until: Dict[Optional[Union[int, str]], float] = {}
+
+    def _pause(self, chat_id: Optional[Union[int, str]], until: float) -> None:
+        """
+        Pauses the calls to a chat, forgetting the pauses that are over once there are many of them.
+
+        :param chat_id: ID of the chat under flood control, None for the whole bot.
+        :param until: Event loop time the pause ends at.
+        """
+        if len(self._paused_until) > MAX_PAUSED_CHATS:
+            now = asyncio.get_running_loop().time()
+            self._paused_until = {chat: end for chat, end in self._paused_until.items() if end > now}
+
+        self._paused_until[chat_id] = max(self._paused_until.get(chat_id, 0.0), until)
+
+    async def _wait_for_chat(self, chat_id: Optional[Union[int, str]]) -> None:
+        """
+        Waits until the flood control of a chat, or of the whole bot, is over.
+
+        :param chat_id: ID of the chat the call is sent to.
+        """
+        loop = asyncio.get_running_loop()
+        paused_until = max(self._paused_until.get(chat_id, 0.0), self._paused_until.get(None, 0.0))
+
+        if paused_until > loop.time():
+            await asyncio.sleep(paused_until - loop.time())
+        elif chat_id in self._paused_until:
+            del self._paused_until[chat_id]
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        """
+        Asynchronously make the request, retrying it on flood control and, if idempotent, on transient errors.
+
+        :param make_request: Next middleware in the chain or the request itself.
+        :param bot: Bot instance making the request.
+        :param method: Bot API method.
+        :return: Response of the Bot API.
+        """
+        name = type(method).__name__
+        chat_id = getattr(method, "chat_id", None)
+        loop = asyncio.get_running_loop()
+
+        attempt = 0
+        while True:
+            await self._wait_for_chat(chat_id)
+
+            backoff = 0.0
+            start = time.perf_counter()
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                bot_api_errors.inc(name, type(e).__name__)
+                if attempt == self.max_retries or e.retry_after > self.max_retry_after:
+                    raise
+
+                self._pause(chat_id, loop.time() + e.retry_after)
+                bot_api_retries.inc(name, type(e).__name__)
+                logger.warning("Bot API call %s to chat %s throttled for %s s", name, chat_id, e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                bot_api_errors.inc(name, type(e).__name__)
+                if attempt == self.max_retries or not is_idempotent(method):
+                    raise
+
+                bot_api_retries.inc(name, type(e).__name__)
+                delay = min(self.backoff_max, self.backoff * 2 ** attempt)
+                backoff = random.uniform(delay / 2, delay)
+            except TelegramAPIError as e:
+                bot_api_errors.inc(name, type(e).__name__)
+                raise
+            finally:
+                bot_api_latency.observe(time.perf_counter() - start, name)
+
+            await asyncio.sleep(backoff)
+            attempt += 1
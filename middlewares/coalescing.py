@@ -0,0 +1,133 @@
+import asyncio
+
+from itertools import count
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import CallbackQuery, TelegramObject, Update
+from aiogram_dialog import ShowMode
+from aiogram_dialog.utils import remove_intent_id
+
+from middlewares.fsm import register_before_fsm
+from utils.metrics import callbacks_coalesced
+
+
+COALESCED_WIDGETS = frozenset({"arrow_left", "arrow_right", "sorting_type", "sorting_order"})
+"""
+The ids of the buttons whose clicks only change the state of the window they are on, so rendering the window
+for a click followed by another one is wasted.
+"""
+
+
+def get_coalescing_key(callback: CallbackQuery) -> Optional[Tuple[int, int]]:
+    """
+    Builds the key of the burst a callback query belongs to.
+
+    :param callback: Callback query.
+    :return: Telegram ID of the user and ID of the message clicked, or None if the click is never coalesced.
+    """
+    if not callback.data or not callback.message:
+        return None
+
+    _, widget_data = remove_intent_id(callback.data)
+    if widget_data.split(":")[0] not in COALESCED_WIDGETS:
+        return None
+
+    return callback.from_user.id, callback.message.message_id
+
+
+class CallbackCoalescingMiddleware(BaseMiddleware):
+    """
+    Middleware collapsing a burst of navigation clicks of a user on a message into a single render.
+
+    Every click still changes the state of the window, in order, but a click followed by a newer one
+    on the same message skips the render of the window, the getter included, and is answered at once.
+    The newest click renders the final state. A click arriving while an earlier one of its burst
+    is being handled waits `window` seconds before queueing for the user's lock, so the clicks following it
+    shortly can supersede it.
+
+    It is an update middleware registered outside the event isolation, so it sees the clicks waiting for
+    the lock, and a callback query middleware deciding whether the dialog renders.
+
+    Attributes:
+        window: Number of seconds a click of a burst in progress waits for a newer one.
+    """
+
+    def __init__(self, window: float):
+        """
+        Initialize the middleware.
+
+        :param window: Number of seconds a click of a burst in progress waits for a newer one.
+        """
+        self.window = window
+        self._sequence = count(1)
+        self._latest: Dict[Tuple[int, int], int] = {}
+        self._in_flight: Dict[Tuple[int, int], int] = {}
+
+    def setup(self, dp: Dispatcher) -> None:
+        """
+        Registers the middleware on a dispatcher, after `setup_dialogs`.
+
+        :param dp: Dispatcher.
+        """
+        register_before_fsm(dp, self)
+        dp.callback_query.middleware(self.skip_superseded_render)
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any],
+    ) -> Any:
+        """
+        Asynchronously call the middleware.
+
+        This method numbers the navigation clicks of every message, so a click knows whether a newer one arrived.
+
+        :param handler: Callable to be invoked.
+        :param event: Telegram update.
+        :param data: Dictionary to store data.
+        :return: Result of the handler call.
+        """
+        key = get_coalescing_key(event.callback_query) if event.callback_query else None
+        if key is None:
+            return await handler(event, data)
+
+        sequence = self._latest[key] = next(self._sequence)
+        data["callback_superseded"] = lambda: self._latest.get(key) != sequence
+
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        try:
+            if self._in_flight[key] > 1 and self.window:
+                await asyncio.sleep(self.window)
+
+            return await handler(event, data)
+        finally:
+            self._in_flight[key] -= 1
+            if not self._in_flight[key]:
+                del self._in_flight[key]
+                del self._latest[key]
+
+    async def skip_superseded_render(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        """
+        Asynchronously call the handler of a callback query, without rendering the dialog if the click
+        was superseded.
+
+        :param handler: Callable to be invoked.
+        :param event: Callback query.
+        :param data: Dictionary to store data.
+        :return: Result of the handler call.
+        """
+        superseded = data.get("callback_superseded")
+        dialog_manager = data.get("dialog_manager")
+
+        if superseded and dialog_manager and superseded():
+            dialog_manager.show_mode = ShowMode.NO_UPDATE
+            callbacks_coalesced.inc()
+
+        return await handler(event, data)
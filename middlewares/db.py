@@ -5,6 +5,8 @@ from aiogram.types import TelegramObject
 
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from utils.tracing import span
+
 
 class DataBaseSession(BaseMiddleware):
     """
@@ -32,12 +34,14 @@ class DataBaseSession(BaseMiddleware):
         Asynchronously call the middleware.
 
         This method adds a database session to the data dictionary and then calls the handler.
+        The work is recorded as the `middleware.DataBaseSession` span of the current trace.
 
         :param handler: Callable to be invoked.
         :param event: Telegram event.
         :param data: Dictionary to store data.
         :return: Result of the handler call.
         """
-        async with self.session_pool() as session:
-            data['session'] = session
-            return await handler(event, data)
+        with span("middleware.DataBaseSession"):
+            async with self.session_pool() as session:
+                data['session'] = session
+                return await handler(event, data)
@@ -0,0 +1,25 @@
+from aiogram import BaseMiddleware, Dispatcher
+
+
+def register_before_fsm(dp: Dispatcher, middleware: BaseMiddleware) -> None:
+    """
+    Registers an update middleware right before the FSM middleware of a dispatcher, which takes the lock of the user.
+
+    The middleware then runs outside the event isolation, while the middlewares registered after the FSM one,
+    which read the FSM state, stay inside it. The middleware manager only appends, so the FSM middleware
+    and the ones after it are registered again after the new one.
+
+    :param dp: Dispatcher.
+    :param middleware: Update middleware.
+    """
+    manager = dp.update.outer_middleware
+    registered = list(manager)
+    inner = registered[registered.index(dp.fsm):]
+
+    for item in inner:
+        manager.unregister(item)
+
+    manager(middleware)
+
+    for item in inner:
+        manager(item)
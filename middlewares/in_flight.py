@@ -0,0 +1,77 @@
+import asyncio
+
+from typing import Any, Awaitable, Callable, Dict, Set
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from utils.logger import setup_logger
+
+
+logger = setup_logger(__name__)
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """
+    Middleware tracking the updates being handled, so the shutdown can wait for them.
+
+    It is registered outside the event isolation, so the updates waiting for the lock of their user
+    are tracked as well.
+
+    Attributes:
+        drain_timeout: Number of seconds the shutdown waits for the updates being handled.
+        tasks: Tasks handling an update right now.
+    """
+
+    def __init__(self, drain_timeout: float):
+        """
+        Initialize the middleware.
+
+        :param drain_timeout: Number of seconds the shutdown waits for the updates being handled.
+        """
+        self.drain_timeout = drain_timeout
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        """
+        Asynchronously call the middleware.
+
+        This method remembers the task handling the update until the handler returns.
+
+        :param handler: Callable to be invoked.
+        :param event: Telegram update.
+        :param data: Dictionary to store data.
+        :return: Result of the handler call.
+        """
+        task = asyncio.current_task()
+        self.tasks.add(task)
+        try:
+            return await handler(event, data)
+        finally:
+            self.tasks.discard(task)
+
+    async def drain(self) -> None:
+        """
+        Waits for the updates being handled, as a shutdown handler of the dispatcher.
+
+        Polling has already stopped when the shutdown handlers run, so no new updates arrive.
+        The handlers still running after `drain_timeout` seconds are cancelled.
+        """
+        current = asyncio.current_task()
+        tasks = {task for task in self.tasks if task is not current}
+        if not tasks:
+            return
+
+        logger.info("Waiting for %s updates being handled", len(tasks))
+        _, pending = await asyncio.wait(tasks, timeout=self.drain_timeout)
+
+        if pending:
+            logger.warning("Cancelling %s updates still handled after %.1f s", len(pending), self.drain_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.wait(pending)
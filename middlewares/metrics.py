@@ -0,0 +1,147 @@
+import time
+
+from typing import Any, Awaitable, Callable, Collection, Dict, FrozenSet
+
+from aiogram import BaseMiddleware, Dispatcher, Router
+from aiogram.filters import Command
+from aiogram.types import BotCommand, TelegramObject, Update
+from aiogram_dialog.utils import remove_intent_id
+
+from middlewares.fsm import register_before_fsm
+from utils.metrics import UpdateStats, current_stats, update_latency, update_errors, sql_statements, tmdb_calls, \
+    redis_commands
+
+
+def collect_commands(router: Router) -> FrozenSet[str]:
+    """
+    Collects the commands the message handlers of a router and its sub-routers are registered for.
+
+    :param router: Router.
+    :return: Commands with their slash, e.g. "/start".
+    """
+    commands = set()
+
+    for item in router.chain_tail:
+        for handler in item.message.handlers:
+            for handler_filter in handler.filters or ():
+                if isinstance(handler_filter.callback, Command):
+                    commands.update(f"/{command.command if isinstance(command, BotCommand) else command}"
+                                    for command in handler_filter.callback.commands
+                                    if isinstance(command, (str, BotCommand)))
+
+    return frozenset(commands)
+
+
+def get_handler_label(update: Update, commands: Collection[str] = frozenset()) -> str:
+    """
+    Builds a low-cardinality name of the handler an update is routed to.
+
+    Registered commands are labeled by the command and the other ones as "command:other", dialog callbacks
+    by the id of the clicked widget and every other update by its type.
+
+    :param update: Telegram update.
+    :param commands: Registered commands, with their slash.
+    :return: Name of the handler.
+    """
+    if update.message and update.message.text and update.message.text.startswith("/"):
+        command = update.message.text.split()[0].split("@")[0]
+        return f"command:{command}" if command in commands else "command:other"
+
+    if update.callback_query and update.callback_query.data:
+        _, widget_data = remove_intent_id(update.callback_query.data)
+        return f"callback:{widget_data.split(':')[0]}"
+
+    return update.event_type
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Middleware recording the latency, errors and the number of SQL statements, TMDB requests and Redis commands
+    of every update, labeled by the handler and the dialog window state the update left the user in.
+
+    It is an update middleware registered outside the event isolation, so the latency includes the wait
+    for the lock of the user, and a message and callback query middleware reading the state of the dialog.
+
+    Attributes:
+        commands: Registered commands, the other ones share a label.
+    """
+
+    def __init__(self, commands: Collection[str] = frozenset()):
+        """
+        Initialize the middleware.
+
+        :param commands: Registered commands, the other ones share a label.
+        """
+        self.commands = commands
+
+    def setup(self, dp: Dispatcher) -> None:
+        """
+        Registers the middleware on a dispatcher, after `setup_dialogs`.
+
+        :param dp: Dispatcher.
+        """
+        register_before_fsm(dp, self)
+        dp.message.middleware(self.record_dialog_state)
+        dp.callback_query.middleware(self.record_dialog_state)
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        """
+        Asynchronously call the middleware.
+
+        This method collects the counters of the update in a context variable while the handler runs
+        and records them in the metrics registry afterwards.
+
+        :param handler: Callable to be invoked.
+        :param event: Telegram update.
+        :param data: Dictionary to store data.
+        :return: Result of the handler call.
+        """
+        stats = UpdateStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+
+        try:
+            return await handler(event, data)
+        except Exception:
+            update_errors.inc(get_handler_label(event, self.commands), stats.state or "none")
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            current_stats.reset(token)
+
+            labels = (get_handler_label(event, self.commands), stats.state or "none")
+            update_latency.observe(elapsed, *labels)
+            sql_statements.inc(*labels, amount=stats.sql)
+            tmdb_calls.inc(*labels, amount=stats.tmdb)
+            redis_commands.inc(*labels, amount=stats.redis)
+
+    @staticmethod
+    async def record_dialog_state(
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        """
+        Asynchronously call the handler of a message or a callback query, then record the state of the dialog.
+
+        `aiogram_dialog` keeps the window state in its own stack, not in the FSM state, so it is read
+        from the dialog manager once the handler switched the window.
+
+        :param handler: Callable to be invoked.
+        :param event: Message or callback query.
+        :param data: Dictionary to store data.
+        :return: Result of the handler call.
+        """
+        try:
+            return await handler(event, data)
+        finally:
+            stats = current_stats.get()
+            dialog_manager = data.get("dialog_manager")
+
+            if stats is not None and dialog_manager is not None and dialog_manager.has_context():
+                stats.state = dialog_manager.current_context().state.state
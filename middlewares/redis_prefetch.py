@@ -0,0 +1,103 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.fsm.storage.base import DEFAULT_DESTINY, StorageKey
+from aiogram.types import Chat, TelegramObject, Update, User
+from aiogram_dialog import DEFAULT_STACK_ID
+from aiogram_dialog.utils import remove_intent_id
+
+from middlewares.fsm import register_before_fsm
+from utils.fsm_storage import ExpiringRedisStorage
+from utils.redis_manager import RedisManager
+from utils.redis_snapshot import RedisSnapshot, current_snapshot
+
+
+class RedisPrefetchMiddleware(BaseMiddleware):
+    """
+    Middleware reading the Redis keys an update needs in a single round trip.
+
+    Before the update takes the lock of the user, it lists the locale of the user, the FSM state and data
+    of the chat, the dialog stack of the chat and, for the clicks on a dialog, the context of the dialog.
+    They are fetched together by the first lookup of any of them, the FSM middleware reading the state,
+    and the locale middleware, the FSM context and `aiogram_dialog` are served from that snapshot.
+    The context of a dialog a message is sent to is only known from the stack, so it is read separately.
+
+    Attributes:
+        storage: FSM storage serving the snapshot.
+        locales: Locale manager serving the snapshot.
+    """
+
+    def __init__(self, storage: ExpiringRedisStorage, locales: RedisManager):
+        """
+        Initialize the middleware.
+
+        :param storage: FSM storage serving the snapshot.
+        :param locales: Locale manager serving the snapshot.
+        """
+        self.storage = storage
+        self.locales = locales
+
+    def setup(self, dp: Dispatcher) -> None:
+        """
+        Registers the middleware on a dispatcher, outside the event isolation.
+
+        :param dp: Dispatcher.
+        """
+        register_before_fsm(dp, self)
+
+    def snapshot_keys(self, bot: Bot, user: User, chat: Chat,
+                      callback_data: Optional[str]) -> Dict[str, Optional[int]]:
+        """
+        Lists the Redis keys an update reads.
+
+        :param bot: Bot instance handling the update.
+        :param user: User who sent the update.
+        :param chat: Chat the update was sent in.
+        :param callback_data: Data of the clicked button, if the update is a click.
+        :return: Keys with the TTL refreshed by the read, None to keep the TTL of the key.
+        """
+        build = self.storage.key_builder.build
+        fsm_key = StorageKey(bot_id=bot.id, chat_id=chat.id, user_id=user.id, destiny=DEFAULT_DESTINY)
+
+        def dialog_key(destiny: str) -> str:
+            return build(StorageKey(bot_id=bot.id, chat_id=chat.id, user_id=chat.id, destiny=destiny), "data")
+
+        keys: Dict[str, Optional[int]] = {
+            self.locales.locale_key(user.id): self.locales.ttl,
+            build(fsm_key, "state"): None,
+            build(fsm_key, "data"): None,
+            dialog_key(f"aiogd:stack:{DEFAULT_STACK_ID}"): None,
+        }
+
+        intent_id, _ = remove_intent_id(callback_data) if callback_data else (None, None)
+        if intent_id:
+            keys[dialog_key(f"aiogd:context:{intent_id}")] = None
+
+        return keys
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: Dict[str, Any],
+    ) -> Any:
+        """
+        Asynchronously call the middleware.
+
+        This method sets the snapshot of the update for the handlers, it is fetched on its first lookup.
+
+        :param handler: Callable to be invoked.
+        :param event: Telegram update.
+        :param data: Dictionary to store data.
+        :return: Result of the handler call.
+        """
+        user, chat = data.get("event_from_user"), data.get("event_chat")
+        if user is None or chat is None or chat.type != "private":
+            return await handler(event, data)
+
+        callback_data = event.callback_query.data if event.callback_query else None
+        token = current_snapshot.set(RedisSnapshot(self.snapshot_keys(data["bot"], user, chat, callback_data)))
+        try:
+            return await handler(event, data)
+        finally:
+            current_snapshot.reset(token)
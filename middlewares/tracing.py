@@ -0,0 +1,108 @@
+from typing import Any, Awaitable, Callable, Collection, Dict
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject
+from aiogram_i18n import I18nMiddleware
+
+from middlewares.metrics import get_handler_label
+from utils.metrics import current_stats
+from utils.tracing import Tracer, span
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Middleware recording every update as a trace.
+
+    It is registered outside the event isolation, inside the metrics middleware, so the root span covers
+    the wait for the lock of the user and the FSM and snapshot reads.
+
+    Attributes:
+        tracer: Tracer starting the traces and exporting the kept ones.
+        commands: Registered commands, the other ones share a label.
+    """
+
+    def __init__(self, tracer: Tracer, commands: Collection[str] = frozenset()):
+        """
+        Initialize the middleware with a tracer.
+
+        :param tracer: Tracer starting the traces and exporting the kept ones.
+        :param commands: Registered commands, the other ones share a label.
+        """
+        self.tracer = tracer
+        self.commands = commands
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        """
+        Asynchronously call the middleware.
+
+        This method calls the handler inside a new trace whose root span is labeled by the handler and the dialog state
+        the update left the user in, as recorded by the metrics middleware.
+
+        :param handler: Callable to be invoked.
+        :param event: Telegram update.
+        :param data: Dictionary to store data.
+        :return: Result of the handler call.
+        """
+        with self.tracer.trace("update",
+                               update_id=event.update_id,
+                               handler=get_handler_label(event, self.commands)) as trace:
+            try:
+                return await handler(event, data)
+            finally:
+                stats = current_stats.get()
+                if trace.spans:
+                    trace.spans[0].attributes["state"] = stats.state if stats else None
+
+
+class TracedI18nMiddleware(I18nMiddleware):
+    """
+    Internationalization middleware recording its work as a span of the current trace.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any],
+    ) -> Any:
+        """
+        Asynchronously call the middleware inside the `middleware.i18n` span.
+
+        :param handler: Callable to be invoked.
+        :param event: Telegram event.
+        :param data: Dictionary to store data.
+        :return: Result of the handler call.
+        """
+        with span("middleware.i18n"):
+            return await super().__call__(handler, event, data)
+
+
+class BotApiTracingMiddleware(BaseRequestMiddleware):
+    """
+    Bot session middleware recording every Bot API call as a span of the current trace.
+    """
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        """
+        Asynchronously make the request inside the `bot_api` span.
+
+        :param make_request: Next middleware in the chain or the request itself.
+        :param bot: Bot instance making the request.
+        :param method: Bot API method.
+        :return: Response of the Bot API.
+        """
+        with span("bot_api", method=type(method).__name__):
+            return await make_request(bot, method)
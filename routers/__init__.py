@@ -1,7 +1,11 @@
 from aiogram import Router
 
 from routers.private import router as private_router
+from routers.inline import router as inline_router
+from routers.errors import router as errors_router
 
 router = Router()
 
-router.include_router(private_router)
\ No newline at end of file
+router.include_router(private_router)
+router.include_router(inline_router)
+router.include_router(errors_router)
\ No newline at end of file
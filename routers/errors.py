@@ -0,0 +1,32 @@
+from aiogram import Router
+from aiogram.filters import ExceptionTypeFilter
+from aiogram.types import ErrorEvent
+from aiogram_i18n import I18nContext
+
+from utils.logger import setup_logger
+from utils.tmdb_client import TMDBUnavailableError
+
+
+logger = setup_logger(__name__)
+
+
+async def on_tmdb_unavailable(event: ErrorEvent, i18n: I18nContext):
+    """
+    Handles the error raised when TMDB cannot serve a request. Instead of failing the update,
+    the user is asked to try again later.
+
+    :param event: ErrorEvent instance containing the update and the exception.
+    :param i18n: I18nContext instance for localization.
+    """
+    logger.warning("TMDB is unavailable: %s", event.exception)
+
+    update = event.update
+    if update.callback_query:
+        await update.callback_query.answer(i18n.get("tmdb-unavailable"), show_alert=True)
+    elif update.message:
+        await update.message.answer(i18n.get("tmdb-unavailable"))
+
+
+router = Router()
+
+router.errors.register(on_tmdb_unavailable, ExceptionTypeFilter(TMDBUnavailableError))
@@ -0,0 +1,68 @@
+from html import escape
+from typing import Any, Dict
+
+from aiogram import Router
+from aiogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+from aiogram_i18n import I18nContext
+
+from settings import settings
+from utils.inline_search import InlineMovieSearch
+from utils.logger import setup_logger
+
+
+logger = setup_logger(__name__)
+
+MAX_RESULTS = 50
+"""
+The largest number of results Telegram accepts in an answer to an inline query.
+"""
+
+
+def build_movie_article(movie: Dict[str, Any], i18n: I18nContext) -> InlineQueryResultArticle:
+    """
+    Builds the inline result of a found movie.
+
+    :param movie: Dictionary with the cached fields of the movie.
+    :param i18n: I18nContext instance for localization.
+    :return: The inline result sending a short description of the movie.
+    """
+    year = (movie["release_date"] or "")[0:4]
+    rating = int(movie["vote_average"] or 0)
+
+    text = f"<b>{escape(movie['title'])}</b> {year}\n{i18n.get('rating')} {rating} ⭐️"
+    if movie["overview"]:
+        text += f"\n\n{i18n.get('overview')} {escape(movie['overview'])}"
+
+    return InlineQueryResultArticle(
+        id=str(movie["id"]),
+        title=movie["title"],
+        description=f"{year}, {rating} ⭐️",
+        thumbnail_url=f"https://image.tmdb.org/t/p/w92{movie['poster_path']}" if movie["poster_path"] else None,
+        input_message_content=InputTextMessageContent(message_text=text),
+    )
+
+
+async def inline_search(inline_query: InlineQuery, i18n: I18nContext, inline_movie_search: InlineMovieSearch):
+    """
+    Answers an inline query with the movies found on TMDB.
+
+    Telegram caches the answer for `INLINE_CACHE_TIME` seconds. The answer is personal,
+    because the results depend on the locale of the user and not only on the query.
+
+    :param inline_query: InlineQuery instance representing the typed query.
+    :param i18n: I18nContext instance for localization.
+    :param inline_movie_search: InlineMovieSearch instance serving the cached and debounced searches.
+    """
+    movies = await inline_movie_search.search(inline_query.from_user.id, inline_query.query, i18n.locale)
+    if movies is None:
+        logger.debug("Inline query of user id=%s superseded by a newer one", inline_query.from_user.id)
+        return
+
+    await inline_query.answer([build_movie_article(movie, i18n) for movie in movies[:MAX_RESULTS]],
+                              cache_time=settings.INLINE_CACHE_TIME,
+                              is_personal=True)
+
+
+router = Router()
+
+router.inline_query.register(inline_search)
@@ -2,10 +2,12 @@ from aiogram import Router, F
 from aiogram.enums import ChatType
 from aiogram.filters import CommandStart, Command, StateFilter
 
+from settings import settings
 from states.main_menu import MainMenu
+from routers.private.admin import broadcast_command, broadcast_status_command, broadcast_cancel_command
 from routers.private.setup import start_language, start
 from routers.private.main_menu import change_language, main_menu, add_movie, get_users_review, show_random_movie, \
-    genres_command
+    genres_command, find_in_list, recommend_command, stats_command, trending_command
 
 router = Router()
 router.message.filter(F.chat.type == ChatType.PRIVATE)
@@ -20,5 +22,18 @@ router.message.register(genres_command, Command("movies_on_genre"))
 
 router.message.register(show_random_movie, Command("random"))
 
+router.message.register(find_in_list, Command("find"))
+
+router.message.register(recommend_command, Command("recommend"))
+
+router.message.register(stats_command, Command("stats"))
+
+router.message.register(trending_command, Command("trending"))
+
+is_admin = F.from_user.id.in_(settings.ADMIN_IDS)
+router.message.register(broadcast_command, Command("broadcast"), is_admin)
+router.message.register(broadcast_status_command, Command("broadcast_status"), is_admin)
+router.message.register(broadcast_cancel_command, Command("broadcast_cancel"), is_admin)
+
 router.include_router(main_menu)
 
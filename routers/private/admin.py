@@ -0,0 +1,70 @@
+from aiogram import Bot
+from aiogram.filters import CommandObject
+from aiogram.types import Message
+from aiogram_i18n import I18nContext
+from aiogram_i18n.exceptions import KeyNotFoundError
+
+from jobs.broadcast import Broadcaster
+from utils.logger import setup_logger
+
+
+logger = setup_logger(__name__)
+
+
+async def broadcast_command(message: Message, command: CommandObject, bot: Bot, i18n: I18nContext,
+                            broadcaster: Broadcaster):
+    """
+    Starts broadcasting a message of the locale files, e.g. `/broadcast broadcast-maintenance`,
+    to every user in the user's locale.
+
+    :param message: Message instance representing the received message.
+    :param command: CommandObject instance holding the ID of the broadcast message.
+    :param bot: Bot instance sending the broadcast.
+    :param i18n: I18nContext instance for localization.
+    :param broadcaster: Broadcaster instance sending the broadcasts.
+    """
+    if not command.args:
+        return await message.answer(i18n.get("broadcast-usage"))
+
+    message_id = command.args.strip()
+    try:
+        broadcast_id = await broadcaster.start(bot, message_id)
+    except KeyNotFoundError:
+        return await message.answer(i18n.get("broadcast-unknown-message", message_id=message_id))
+
+    if broadcast_id is None:
+        return await message.answer(i18n.get("broadcast-running"))
+
+    logger.info("User tg_id=%s started broadcast id=%s", message.from_user.id, broadcast_id)
+    await message.answer(i18n.get("broadcast-started", broadcast_id=broadcast_id))
+
+
+async def broadcast_status_command(message: Message, i18n: I18nContext, broadcaster: Broadcaster):
+    """
+    Shows the progress of the latest broadcast.
+
+    :param message: Message instance representing the received message.
+    :param i18n: I18nContext instance for localization.
+    :param broadcaster: Broadcaster instance sending the broadcasts.
+    """
+    state = await broadcaster.status()
+    if state is None:
+        return await message.answer(i18n.get("broadcast-none"))
+
+    await message.answer(i18n.get("broadcast-status", broadcast_id=state["id"], message_id=state["message_id"],
+                                  status=state["status"], sent=int(state["sent"]), failed=int(state["failed"])))
+
+
+async def broadcast_cancel_command(message: Message, i18n: I18nContext, broadcaster: Broadcaster):
+    """
+    Cancels the running broadcast.
+
+    :param message: Message instance representing the received message.
+    :param i18n: I18nContext instance for localization.
+    :param broadcaster: Broadcaster instance sending the broadcasts.
+    """
+    if await broadcaster.cancel():
+        logger.info("User tg_id=%s cancelled the broadcast", message.from_user.id)
+        return await message.answer(i18n.get("broadcast-cancelled"))
+
+    await message.answer(i18n.get("broadcast-none"))
@@ -1,11 +1,11 @@
 import random
 import typing
-from asyncio import sleep
+from asyncio import gather, sleep
 from math import floor
 from typing import Any
 from datetime import datetime
 
-import tmdbsimple as tmdb
+from aiogram.filters import CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram_dialog.api.entities import MediaAttachment
 from aiogram_dialog.widgets.input import MessageInput
@@ -25,10 +25,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.requests import db_get_users_movies, db_add_movie_to_user, db_get_movie_added_time, \
     db_delete_movie_from_user, db_get_users_movie_data, db_change_movie_state, db_get_movie_state_for_user, \
-    db_leave_review
+    db_leave_review, db_search_users_movies, db_upsert_movie_metadata, db_get_recommendations, db_get_user_stats, \
+    db_get_movies_titles, db_set_reminder, db_get_reminder, db_delete_reminders
 
+from jobs.reminders import reminder_fire_time, utcnow
+from utils.genres import genre_mask
 from utils.logger import setup_logger
 from utils.i18n_format import I18NFormat
+from utils.list_view_cache import ListViewCache
+from utils.prefetcher import Prefetcher
+from utils.tmdb_client import TMDBClient
+from utils.trending import TrendingTracker
+from utils.tracing import traced
 
 from states.main_menu import MainMenu
 
@@ -36,19 +44,30 @@ from enums.language import Language
 from enums.sorting import SortingType, SortingOrder
 
 
-logger = setup_logger()
-tmdb.API_KEY = settings.TMDB_API_KEY.get_secret_value()
+logger = setup_logger(__name__)
 
+STATS_TOP_GENRES = 5
+STATS_MONTHS = 6
+REMINDER_DAYS = (0, 1, 7)
 
-async def get_movies_list(event_isolation, dialog_manager: DialogManager,
-                          session: AsyncSession, i18n: I18nContext, *args, **kwargs):
+
+@traced()
+async def get_movies_list(dialog_manager: DialogManager,
+                          session: AsyncSession, i18n: I18nContext, tmdb_client: TMDBClient,
+                          list_views: ListViewCache, prefetcher: Prefetcher, *args, **kwargs):
     """
     Asynchronously fetches the list of movies for the user.
 
-    :param event_isolation: Isolation level for the event.
+    The order of the movies of every sorting and filter is cached by version of the user's list,
+    so flipping a page only fetches the details of the movies on the page.
+    The details of the movies of the next page are prefetched in the background.
+
     :param dialog_manager: DialogManager instance to manage the dialog.
     :param session: Database session.
     :param i18n: I18nContext instance for localization.
+    :param tmdb_client: TMDBClient instance for TMDB requests.
+    :param list_views: ListViewCache instance holding the ordered lists.
+    :param prefetcher: Prefetcher instance warming the details of the movies opened next.
     :param args: Additional arguments.
     :param kwargs: Additional keyword arguments.
     :return: Dictionary containing information about the movies.
@@ -57,12 +76,31 @@ async def get_movies_list(event_isolation, dialog_manager: DialogManager,
     dialog_manager.dialog_data.setdefault("current_page", 1)
     dialog_manager.dialog_data.setdefault("sorting_type", SortingType.MOVIE_RATE)
     dialog_manager.dialog_data.setdefault("sorting_order", SortingOrder.DESCENDING)
+    dialog_manager.dialog_data.setdefault("genre_mask", (dialog_manager.start_data or {}).get("genre_mask", 0))
 
     tg_id = dialog_manager.middleware_data.get("event_from_user").id
+    mask = dialog_manager.dialog_data["genre_mask"]
 
-    db_movies = await db_get_users_movies(session, tg_id)
+    page_size = dialog_manager.dialog_data["page_size"]
+    start = (dialog_manager.dialog_data["current_page"] - 1) * page_size
+    view = (SortingType(dialog_manager.dialog_data["sorting_type"]).value,
+            SortingOrder(dialog_manager.dialog_data["sorting_order"]).value, mask)
+
+    version = await list_views.version(tg_id)
+    cached = await list_views.get_page(tg_id, version, view, start, start + 2 * page_size - 1)
 
-    movies_num = len(db_movies)
+    if cached is None:
+        db_movies = await db_get_users_movies(session, tg_id, genre_mask=mask)
+        movies_info = await fetch_movie_details(db_movies, i18n.locale, dialog_manager, session, tmdb_client)
+        await list_views.store(tg_id, version, view, [movie['id'] for movie in movies_info])
+
+        movies_num = len(movies_info)
+        page_movies = movies_info[start:start + page_size]
+    else:
+        page_ids, movies_num = cached
+        page_movies = await gather(*(tmdb_client.movie_info(movie_id, language=i18n.locale)
+                                     for movie_id in page_ids[:page_size]))
+        prefetcher.schedule(tg_id, page_ids[page_size:], language=i18n.locale)
 
     dialog_manager.dialog_data["pages_num"] = movies_num // settings.PAGE_SIZE if movies_num % settings.PAGE_SIZE == 0 \
         else movies_num // settings.PAGE_SIZE + 1
@@ -71,11 +109,11 @@ async def get_movies_list(event_isolation, dialog_manager: DialogManager,
     is_movie_rate = dialog_manager.dialog_data.get("sorting_type") == SortingType.MOVIE_RATE
     is_descending = dialog_manager.dialog_data.get("sorting_order") == SortingOrder.DESCENDING
 
-    movies_info = await fetch_movie_details(db_movies, i18n.locale, dialog_manager, session)
-    movies_on_page = await make_list(movies_info, dialog_manager, i18n)
+    movies_on_page = await make_list(page_movies, dialog_manager, i18n)
 
     return {
         "is_empty": is_empty,
+        "is_filtered": bool(mask),
         "movies_on_page": movies_on_page,
         "current_page": dialog_manager.dialog_data.get("current_page", 1),
         "pages_num": dialog_manager.dialog_data.get("pages_num", 1),
@@ -107,11 +145,12 @@ async def sort_movies(movies, dialog_manager: DialogManager):
     movies.sort(key=sort_key, reverse=reverse)
 
 
-async def fetch_movie_details(db_movies, language, dialog_manager: DialogManager, session: AsyncSession):
+async def fetch_movie_details(db_movies, language, dialog_manager: DialogManager, session: AsyncSession,
+                              tmdb_client: TMDBClient):
     movies_info = []
     for movie in db_movies:
         movie_id = movie.tmdb_id
-        movie_info = tmdb.Movies(id=movie_id).info(language=language)
+        movie_info = await tmdb_client.movie_info(movie_id, language=language)
         added_at = await db_get_movie_added_time(session, dialog_manager.middleware_data.get("event_from_user").id, movie_id)
         movie_info['added_at'] = added_at
         movies_info.append(movie_info)
@@ -123,25 +162,15 @@ async def fetch_movie_details(db_movies, language, dialog_manager: DialogManager
 
 async def make_list(movies_info: typing.List[dict], dialog_manager: DialogManager, i18n: I18nContext):
     """
-    Asynchronously creates a list of movies to display in the dialog.
+    Asynchronously creates the list of the movies of the current page to display in the dialog.
 
-    :param movies_info: List of dictionaries where each dictionary represents a movie.
+    :param movies_info: List of dictionaries where each dictionary represents a movie on the page.
     :param dialog_manager: DialogManager instance to manage the dialog.
     :param i18n: I18nContext instance for localization.
     :return: List of movies to be displayed.
     """
-    page_size = dialog_manager.dialog_data["page_size"]
-    current_page = dialog_manager.dialog_data["current_page"]
-
-    movies_num = len(movies_info)
-
-    start = (current_page - 1) * page_size
-    end = start + page_size
-
     movie_list = []
-    for i in range(start, min(end, movies_num)):
-        movie = movies_info[i]
-
+    for movie in movies_info:
         movie_str = f"{movie['title']} {movie['release_date'][0:4]}, {int(movie['vote_average'])} ⭐️"
         movie_list.append((movie_str, movie['id']))
 
@@ -205,11 +234,11 @@ async def on_sorting_order(callback: CallbackQuery, button: Button, dialog_manag
         else SortingOrder.DESCENDING
 
 
-async def get_language_list(event_isolation, dialog_manager: DialogManager, i18n: I18nContext, *args, **kwargs):
+@traced()
+async def get_language_list(dialog_manager: DialogManager, i18n: I18nContext, *args, **kwargs):
     """
     Fetches the list of available languages.
 
-    :param event_isolation: Isolation level for the event.
     :param dialog_manager: DialogManager instance to manage the dialog.
     :param i18n: I18nContext instance for localization.
     :param args: Additional arguments.
@@ -248,6 +277,31 @@ async def on_language_selected(callback: CallbackQuery, widget: Any,
                                data={"tg_id": callback.from_user.id})
 
 
+async def on_filter_genres(callback: CallbackQuery, button: Button, dialog_manager: DialogManager):
+    """
+    Handles the event when the genre filter button is clicked in the list view.
+    Starts the genre selection dialog, whose confirmation then filters the list instead of searching TMDB.
+
+    :param callback: CallbackQuery instance representing the callback query.
+    :param button: Button instance representing the clicked button.
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    """
+    await dialog_manager.start(MainMenu.choose_genre, mode=StartMode.RESET_STACK, show_mode=ShowMode.EDIT,
+                               data={"filter_list": True})
+
+
+async def on_reset_filter(callback: CallbackQuery, button: Button, dialog_manager: DialogManager):
+    """
+    Handles the event when the reset filter button is clicked in the list view.
+
+    :param callback: CallbackQuery instance representing the callback query.
+    :param button: Button instance representing the clicked button.
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    """
+    dialog_manager.dialog_data["genre_mask"] = 0
+    dialog_manager.dialog_data["current_page"] = 1
+
+
 async def change_language(message: Message, dialog_manager: DialogManager):
     """
     Starts the language change dialog.
@@ -275,15 +329,19 @@ async def add_movie(message: Message, dialog_manager: DialogManager, i18n: I18nC
     await message.delete()
 
 
-async def get_add_movies_list(event_isolation, dialog_manager: DialogManager, i18n: I18nContext,
-                              session: AsyncSession, *args, **kwargs):
+@traced()
+async def get_add_movies_list(dialog_manager: DialogManager, i18n: I18nContext,
+                              session: AsyncSession, tmdb_client: TMDBClient, prefetcher: Prefetcher,
+                              *args, **kwargs):
     """
     Asynchronously fetches a list of movies to add based on the user's input.
+    The details of the movies on the page and on the next page are prefetched in the background.
 
-    :param event_isolation: Isolation level for the event.
     :param dialog_manager: DialogManager instance to manage the dialog.
     :param i18n: I18nContext instance for localization.
     :param session: Database session.
+    :param tmdb_client: TMDBClient instance for TMDB requests.
+    :param prefetcher: Prefetcher instance warming the details of the movies opened next.
     :param args: Additional arguments.
     :param kwargs: Additional keyword arguments.
     :return: Dictionary containing information about the movies.
@@ -294,8 +352,7 @@ async def get_add_movies_list(event_isolation, dialog_manager: DialogManager, i1
     dialog_manager.dialog_data.setdefault("page_size", settings.PAGE_SIZE)
     dialog_manager.dialog_data.setdefault("current_page", 1)
 
-    search = tmdb.Search()
-    response = search.movie(query=message, language=i18n.locale)
+    response = await tmdb_client.search_movie(query=message, language=i18n.locale)
 
     movies = []
 
@@ -313,6 +370,9 @@ async def get_add_movies_list(event_isolation, dialog_manager: DialogManager, i1
     start = (current_page - 1) * page_size
     end = min((start + page_size), movies_num)
 
+    prefetcher.schedule(dialog_manager.middleware_data.get("event_from_user").id,
+                        [movie_id for _, movie_id in movies[start:end + page_size]], language=i18n.locale)
+
     movies = movies[start:end]
 
     return {
@@ -403,7 +463,9 @@ async def on_delete(callback: CallbackQuery, button: Button, dialog_manager: Dia
     session = dialog_manager.middleware_data.get("session")
     movie_id = dialog_manager.start_data["movie_id"]
 
-    await db_delete_movie_from_user(session, tg_id, movie_id)
+    await db_delete_movie_from_user(session, tg_id, movie_id,
+                                    trending=dialog_manager.middleware_data.get("trending"),
+                                    list_views=dialog_manager.middleware_data.get("list_views"))
 
     await dialog_manager.start(MainMenu.show_list,
                                mode=StartMode.RESET_STACK,
@@ -425,7 +487,9 @@ async def on_state_changed(callback: CallbackQuery, button: Button, dialog_manag
     movie_id = dialog_manager.start_data["movie_id"]
     is_watched = await db_get_movie_state_for_user(session, tg_id, movie_id)
 
-    await db_change_movie_state(session, tg_id, movie_id, is_watched)
+    await db_change_movie_state(session, tg_id, movie_id, is_watched,
+                                trending=dialog_manager.middleware_data.get("trending"),
+                                list_views=dialog_manager.middleware_data.get("list_views"))
 
     if not is_watched:
         await dialog_manager.start(MainMenu.ask_to_leave_review,
@@ -440,22 +504,23 @@ async def on_state_changed(callback: CallbackQuery, button: Button, dialog_manag
                                    )
 
 
-async def get_movie_details(event_isolation, dialog_manager: DialogManager, session: AsyncSession, i18n: I18nContext,
-                            *args, **kwargs):
+@traced()
+async def get_movie_details(dialog_manager: DialogManager, session: AsyncSession, i18n: I18nContext,
+                            tmdb_client: TMDBClient, *args, **kwargs):
     """
     Asynchronously fetches the details of a movie.
 
-    :param event_isolation: Isolation level for the event.
     :param dialog_manager: DialogManager instance to manage the dialog.
     :param session: Database session.
     :param i18n: I18nContext instance for localization.
+    :param tmdb_client: TMDBClient instance for TMDB requests.
     :param args:
     :param kwargs:
     :return: Dictionary containing information about the movie.
     """
     movie_id = dialog_manager.start_data["movie_id"]
     tg_id = dialog_manager.middleware_data.get("event_from_user").id
-    movie = tmdb.Movies(id=movie_id).info(language=i18n.locale)
+    movie = await tmdb_client.movie_info(movie_id, language=i18n.locale)
 
     users_movie_info = await db_get_users_movie_data(session, tg_id, movie_id)
 
@@ -500,21 +565,104 @@ async def get_movie_details(event_isolation, dialog_manager: DialogManager, sess
     poster_url = f"https://image.tmdb.org/t/p/w500{movie['poster_path']}"
     is_poster = movie['poster_path'] is not None
 
+    can_remind = users_movie_info["in_database"] and bool(movie['release_date']) and \
+        reminder_fire_time(movie['release_date'], 0, settings.REMINDERS_HOUR) > utcnow()
+    has_reminder = can_remind and await db_get_reminder(session, tg_id, int(movie_id)) is not None
+    dialog_manager.dialog_data["release_date"] = movie['release_date']
+
     return {
         "movie_info": movie_info,
         "is_poster": is_poster,
         "poster": MediaAttachment(ContentType.PHOTO,
                                   url=poster_url),
         "is_watched": users_movie_info["is_watched"],
-        "in_database": users_movie_info["in_database"]
+        "in_database": users_movie_info["in_database"],
+        "can_remind": can_remind,
+        "has_reminder": has_reminder
+    }
+
+
+async def on_reminder(callback: CallbackQuery, button: Button, dialog_manager: DialogManager):
+    """
+    Handles the event when the reminder button is clicked in the movie details view.
+
+    :param callback: CallbackQuery instance representing the callback query.
+    :param button: Button instance representing the clicked button.
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    """
+    await dialog_manager.switch_to(MainMenu.set_reminder, show_mode=ShowMode.EDIT)
+
+
+@traced()
+async def get_reminder_options(dialog_manager: DialogManager, session: AsyncSession,
+                               i18n: I18nContext, *args, **kwargs):
+    """
+    Asynchronously fetches the reminders a user can set for a movie, those that are not due yet.
+
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    :param session: Database session.
+    :param i18n: I18nContext instance for localization.
+    :param args: Additional arguments.
+    :param kwargs: Additional keyword arguments.
+    :return: Dictionary containing the reminder options.
+    """
+    tg_id = dialog_manager.middleware_data.get("event_from_user").id
+    movie_id = int(dialog_manager.start_data["movie_id"])
+    release_date = dialog_manager.dialog_data["release_date"]
+    now = utcnow()
+
+    options = [(i18n.get("reminder-option", days=days), days) for days in REMINDER_DAYS
+               if reminder_fire_time(release_date, days, settings.REMINDERS_HOUR) > now]
+
+    return {
+        "options": options,
+        "has_reminder": await db_get_reminder(session, tg_id, movie_id) is not None
     }
 
 
-async def get_rating_keyboard(event_isolation, *args, **kwargs):
+async def on_reminder_chosen(callback: CallbackQuery, widget: Any, dialog_manager: DialogManager, item_id: str):
+    """
+    Handles the event when the number of days before the release of a reminder is chosen.
+
+    :param callback: CallbackQuery instance representing the callback query.
+    :param widget: Widget instance representing the clicked widget.
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    :param item_id: str representing the number of days before the release.
+    """
+    session = dialog_manager.middleware_data.get("session")
+    i18n = dialog_manager.middleware_data.get("i18n")
+    release_date = dialog_manager.dialog_data["release_date"]
+    days_before = int(item_id)
+
+    await db_set_reminder(session, callback.from_user.id, int(dialog_manager.start_data["movie_id"]),
+                          release_date=release_date,
+                          days_before=days_before,
+                          fire_at=reminder_fire_time(release_date, days_before, settings.REMINDERS_HOUR))
+    dialog_manager.middleware_data.get("reminders").wake()
+
+    await callback.answer(i18n.get("reminder-set"))
+    await dialog_manager.switch_to(MainMenu.show_details, show_mode=ShowMode.EDIT)
+
+
+async def on_cancel_reminder(callback: CallbackQuery, button: Button, dialog_manager: DialogManager):
+    """
+    Handles the event when the cancel reminder button is clicked.
+
+    :param callback: CallbackQuery instance representing the callback query.
+    :param button: Button instance representing the clicked button.
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    """
+    session = dialog_manager.middleware_data.get("session")
+
+    await db_delete_reminders(session, [(callback.from_user.id, int(dialog_manager.start_data["movie_id"]))])
+    await dialog_manager.switch_to(MainMenu.show_details, show_mode=ShowMode.EDIT)
+
+
+@traced()
+async def get_rating_keyboard(*args, **kwargs):
     """
     Asynchronously fetches the rating keyboard.
 
-    :param event_isolation: Isolation level for the event.
     :param args:
     :param kwargs:
     :return:
@@ -557,7 +705,8 @@ async def on_chosen_rating(callback: CallbackQuery, widget: Any, dialog_manager:
             }
     session = dialog_manager.middleware_data.get("session")
 
-    await db_leave_review(session, callback.from_user.id, data["movie_id"], {"rating": item_id, "review": None})
+    await db_leave_review(session, callback.from_user.id, data["movie_id"], {"rating": item_id, "review": None},
+                          list_views=dialog_manager.middleware_data.get("list_views"))
     dialog_manager.dialog_data.update(data)
 
     await dialog_manager.next()
@@ -590,7 +739,8 @@ async def get_users_review(message: Message,  message_input: MessageInput, dialo
         "review": review
     }
 
-    await db_leave_review(session, message.from_user.id, movie_id, data)
+    await db_leave_review(session, message.from_user.id, movie_id, data,
+                          list_views=dialog_manager.middleware_data.get("list_views"))
     await dialog_manager.switch_to(MainMenu.show_details, show_mode=ShowMode.EDIT)
     await message.delete()
 
@@ -645,6 +795,198 @@ async def show_random_movie(message: Message, dialog_manager: DialogManager):
                                )
 
 
+async def find_in_list(message: Message, command: CommandObject, dialog_manager: DialogManager, i18n: I18nContext):
+    """
+    Searches the titles of the movies in the user's list.
+
+    :param message: Message instance representing the received message.
+    :param command: CommandObject instance holding the searched text.
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    :param i18n: I18nContext instance for localization.
+    """
+    await message.delete()
+
+    if not command.args:
+        bot_message = await message.answer(i18n.get("find-usage"))
+        await sleep(5)
+        await bot_message.delete()
+        return
+
+    await dialog_manager.start(MainMenu.search_list, mode=StartMode.RESET_STACK, show_mode=ShowMode.EDIT,
+                               data={"query": command.args})
+
+
+@traced()
+async def get_search_results(dialog_manager: DialogManager, session: AsyncSession,
+                             i18n: I18nContext, *args, **kwargs):
+    """
+    Asynchronously searches the user's list with the full-text index, without requests to TMDB.
+
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    :param session: Database session.
+    :param i18n: I18nContext instance for localization.
+    :param args: Additional arguments.
+    :param kwargs: Additional keyword arguments.
+    :return: Dictionary containing the best matching movies.
+    """
+    tg_id = dialog_manager.middleware_data.get("event_from_user").id
+    query = dialog_manager.start_data["query"]
+
+    found = await db_search_users_movies(session, tg_id, query, language=i18n.locale, limit=settings.PAGE_SIZE)
+    movies = [(f"{movie.title} {(movie.release_date or '')[0:4]}".strip(), movie.tmdb_id) for movie in found]
+
+    return {
+        "query": query,
+        "movies": movies,
+        "is_empty": not movies
+    }
+
+
+async def recommend_command(message: Message, dialog_manager: DialogManager):
+    """
+    Starts the dialog showing the movies recommended by the lists of the other users.
+
+    :param message: Message instance representing the received message.
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    """
+    await message.delete()
+    await dialog_manager.start(MainMenu.recommendations, mode=StartMode.RESET_STACK, show_mode=ShowMode.EDIT)
+
+
+@traced()
+async def get_recommendations(dialog_manager: DialogManager, session: AsyncSession,
+                              i18n: I18nContext, *args, **kwargs):
+    """
+    Asynchronously fetches the recommended movies from the precomputed neighbours of the movies in the user's list.
+
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    :param session: Database session.
+    :param i18n: I18nContext instance for localization.
+    :param args: Additional arguments.
+    :param kwargs: Additional keyword arguments.
+    :return: Dictionary containing the recommended movies.
+    """
+    tg_id = dialog_manager.middleware_data.get("event_from_user").id
+
+    recommended = await db_get_recommendations(session, tg_id, language=i18n.locale, limit=settings.PAGE_SIZE)
+    movies = [(f"{movie.title} {(movie.release_date or '')[0:4]}".strip(), movie.tmdb_id) for movie in recommended]
+
+    return {
+        "movies": movies,
+        "is_empty": not movies
+    }
+
+
+async def trending_command(message: Message, dialog_manager: DialogManager):
+    """
+    Starts the dialog showing the movies trending among the users of the bot.
+
+    :param message: Message instance representing the received message.
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    """
+    await message.delete()
+    await dialog_manager.start(MainMenu.trending, mode=StartMode.RESET_STACK, show_mode=ShowMode.EDIT,
+                               data={"window": "day"})
+
+
+async def on_trending_window(callback: CallbackQuery, button: Button, dialog_manager: DialogManager):
+    """
+    Handles the event when the button switching between the trending movies of the day and of the week is clicked.
+
+    :param callback: CallbackQuery instance representing the callback query.
+    :param button: Button instance representing the clicked button.
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    """
+    window = dialog_manager.dialog_data.get("window", dialog_manager.start_data["window"])
+    dialog_manager.dialog_data["window"] = "week" if window == "day" else "day"
+
+
+@traced()
+async def get_trending(dialog_manager: DialogManager, session: AsyncSession, i18n: I18nContext,
+                       trending: TrendingTracker, *args, **kwargs):
+    """
+    Asynchronously fetches the movies trending in the chosen window from the decayed scores kept in Redis.
+
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    :param session: Database session.
+    :param i18n: I18nContext instance for localization.
+    :param trending: TrendingTracker instance holding the scores.
+    :param args: Additional arguments.
+    :param kwargs: Additional keyword arguments.
+    :return: Dictionary containing the trending movies and the chosen window.
+    """
+    window = dialog_manager.dialog_data.get("window", dialog_manager.start_data["window"])
+
+    top = await trending.top(window, limit=settings.PAGE_SIZE)
+    titles = await db_get_movies_titles(session, [movie_id for movie_id, _ in top], language=i18n.locale)
+    movies = [(f"{titles[movie_id].title} {(titles[movie_id].release_date or '')[0:4]}".strip(), movie_id)
+              for movie_id, _ in top if movie_id in titles]
+
+    return {
+        "movies": movies,
+        "is_empty": not movies,
+        "is_day": window == "day"
+    }
+
+
+async def stats_command(message: Message, dialog_manager: DialogManager):
+    """
+    Starts the dialog showing the statistics of the user's list.
+
+    :param message: Message instance representing the received message.
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    """
+    await message.delete()
+    await dialog_manager.start(MainMenu.stats, mode=StartMode.RESET_STACK, show_mode=ShowMode.EDIT)
+
+
+@traced()
+async def get_stats(dialog_manager: DialogManager, session: AsyncSession, i18n: I18nContext,
+                    tmdb_client: TMDBClient, *args, **kwargs):
+    """
+    Asynchronously builds the statistics of the user's list from the user's summary,
+    which is kept up to date by every change of the list.
+
+    :param dialog_manager: DialogManager instance to manage the dialog.
+    :param session: Database session.
+    :param i18n: I18nContext instance for localization.
+    :param tmdb_client: TMDBClient instance for TMDB requests.
+    :param args: Additional arguments.
+    :param kwargs: Additional keyword arguments.
+    :return: Dictionary containing the statistics text.
+    """
+    tg_id = dialog_manager.middleware_data.get("event_from_user").id
+    stats = await db_get_user_stats(session, tg_id)
+
+    if not stats.saved:
+        return {"stats": i18n.get("no-stats")}
+
+    rated = sum(stats.rating_counts.values())
+    average = sum(int(rating) * count for rating, count in stats.rating_counts.items()) / rated if rated else 0
+    lines = [i18n.get("stats-summary", saved=stats.saved, watched=stats.watched,
+                      rated=rated, average=f"{average:.1f}")]
+
+    if rated:
+        most = max(stats.rating_counts.values())
+        lines.append("\n" + i18n.get("stats-ratings"))
+        lines.extend(f"{rating:>2} ⭐️ {'▇' * max(1, round(10 * count / most))} {count}"
+                     for rating, count in sorted(((int(rating), count)
+                                                  for rating, count in stats.rating_counts.items()), reverse=True))
+
+    if stats.genre_counts:
+        genre_names = {str(genre["id"]): genre["name"]
+                       for genre in (await tmdb_client.movie_genres(language=i18n.locale))["genres"]}
+        top_genres = sorted(stats.genre_counts.items(), key=lambda item: item[1], reverse=True)[:STATS_TOP_GENRES]
+        lines.append("\n" + i18n.get("stats-genres"))
+        lines.extend(f"{genre_names.get(genre_id, genre_id)}: {count}" for genre_id, count in top_genres)
+
+    if stats.month_counts:
+        lines.append("\n" + i18n.get("stats-months"))
+        lines.extend(f"{month}: {count}" for month, count in sorted(stats.month_counts.items())[-STATS_MONTHS:])
+
+    return {"stats": "\n".join(lines)}
+
+
 async def genres_command(message: Message, dialog_manager: DialogManager):
     """
     Starts the genre selection dialog.
@@ -686,18 +1028,20 @@ async def on_genre_selected(callback: CallbackQuery, widget: Any, dialog_manager
     dialog_manager.dialog_data["selected_genres"] = selected_genres
 
 
-async def get_genres_list(event_isolation, dialog_manager: DialogManager, i18n: I18nContext, *args, **kwargs):
+@traced()
+async def get_genres_list(dialog_manager: DialogManager, i18n: I18nContext,
+                          tmdb_client: TMDBClient, *args, **kwargs):
     """
     Asynchronously fetches the list of genres.
 
-    :param event_isolation: Isolation level for the event.
     :param dialog_manager: DialogManager instance to manage the dialog.
     :param i18n: I18nContext instance for localization.
+    :param tmdb_client: TMDBClient instance for TMDB requests.
     :param args:
     :param kwargs:
     :return:
     """
-    tmdb_genres = tmdb.Genres().movie_list(language=i18n.locale)['genres']
+    tmdb_genres = (await tmdb_client.movie_genres(language=i18n.locale))['genres']
     genres = []
     selected_genres = dialog_manager.dialog_data.get("selected_genres", [])
 
@@ -726,16 +1070,26 @@ async def on_find_movies(callback: CallbackQuery, button: Button, dialog_manager
     :param dialog_manager: DialogManager instance to manage the dialog.
     :return:
     """
+    if (dialog_manager.start_data or {}).get("filter_list"):
+        selected_genres = dialog_manager.dialog_data.get("selected_genres", [])
+        await dialog_manager.start(MainMenu.show_list, mode=StartMode.RESET_STACK, show_mode=ShowMode.EDIT,
+                                   data={"genre_mask": genre_mask(selected_genres)})
+        return
+
     await dialog_manager.next()
 
 
-async def get_found_movies(event_isolation, dialog_manager: DialogManager, i18n: I18nContext, *args, **kwargs):
+@traced()
+async def get_found_movies(dialog_manager: DialogManager, i18n: I18nContext,
+                           tmdb_client: TMDBClient, prefetcher: Prefetcher, *args, **kwargs):
     """
     Asynchronously fetches the list of movies based on the selected genres.
+    The details of the movies on the page and on the next page are prefetched in the background.
 
-    :param event_isolation: Isolation level for the event.
     :param dialog_manager: DialogManager instance to manage the dialog.
     :param i18n: I18nContext instance for localization.
+    :param tmdb_client: TMDBClient instance for TMDB requests.
+    :param prefetcher: Prefetcher instance warming the details of the movies opened next.
     :param args:
     :param kwargs:
     :return:
@@ -747,11 +1101,11 @@ async def get_found_movies(event_isolation, dialog_manager: DialogManager, i18n:
     movies = []
 
     for page in range(1, 3):
-        response: dict = tmdb.Discover().movie(with_genres=genres,
-                                               language=i18n.locale,
-                                               sort_by="vote_average.desc",
-                                               vote_count_gte=100,
-                                               page=page)
+        response: dict = await tmdb_client.discover_movies(with_genres=genres,
+                                                           language=i18n.locale,
+                                                           sort_by="vote_average.desc",
+                                                           vote_count_gte=100,
+                                                           page=page)
 
         for movie in response['results']:
             movie_str = f"{movie['title']} {movie['release_date'][0:4]}, {int(movie['vote_average'])} ⭐️"
@@ -767,6 +1121,9 @@ async def get_found_movies(event_isolation, dialog_manager: DialogManager, i18n:
     start = (current_page - 1) * page_size
     end = min((start + page_size), movies_num)
 
+    prefetcher.schedule(dialog_manager.middleware_data.get("event_from_user").id,
+                        [movie_id for _, movie_id in movies[start:end + page_size]], language=i18n.locale)
+
     movies = movies[start:end]
 
     return {
@@ -815,16 +1172,37 @@ async def on_found_movie_to_add(callback: CallbackQuery, button: Button, dialog_
     """
     tg_id = callback.from_user.id
     session = dialog_manager.middleware_data.get("session")
+    tmdb_client: TMDBClient = dialog_manager.middleware_data.get("tmdb_client")
     tmdb_id = int(dialog_manager.start_data["movie_id"])
 
-    movie = tmdb.Movies(id=tmdb_id).info()
+    movie, *localized = await gather(
+        tmdb_client.movie_info(tmdb_id),
+        *(tmdb_client.movie_info(tmdb_id, language=language.value) for language in Language),
+    )
 
     movie_data = {
         'tmdb_id': movie['id'],
         'movie_name': movie['title'],
+        'titles': [details['title'] for details in localized],
+        'original_title': movie['original_title'],
+        'genre_mask': genre_mask(genre['id'] for genre in movie['genres']),
     }
 
-    await db_add_movie_to_user(session, tg_id, movie_data)
+    await db_add_movie_to_user(session, tg_id, movie_data,
+                               trending=dialog_manager.middleware_data.get("trending"),
+                               list_views=dialog_manager.middleware_data.get("list_views"))
+    await db_upsert_movie_metadata(session, [
+        {
+            "tmdb_id": movie['id'],
+            "language": language.value,
+            "title": details["title"],
+            "original_title": details["original_title"],
+            "vote_average": details["vote_average"],
+            "release_date": details["release_date"] or None,
+            "poster_path": details["poster_path"],
+        }
+        for language, details in zip(Language, localized)
+    ])
 
 
 main_menu = Dialog(
@@ -834,7 +1212,9 @@ main_menu = Dialog(
             I18NFormat("show-movies",
                        when=~F["is_empty"]),
             I18NFormat("no-movies",
-                       when=F["is_empty"])),
+                       when=F["is_empty"] & ~F["is_filtered"]),
+            I18NFormat("no-movies-with-genres",
+                       when=F["is_empty"] & F["is_filtered"])),
         Column(
             Select(
                 Format("{item[0]}"),
@@ -885,6 +1265,18 @@ main_menu = Dialog(
                 when=~F["is_empty"]
             )
         ),
+        Button(
+            I18NFormat("filter-genres"),
+            id="filter_genres",
+            on_click=on_filter_genres,
+            when=~F["is_empty"] & ~F["is_filtered"]
+        ),
+        Button(
+            I18NFormat("reset-filter"),
+            id="reset_filter",
+            on_click=on_reset_filter,
+            when=F["is_filtered"]
+        ),
         MessageInput(
             func=movie_name_input,
             content_types=[ContentType.TEXT],
@@ -975,12 +1367,47 @@ main_menu = Dialog(
             on_click=on_state_changed,
             when=F["in_database"]
         ),
+        Button(
+            Multi(
+                I18NFormat("change-reminder", when=F["has_reminder"]),
+                I18NFormat("set-reminder", when=~F["has_reminder"]),
+            ),
+            id="reminder",
+            on_click=on_reminder,
+            when=F["can_remind"]
+        ),
         DynamicMedia("poster",
                      when=F["is_poster"]),
 
         state=MainMenu.show_details,
         getter=get_movie_details
     ),
+    # set reminder window
+    Window(
+        I18NFormat("choose-reminder"),
+        Column(
+            Select(
+                Format("{item[0]}"),
+                id="reminder_days",
+                item_id_getter=lambda item: item[1],
+                items="options",
+                on_click=on_reminder_chosen
+            ),
+        ),
+        Button(
+            I18NFormat("cancel-reminder"),
+            id="cancel_reminder",
+            on_click=on_cancel_reminder,
+            when=F["has_reminder"]
+        ),
+        Button(
+            I18NFormat("go-back"),
+            id="go_back",
+            on_click=on_back_to_movie
+        ),
+        state=MainMenu.set_reminder,
+        getter=get_reminder_options
+    ),
     # ask user to leave review window
     Window(
         I18NFormat("leave-review"),
@@ -1146,4 +1573,91 @@ main_menu = Dialog(
         state=MainMenu.show_found_movies,
         getter=get_found_movies
     ),
+    # search in the user's list window
+    Window(
+        I18NFormat("search-results", when=~F["is_empty"]),
+        I18NFormat("no-search-results", when=F["is_empty"]),
+        Column(
+            Select(
+                Format("{item[0]}"),
+                id="s_movies",
+                item_id_getter=lambda item: item[1],
+                items="movies",
+                on_click=on_movie_details
+            ),
+            when=~F["is_empty"]
+        ),
+        Button(
+            I18NFormat("go-back"),
+            id="go_back",
+            on_click=on_back
+        ),
+        state=MainMenu.search_list,
+        getter=get_search_results
+    ),
+    # recommendations window
+    Window(
+        I18NFormat("recommendations", when=~F["is_empty"]),
+        I18NFormat("no-recommendations", when=F["is_empty"]),
+        Column(
+            Select(
+                Format("{item[0]}"),
+                id="s_found_movie",
+                item_id_getter=lambda item: item[1],
+                items="movies",
+                on_click=on_found_movie,
+            ),
+            when=~F["is_empty"]
+        ),
+        Button(
+            I18NFormat("go-back"),
+            id="go_back",
+            on_click=on_back
+        ),
+        state=MainMenu.recommendations,
+        getter=get_recommendations
+    ),
+    # trending window
+    Window(
+        Multi(
+            I18NFormat("trending-day", when=F["is_day"]),
+            I18NFormat("trending-week", when=~F["is_day"]),
+            I18NFormat("no-trending", when=F["is_empty"])),
+        Column(
+            Select(
+                Format("{item[0]}"),
+                id="s_found_movie",
+                item_id_getter=lambda item: item[1],
+                items="movies",
+                on_click=on_found_movie,
+            ),
+            when=~F["is_empty"]
+        ),
+        Button(
+            Multi(
+                I18NFormat("show-trending-week", when=F["is_day"]),
+                I18NFormat("show-trending-day", when=~F["is_day"]),
+            ),
+            id="trending_window",
+            on_click=on_trending_window
+        ),
+        Button(
+            I18NFormat("go-back"),
+            id="go_back",
+            on_click=on_back
+        ),
+        state=MainMenu.trending,
+        getter=get_trending
+    ),
+    # stats window
+    Window(
+        Format("{stats}"),
+        Button(
+            I18NFormat("go-back"),
+            id="go_back",
+            on_click=on_back
+        ),
+        state=MainMenu.stats,
+        getter=get_stats
+    ),
 )
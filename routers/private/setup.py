@@ -21,7 +21,7 @@ from database.requests import db_add_user
 from commands import set_bot_commands
 
 
-logger = setup_logger()
+logger = setup_logger(__name__)
 
 
 async def start_language(message: Message, i18n: I18nContext,
@@ -1,63 +1,335 @@
 import asyncio
+import importlib
+import time
 
-from typing import Any
+from typing import TYPE_CHECKING, Any, Awaitable, Optional, Tuple
 
-from utils.logger import setup_logger
-from utils.redis_manager import RedisManager
+from utils.logger import configure_logging, setup_logger
 
-from redis.asyncio import Redis
+from settings import settings
 
-from aiogram import Bot, Dispatcher
-from aiogram.enums import ParseMode
-from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage, RedisEventIsolation
-from aiogram.client.default import DefaultBotProperties
-from aiogram_i18n import I18nMiddleware
-from aiogram_i18n.cores import FluentRuntimeCore
-from aiogram_dialog import setup_dialogs
+if TYPE_CHECKING:
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.session.base import BaseSession
+    from aiogram.fsm.storage.base import BaseEventIsolation, KeyBuilder
+    from aiogram_i18n.cores import FluentRuntimeCore
+    from redis.asyncio import Redis
 
-from enums import Language
-from routers import router
-from middlewares.db import DataBaseSession
-from database.engine import create_db, async_session, drop_db
+    from utils.bot_session import KeepAliveAiohttpSession
+    from utils.metrics import InstrumentedRedis
+    from utils.tmdb_cassette import TMDBCassette
+    from utils.tmdb_client import TMDBClient
+    from utils.tracing import Tracer
 
-from settings import settings
+# The heavy modules (the routers and dialogues, SQLAlchemy, tmdbsimple) are imported inside the functions below,
+# so `startup` can import them in a worker thread while the network handshakes are in flight.
 
-redis: "Redis[Any]" = Redis(
-    host=settings.REDIS_HOST,
-    port=settings.REDIS_PORT,
-)
+logger = setup_logger(__name__)
 
-core = FluentRuntimeCore(path='locales/{locale}/LC_MESSAGES')
-manager = RedisManager(redis, settings.DEFAULT_LOCALE)
 
+def setup_instrumentation() -> Optional["Tracer"]:
+    """
+    Makes the database engine count its statements for the metrics and creates the tracer, if tracing is enabled.
 
-async def main():
+    Returns:
+        Optional[Tracer]: The tracer, or None if tracing is disabled.
     """
-    The main function of the application.
+    from database.engine import engine
+    from utils.metrics import instrument_engine
+    from utils.tracing import JsonLinesExporter, Tracer, trace_engine
+
+    instrument_engine(engine)
+
+    if not settings.TRACING_ENABLED:
+        return None
+
+    trace_engine(engine)
+    return Tracer(exporter=JsonLinesExporter(settings.TRACING_FILE,
+                                             max_bytes=settings.TRACING_MAX_BYTES,
+                                             backup_count=settings.TRACING_BACKUP_COUNT),
+                  sample_rate=settings.TRACING_SAMPLE_RATE,
+                  slow_threshold_ms=settings.TRACING_SLOW_THRESHOLD_MS)
 
-    This function sets up the bot, the dispatcher, the dialogues, the internationalization middleware, and the database session middleware.
-    It also includes the router and starts polling for updates from Telegram.
+
+def create_redis() -> "InstrumentedRedis[Any]":
     """
-    #await drop_db()
-    await create_db()
+    Creates the Redis connection of the bot, shared by the storage, the locales, the caches and the jobs.
 
-    key_builder = DefaultKeyBuilder(with_destiny=True)
-    storage = RedisStorage(redis=redis, key_builder=key_builder)
-    events_isolation = RedisEventIsolation(redis=redis, key_builder=key_builder)
+    Its connection pool is bounded, a command waits for a free connection instead of opening a new one.
+
+    Returns:
+        InstrumentedRedis[Any]: The Redis connection.
+    """
+    from redis.asyncio import BlockingConnectionPool
+
+    from utils.metrics import InstrumentedRedis
+
+    return InstrumentedRedis.from_pool(BlockingConnectionPool(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+    ))
+
+
+def create_i18n_core() -> "FluentRuntimeCore":
+    """
+    Creates the Fluent core holding the translations.
+
+    Returns:
+        FluentRuntimeCore: The core, its locales are loaded on startup.
+    """
+    from utils.i18n_core import ThreadedFluentRuntimeCore
+
+    return ThreadedFluentRuntimeCore(path='locales/{locale}/LC_MESSAGES')
+
+
+def create_tmdb_cassette() -> Optional["TMDBCassette"]:
+    """
+    Creates the cassette recording or replaying the TMDB responses, if it is enabled.
+
+    Returns:
+        Optional[TMDBCassette]: The cassette, or None if TMDB is called directly.
+    """
+    if settings.TMDB_CASSETTE_MODE is None:
+        return None
+
+    from utils.tmdb_cassette import TMDBCassette
+
+    return TMDBCassette(settings.TMDB_CASSETTE_DIR,
+                        mode=settings.TMDB_CASSETTE_MODE,
+                        latency=settings.TMDB_REPLAY_LATENCY,
+                        rate_limited_rate=settings.TMDB_REPLAY_429_RATE,
+                        timeout_rate=settings.TMDB_REPLAY_TIMEOUT_RATE,
+                        timeout=settings.TMDB_TIMEOUT)
+
+
+def create_tmdb_client(redis: "Redis[Any]", base_url: Optional[str] = None) -> "TMDBClient":
+    """
+    Creates the TMDB client with the shared rate limiter, the circuit breaker, the coalescing layer
+    and the in-memory response cache.
 
-    bot = Bot(token=settings.TOKEN.get_secret_value(),
+    Args:
+        redis (Redis[Any]): The Redis connection.
+        base_url (Optional[str]): The base URL of the TMDB API. Defaults to `settings.TMDB_BASE_URL`.
+
+    Returns:
+        TMDBClient: The TMDB client.
+    """
+    from utils.circuit_breaker import CircuitBreaker
+    from utils.rate_limiter import RedisTokenBucket
+    from utils.single_flight import SingleFlight
+    from utils.tmdb_client import TMDBClient
+    from utils.ttl_cache import TTLCache
+
+    return TMDBClient(
+        rate_limiter=RedisTokenBucket(redis,
+                                      key="tmdb:rate_limit",
+                                      rate=settings.TMDB_RATE_LIMIT,
+                                      capacity=settings.TMDB_RATE_BURST,
+                                      max_wait=settings.TMDB_RATE_MAX_WAIT),
+        circuit_breaker=CircuitBreaker(failure_threshold=settings.TMDB_BREAKER_THRESHOLD,
+                                       recovery_timeout=settings.TMDB_BREAKER_RECOVERY),
+        single_flight=SingleFlight(redis=redis if settings.TMDB_COALESCE_ACROSS_PROCESSES else None,
+                                   lock_timeout=settings.TMDB_COALESCE_LOCK_TIMEOUT),
+        base_url=base_url or settings.TMDB_BASE_URL,
+        cassette=create_tmdb_cassette(),
+        cache=TTLCache(max_size=settings.TMDB_CACHE_SIZE, ttl=settings.TMDB_CACHE_TTL)
+        if settings.TMDB_CACHE_SIZE else None,
+    )
+
+
+def create_bot_session() -> "KeepAliveAiohttpSession":
+    """
+    Creates the aiohttp session of the Bot API with a bounded connection pool kept alive between the calls
+    and a request timeout.
+
+    Returns:
+        KeepAliveAiohttpSession: The session.
+    """
+    from utils.bot_session import KeepAliveAiohttpSession
+
+    return KeepAliveAiohttpSession(limit=settings.BOT_API_CONNECTIONS,
+                                   keepalive_timeout=settings.BOT_API_KEEPALIVE,
+                                   timeout=settings.BOT_API_TIMEOUT)
+
+
+def create_bot(session: Optional["BaseSession"] = None, token: Optional[str] = None,
+               tracer: Optional["Tracer"] = None) -> "Bot":
+    """
+    Creates the bot. Its calls are retried on flood control and transient errors, and their latency is recorded.
+
+    Args:
+        session (Optional[BaseSession]): The session sending the Bot API requests.
+            Defaults to the one of `create_bot_session`.
+        token (Optional[str]): The bot token. Defaults to `settings.TOKEN`.
+        tracer (Optional[Tracer]): The tracer, its traces then include the Bot API requests. Defaults to None.
+
+    Returns:
+        Bot: The bot.
+    """
+    from aiogram import Bot
+    from aiogram.client.default import DefaultBotProperties
+    from aiogram.enums import ParseMode
+
+    from middlewares.bot_api import BotApiRetryMiddleware
+
+    bot = Bot(token=token or settings.TOKEN.get_secret_value(),
+              session=session or create_bot_session(),
               default=DefaultBotProperties(parse_mode=ParseMode.HTML)
               )
+    bot.session.middleware(BotApiRetryMiddleware(max_retries=settings.BOT_API_MAX_RETRIES,
+                                                 max_retry_after=settings.BOT_API_MAX_RETRY_AFTER,
+                                                 backoff=settings.BOT_API_BACKOFF))
+
+    if tracer:
+        from middlewares.tracing import BotApiTracingMiddleware
+
+        bot.session.middleware(BotApiTracingMiddleware())
+
+    return bot
+
+
+def create_event_isolation(redis: "Redis[Any]", key_builder: "KeyBuilder") -> "BaseEventIsolation":
+    """
+    Creates the isolation keeping the updates of a chat from being handled concurrently, as configured.
+
+    The local isolation takes an asyncio lock of the process, the Redis isolation a lock in Redis,
+    which costs at least two round trips per update but also isolates the updates handled by other processes.
+
+    Args:
+        redis (Redis[Any]): The Redis connection holding the Redis locks.
+        key_builder (KeyBuilder): The key builder of the FSM storage.
+
+    Returns:
+        BaseEventIsolation: The event isolation.
+    """
+    from aiogram.fsm.storage.memory import DisabledEventIsolation
+    from aiogram.fsm.storage.redis import RedisEventIsolation
+
+    from enums import IsolationMode
+    from utils.event_isolation import LocalEventIsolation
 
-    await bot.delete_webhook()
+    if settings.EVENT_ISOLATION == IsolationMode.REDIS:
+        return RedisEventIsolation(redis=redis, key_builder=key_builder)
+    if settings.EVENT_ISOLATION == IsolationMode.NONE:
+        return DisabledEventIsolation()
 
-    dp = Dispatcher(storage=storage, event_isolation=events_isolation)
+    return LocalEventIsolation()
+
+
+def create_dispatcher(redis: "Redis[Any]", tmdb_client: "TMDBClient", core: Optional["FluentRuntimeCore"] = None,
+                      tracer: Optional["Tracer"] = None) -> "Dispatcher":
+    """
+    Creates the dispatcher with the dialogues, the metrics, the tracing, the internationalization middleware,
+    the database session middleware and the router.
+
+    The updates being handled are tracked, the first shutdown handler waits for them
+    while the locales, the storage, the event isolation and the bot session are still available,
+    the storage and the isolation are closed once the broadcast is stopped. Their number also pauses
+    the prefetching of movie details under load. Bursts of navigation clicks are collapsed into a single render.
+    The locale, the FSM state and the dialog of the user are read from Redis in a single round trip per update.
+    The updates of a chat are isolated as set by `EVENT_ISOLATION`.
+
+    The reminder scheduler is created here, so the handlers setting reminders can wake it up,
+    and is started by `main`. An interrupted broadcast is resumed on startup and stopped after the drain
+    on shutdown, its progress is kept in Redis.
+
+    The router can be attached to a single dispatcher, so this function is called once per process.
+
+    Args:
+        redis (Redis[Any]): The Redis connection used for the FSM storage, the user locales, the trending movies
+            and the cached list views.
+        tmdb_client (TMDBClient): The TMDB client passed to the handlers, also behind their inline movie search.
+        core (Optional[FluentRuntimeCore]): The Fluent core. Defaults to a new one.
+        tracer (Optional[Tracer]): The tracer of the updates. Defaults to None.
+
+    Returns:
+        Dispatcher: The dispatcher.
+    """
+    from aiogram import Dispatcher
+    from aiogram.fsm.storage.redis import DefaultKeyBuilder
+    from aiogram_dialog import setup_dialogs
+
+    from database.engine import async_session
+    from enums import Language
+    from jobs.broadcast import Broadcaster
+    from jobs.reminders import ReminderScheduler
+    from middlewares.coalescing import CallbackCoalescingMiddleware
+    from middlewares.db import DataBaseSession
+    from middlewares.fsm import register_before_fsm
+    from middlewares.in_flight import InFlightMiddleware
+    from middlewares.redis_prefetch import RedisPrefetchMiddleware
+    from middlewares.metrics import MetricsMiddleware, collect_commands
+    from middlewares.tracing import TracingMiddleware, TracedI18nMiddleware
+    from routers import router
+    from utils.fsm_storage import ExpiringRedisStorage
+    from utils.inline_search import InlineMovieSearch
+    from utils.list_view_cache import ListViewCache
+    from utils.prefetcher import Prefetcher
+    from utils.redis_manager import RedisManager
+    from utils.trending import TrendingTracker
+
+    key_builder = DefaultKeyBuilder(with_destiny=True)
+    storage = ExpiringRedisStorage(redis=redis, key_builder=key_builder,
+                                   state_ttl=settings.FSM_STATE_TTL,
+                                   data_ttl=settings.FSM_DATA_TTL,
+                                   dialog_ttl=settings.DIALOG_TTL)
+    events_isolation = create_event_isolation(redis, key_builder)
+
+    core = core or create_i18n_core()
+    reminders = ReminderScheduler(redis, async_session, core,
+                                  default_locale=settings.DEFAULT_LOCALE,
+                                  batch_size=settings.REMINDERS_BATCH_SIZE,
+                                  max_sleep=settings.REMINDERS_MAX_SLEEP,
+                                  rate=settings.TELEGRAM_SEND_RATE)
+
+    broadcaster = Broadcaster(redis, async_session, core,
+                              default_locale=settings.DEFAULT_LOCALE,
+                              rate=settings.TELEGRAM_SEND_RATE,
+                              workers=settings.BROADCAST_WORKERS,
+                              batch_size=settings.BROADCAST_BATCH_SIZE)
+
+    inline_movie_search = InlineMovieSearch(redis, tmdb_client,
+                                            cache_ttl=settings.INLINE_CACHE_TTL,
+                                            debounce=settings.INLINE_DEBOUNCE)
+
+    in_flight = InFlightMiddleware(drain_timeout=settings.SHUTDOWN_DRAIN_TIMEOUT)
+    prefetcher = Prefetcher(tmdb_client, in_flight.tasks,
+                            concurrency=settings.PREFETCH_CONCURRENCY,
+                            max_in_flight=settings.PREFETCH_MAX_IN_FLIGHT)
+
+    dp = Dispatcher(storage=storage, events_isolation=events_isolation, tmdb_client=tmdb_client,
+                    inline_movie_search=inline_movie_search, trending=TrendingTracker(redis), reminders=reminders,
+                    broadcaster=broadcaster,
+                    list_views=ListViewCache(redis, ttl=settings.LIST_VIEW_TTL,
+                                             version_ttl=settings.LIST_VIEW_VERSION_TTL),
+                    prefetcher=prefetcher)
+
+    register_before_fsm(dp, in_flight)
+    # The dispatcher registers the closing of the storage and the isolation as its first shutdown handler,
+    # it is moved after the drain, so the updates being drained keep their locks and their storage.
+    dp.shutdown.handlers[:] = [item for item in dp.shutdown.handlers if item.callback != dp.fsm.close]
+    dp.shutdown.register(in_flight.drain)
+    dp.shutdown.register(prefetcher.close)
+    dp.startup.register(broadcaster.resume)
+    dp.shutdown.register(broadcaster.stop)
+    dp.shutdown.register(dp.fsm.close)
 
     setup_dialogs(dp)
 
-    i18n_middleware = I18nMiddleware(
+    commands = collect_commands(router)
+    MetricsMiddleware(commands).setup(dp)
+    if tracer:
+        register_before_fsm(dp, TracingMiddleware(tracer, commands))
+    CallbackCoalescingMiddleware(window=settings.CALLBACK_COALESCE_WINDOW).setup(dp)
+
+    locales = RedisManager(redis, settings.DEFAULT_LOCALE, ttl=settings.LOCALE_TTL)
+    RedisPrefetchMiddleware(storage, locales).setup(dp)
+
+    i18n_middleware = TracedI18nMiddleware(
         core=core,
-        manager=manager,
+        manager=locales,
         locale_key="locale",
         default_locale=Language.EN,
     )
@@ -68,18 +340,166 @@ async def main():
 
     dp.include_router(router)
 
-    await dp.start_polling(bot, drop_pending_updates=True)
+    return dp
+
+
+async def _timed(name: str, awaitable: Awaitable[Any]) -> Tuple[str, float]:
+    """
+    Awaits a startup step and measures it.
+
+    Args:
+        name (str): The name of the step.
+        awaitable (Awaitable[Any]): The step.
+
+    Returns:
+        Tuple[str, float]: The name and the duration of the step in seconds.
+    """
+    start = time.perf_counter()
+    await awaitable
+    return name, time.perf_counter() - start
+
+
+async def startup(bot: "Bot", redis: "Redis[Any]",
+                  tracer: Optional["Tracer"] = None) -> Tuple["Dispatcher", "TMDBClient"]:
+    """
+    Prepares everything the first update needs, running the independent steps concurrently:
+    the import of the routers, the database schema check, the Redis ping, the loading of the locales
+    and the Bot API handshake.
+
+    The updates sent while the bot was down are kept and handled by the last startup handler of the dispatcher
+    before polling starts, or dropped if the catch-up is disabled.
+
+    Args:
+        bot (Bot): The bot.
+        redis (Redis[Any]): The Redis connection.
+        tracer (Optional[Tracer]): The tracer of the updates. Defaults to None.
+
+    Returns:
+        Tuple[Dispatcher, TMDBClient]: The dispatcher and the TMDB client.
+    """
+    from database.engine import create_db
+    from utils.catch_up import BacklogCatchUp
+
+    start = time.perf_counter()
+    core = create_i18n_core()
+
+    steps = await asyncio.gather(
+        _timed("import_routers", asyncio.to_thread(importlib.import_module, "routers")),
+        _timed("create_db", create_db()),
+        _timed("redis_ping", redis.ping()),
+        _timed("load_locales", core.startup()),
+        _timed("delete_webhook", bot.delete_webhook(drop_pending_updates=not settings.CATCH_UP_ENABLED)),
+        _timed("get_me", bot.me()),
+    )
+
+    tmdb_client = create_tmdb_client(redis)
+    dp = create_dispatcher(redis, tmdb_client, core=core, tracer=tracer)
+
+    if settings.CATCH_UP_ENABLED:
+        dp.startup.register(BacklogCatchUp(max_age=settings.CATCH_UP_MAX_AGE,
+                                           concurrency=settings.CATCH_UP_CONCURRENCY,
+                                           allowed_updates=dp.resolve_used_update_types()).run)
+
+    logger.info("Startup took %.3f s: %s", time.perf_counter() - start,
+                ", ".join(f"{name}={duration:.3f} s" for name, duration in steps))
+
+    return dp, tmdb_client
+
+
+async def main():
+    """
+    The main function of the application.
+
+    This function creates the bot and runs the concurrent startup,
+    starts the background metadata refresher, the recommendations builder, the reminder scheduler, the Redis compaction and the metrics endpoint, and starts polling for updates from Telegram.
+    When polling stops, the updates being handled are drained and the database engine and the Redis pool are closed.
+    """
+    from database.engine import async_session, engine
+    from jobs.metadata_refresher import MetadataRefresher
+    from jobs.recommendations import RecommendationBuilder
+    from jobs.redis_compaction import RedisCompactor
+    from utils.metrics import CollectedMetric, registry, start_metrics_server
+
+    tracer = setup_instrumentation()
+    redis = create_redis()
+    bot = create_bot(tracer=tracer)
+
+    dp, tmdb_client = await startup(bot, redis, tracer=tracer)
+
+    registry.register(CollectedMetric(
+        "bot_tmdb_single_flight_calls_total", "Number of TMDB calls by the way they were served.",
+        collect=lambda: {(kind,): count for kind, count in tmdb_client.single_flight.stats().items()},
+        labels=("kind",), metric_type="counter"))
+
+    refresher = MetadataRefresher(redis=redis,
+                                  tmdb_client=tmdb_client,
+                                  session_pool=async_session,
+                                  interval=settings.TMDB_REFRESH_INTERVAL,
+                                  batch_size=settings.TMDB_REFRESH_BATCH_SIZE,
+                                  batch_delay=settings.TMDB_REFRESH_BATCH_DELAY)
+    refresher_task = asyncio.create_task(refresher.run())
+
+    recommendations = RecommendationBuilder(redis=redis,
+                                            session_pool=async_session,
+                                            interval=settings.RECOMMENDATIONS_INTERVAL,
+                                            top_k=settings.RECOMMENDATIONS_TOP_K)
+    recommendations_task = asyncio.create_task(recommendations.run())
+
+    reminders_task = asyncio.create_task(dp["reminders"].run(bot))
+
+    compactor = RedisCompactor(redis=redis,
+                               interval=settings.REDIS_COMPACTION_INTERVAL,
+                               scan_count=settings.REDIS_SCAN_COUNT,
+                               ttls={"fsm_state": settings.FSM_STATE_TTL,
+                                     "fsm_data": settings.FSM_DATA_TTL,
+                                     "dialog_stack": settings.DIALOG_TTL,
+                                     "dialog_context": settings.DIALOG_TTL,
+                                     "locale": settings.LOCALE_TTL,
+                                     "listview": settings.LIST_VIEW_VERSION_TTL})
+    compaction_task = asyncio.create_task(compactor.run())
+
+    registry.register(CollectedMetric(
+        "bot_redis_keys", "Number of Redis keys by key family, as of the last compaction.",
+        collect=lambda: {(family,): report.keys for family, report in compactor.report.items()},
+        labels=("family",)))
+    registry.register(CollectedMetric(
+        "bot_redis_memory_bytes", "Memory used by the Redis keys by key family, as of the last compaction.",
+        collect=lambda: {(family,): report.bytes for family, report in compactor.report.items()
+                         if report.bytes is not None},
+        labels=("family",)))
+
+    metrics_runner = None
+    if settings.METRICS_PORT:
+        metrics_runner = await start_metrics_server(settings.METRICS_HOST, settings.METRICS_PORT)
+
+    try:
+        await dp.start_polling(bot)
+    finally:
+        refresher_task.cancel()
+        recommendations_task.cancel()
+        reminders_task.cancel()
+        compaction_task.cancel()
+        await asyncio.gather(refresher_task, recommendations_task, reminders_task, compaction_task,
+                             return_exceptions=True)
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await engine.dispose()
+        await redis.aclose()
 
 
 if __name__ == '__main__':
     """
     The entry point of the application.
 
-    This block sets up the logger and runs the main function.
+    This block configures logging and runs the main function.
     It also handles KeyboardInterrupt and SystemExit exceptions.
     """
     try:
-        setup_logger()
+        configure_logging(level=settings.LOG_LEVEL,
+                          levels=settings.LOG_LEVELS,
+                          json_output=settings.LOG_JSON,
+                          sample_burst=settings.LOG_SAMPLE_BURST,
+                          sample_interval=settings.LOG_SAMPLE_INTERVAL)
         asyncio.run(main())
     except KeyboardInterrupt or SystemExit:
         print('Exit')
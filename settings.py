@@ -1,8 +1,10 @@
-from typing import List
+from typing import Dict, List, Optional
 
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from enums import CassetteMode, IsolationMode
+
 
 class Settings(BaseSettings):
     """
@@ -10,13 +12,91 @@ class Settings(BaseSettings):
 
     Attributes:
         TOKEN (SecretStr): The bot token.
-        DATABASE_URL (str): The database URL.
+        DATABASE_URL (str): The database URL. The /find search uses an FTS5 index on SQLite only,
+            the other databases are searched with a slower ILIKE scan.
         DEFAULT_LOCALE (str): The default locale.
         TMDB_API_KEY (SecretStr): The TMDB API key.
         REDIS_HOST (str): The Redis host.
         REDIS_PORT (int): The Redis port.
+        REDIS_MAX_CONNECTIONS (int): The size of the Redis connection pool shared by the whole process.
+        REDIS_POOL_TIMEOUT (float): The number of seconds a Redis command waits for a free connection.
         PAGE_SIZE (int): The page size.
         MAX_GENRES (int): The maximum number of genres.
+        TMDB_REFRESH_INTERVAL (int): The number of seconds between two reads of the TMDB change feed.
+        TMDB_REFRESH_BATCH_SIZE (int): The number of movies refreshed from TMDB at once.
+        TMDB_REFRESH_BATCH_DELAY (float): The number of seconds to wait between two refresh batches.
+        BOT_API_CONNECTIONS (int): The size of the connection pool of the Bot API session.
+        BOT_API_KEEPALIVE (float): The number of seconds an idle Bot API connection is kept open.
+        BOT_API_TIMEOUT (float): The number of seconds to wait for a Bot API response.
+        BOT_API_MAX_RETRIES (int): The number of retries of a Bot API call.
+        BOT_API_MAX_RETRY_AFTER (float): The largest flood control wait in seconds a Bot API call is retried after,
+            longer waits are raised to the caller.
+        BOT_API_BACKOFF (float): The number of seconds before the first retry of an idempotent Bot API call
+            after a network or server error.
+        TMDB_BASE_URL (Optional[str]): The base URL of the TMDB API, overridden to use a stand-in server.
+        TMDB_CASSETTE_MODE (Optional[CassetteMode]): Whether TMDB responses are recorded or replayed, None calls TMDB.
+        TMDB_CASSETTE_DIR (str): The directory of the recorded TMDB responses.
+        TMDB_REPLAY_LATENCY (str): The latency distribution of replayed TMDB responses, e.g. "lognormal:80:0.6".
+        TMDB_REPLAY_429_RATE (float): The share of replayed TMDB requests answered with a 429 status.
+        TMDB_REPLAY_TIMEOUT_RATE (float): The share of replayed TMDB requests timing out.
+        TMDB_TIMEOUT (float): The number of seconds to wait for a TMDB response.
+        TMDB_RATE_LIMIT (float): The number of TMDB requests per second shared by all processes.
+        TMDB_RATE_BURST (int): The maximum burst of TMDB requests.
+        TMDB_RATE_MAX_WAIT (float): The maximum number of seconds a request waits for the rate limiter.
+        TMDB_BREAKER_THRESHOLD (int): The number of consecutive TMDB failures opening the circuit.
+        TMDB_BREAKER_RECOVERY (float): The number of seconds the TMDB circuit stays open.
+        TMDB_COALESCE_ACROSS_PROCESSES (bool): Whether identical TMDB requests are coalesced across processes via Redis.
+        TMDB_COALESCE_LOCK_TIMEOUT (float): The number of seconds the Redis coalescing lock lives.
+        RECOMMENDATIONS_INTERVAL (int): The number of seconds between two updates of the recommendation neighbours.
+        RECOMMENDATIONS_TOP_K (int): The number of most similar movies kept per movie.
+        INLINE_CACHE_TTL (int): The number of seconds the results of an inline search are cached in Redis.
+        INLINE_CACHE_TIME (int): The number of seconds Telegram caches the answer to an inline query.
+        INLINE_DEBOUNCE (float): The number of seconds an inline query waits for a newer one before searching TMDB.
+        CATCH_UP_ENABLED (bool): Whether the updates sent while the bot was down are handled on startup.
+        CATCH_UP_MAX_AGE (float): The age in seconds above which an update sent while the bot was down is skipped.
+        CATCH_UP_CONCURRENCY (int): The number of updates from the backlog handled at once.
+        SHUTDOWN_DRAIN_TIMEOUT (float): The number of seconds the shutdown waits for the updates being handled.
+        EVENT_ISOLATION (IsolationMode): How the updates of a chat are kept from being handled concurrently,
+            "local" for a single process, "redis" when several processes share the bot, "none" for stateless handlers.
+            Defaults to "local", which does not isolate the updates across processes, so a deployment running
+            several processes, e.g. behind a webhook, must set "redis".
+        FSM_STATE_TTL (Optional[int]): The number of seconds an FSM state is kept after its last change, None keeps it.
+        FSM_DATA_TTL (Optional[int]): The number of seconds FSM data is kept after its last change, None keeps it.
+        DIALOG_TTL (Optional[int]): The number of seconds a dialog stack or context is kept after the last interaction
+            with it, None keeps it.
+        LOCALE_TTL (Optional[int]): The number of seconds the locale of an inactive user is kept, None keeps it.
+        REDIS_COMPACTION_INTERVAL (int): The number of seconds between two Redis compactions and memory reports.
+        REDIS_SCAN_COUNT (int): The number of keys read by every SCAN step of the Redis compaction.
+        CALLBACK_COALESCE_WINDOW (float): The number of seconds a navigation click of a burst waits for a newer one,
+            which then renders the window instead of it.
+        LIST_VIEW_TTL (int): The number of seconds the order of a sorted and filtered list of movies is cached.
+        LIST_VIEW_VERSION_TTL (int): The number of seconds the version of a list of movies is kept after its last
+            change, longer than LIST_VIEW_TTL.
+        TMDB_CACHE_TTL (int): The number of seconds a TMDB response is cached in memory.
+        TMDB_CACHE_SIZE (int): The largest number of TMDB responses cached in memory, 0 disables the cache.
+        PREFETCH_CONCURRENCY (int): The largest number of TMDB requests prefetching movie details at once.
+        PREFETCH_MAX_IN_FLIGHT (int): The number of updates being handled above which nothing is prefetched.
+        REMINDERS_HOUR (int): The hour of the day, in UTC, release reminders are sent at.
+        REMINDERS_BATCH_SIZE (int): The number of due release reminders loaded at once.
+        REMINDERS_MAX_SLEEP (float): The largest number of seconds the reminder scheduler sleeps.
+        TELEGRAM_SEND_RATE (float): The number of messages per second the bot sends on its own, such as reminders
+            and broadcasts, below the global limit of the Bot API.
+        ADMIN_IDS (List[int]): The Telegram IDs of the users allowed to broadcast.
+        BROADCAST_WORKERS (int): The number of messages of a broadcast sent at once.
+        BROADCAST_BATCH_SIZE (int): The number of users of a broadcast loaded at once, the progress is saved per batch.
+        LOG_LEVEL (str): The level of the root logger.
+        LOG_LEVELS (Dict[str, str]): The levels of specific loggers by logger name, e.g. {"database.requests": "WARNING"}.
+        LOG_JSON (bool): Whether the logs are written as JSON lines.
+        LOG_SAMPLE_BURST (int): The number of INFO lines per message passing per sampling interval, 0 disables sampling.
+        LOG_SAMPLE_INTERVAL (float): The length of a log sampling interval in seconds.
+        METRICS_HOST (str): The host of the Prometheus metrics endpoint.
+        METRICS_PORT (int): The port of the Prometheus metrics endpoint, 0 disables it.
+        TRACING_ENABLED (bool): Whether updates are traced.
+        TRACING_FILE (str): The path of the JSON lines file the kept traces are written to.
+        TRACING_MAX_BYTES (int): The size of the traces file triggering a rotation.
+        TRACING_BACKUP_COUNT (int): The number of rotated traces files kept.
+        TRACING_SAMPLE_RATE (float): The share of traces kept regardless of their duration.
+        TRACING_SLOW_THRESHOLD_MS (float): The duration in milliseconds above which a trace is always kept.
     """
     TOKEN: SecretStr
     DATABASE_URL: str
@@ -26,10 +106,92 @@ class Settings(BaseSettings):
 
     REDIS_HOST: str
     REDIS_PORT: int
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0
 
     PAGE_SIZE: int
     MAX_GENRES: int
 
+    TMDB_REFRESH_INTERVAL: int = 3600
+    TMDB_REFRESH_BATCH_SIZE: int = 10
+    TMDB_REFRESH_BATCH_DELAY: float = 1.0
+
+    BOT_API_CONNECTIONS: int = 100
+    BOT_API_KEEPALIVE: float = 60.0
+    BOT_API_TIMEOUT: float = 30.0
+    BOT_API_MAX_RETRIES: int = 3
+    BOT_API_MAX_RETRY_AFTER: float = 5.0
+    BOT_API_BACKOFF: float = 0.5
+
+    TMDB_BASE_URL: Optional[str] = None
+    TMDB_CASSETTE_MODE: Optional[CassetteMode] = None
+    TMDB_CASSETTE_DIR: str = "cassettes/tmdb"
+    TMDB_REPLAY_LATENCY: str = "fixed:0"
+    TMDB_REPLAY_429_RATE: float = 0.0
+    TMDB_REPLAY_TIMEOUT_RATE: float = 0.0
+    TMDB_TIMEOUT: float = 5.0
+    TMDB_RATE_LIMIT: float = 40.0
+    TMDB_RATE_BURST: int = 40
+    TMDB_RATE_MAX_WAIT: float = 2.0
+    TMDB_BREAKER_THRESHOLD: int = 5
+    TMDB_BREAKER_RECOVERY: float = 30.0
+    TMDB_COALESCE_ACROSS_PROCESSES: bool = False
+    TMDB_COALESCE_LOCK_TIMEOUT: float = 5.0
+
+    RECOMMENDATIONS_INTERVAL: int = 900
+    RECOMMENDATIONS_TOP_K: int = 50
+
+    INLINE_CACHE_TTL: int = 3600
+    INLINE_CACHE_TIME: int = 300
+    INLINE_DEBOUNCE: float = 0.3
+
+    CATCH_UP_ENABLED: bool = True
+    CATCH_UP_MAX_AGE: float = 1800.0
+    CATCH_UP_CONCURRENCY: int = 20
+    SHUTDOWN_DRAIN_TIMEOUT: float = 10.0
+    EVENT_ISOLATION: IsolationMode = IsolationMode.LOCAL
+    CALLBACK_COALESCE_WINDOW: float = 0.15
+
+    FSM_STATE_TTL: Optional[int] = 30 * 24 * 3600
+    FSM_DATA_TTL: Optional[int] = 30 * 24 * 3600
+    DIALOG_TTL: Optional[int] = 30 * 24 * 3600
+    LOCALE_TTL: Optional[int] = 365 * 24 * 3600
+    REDIS_COMPACTION_INTERVAL: int = 3600
+    REDIS_SCAN_COUNT: int = 1000
+
+    LIST_VIEW_TTL: int = 600
+    LIST_VIEW_VERSION_TTL: int = 24 * 3600
+    TMDB_CACHE_TTL: int = 300
+    TMDB_CACHE_SIZE: int = 5000
+    PREFETCH_CONCURRENCY: int = 2
+    PREFETCH_MAX_IN_FLIGHT: int = 20
+
+    REMINDERS_HOUR: int = 9
+    REMINDERS_BATCH_SIZE: int = 500
+    REMINDERS_MAX_SLEEP: float = 3600.0
+
+    TELEGRAM_SEND_RATE: float = 25.0
+
+    ADMIN_IDS: List[int] = []
+    BROADCAST_WORKERS: int = 8
+    BROADCAST_BATCH_SIZE: int = 200
+
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: Dict[str, str] = {}
+    LOG_JSON: bool = True
+    LOG_SAMPLE_BURST: int = 10
+    LOG_SAMPLE_INTERVAL: float = 1.0
+
+    METRICS_HOST: str = "127.0.0.1"
+    METRICS_PORT: int = 9101
+
+    TRACING_ENABLED: bool = True
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_MAX_BYTES: int = 10 * 1024 * 1024
+    TRACING_BACKUP_COUNT: int = 5
+    TRACING_SAMPLE_RATE: float = 0.01
+    TRACING_SLOW_THRESHOLD_MS: float = 1000.0
+
     model_config = SettingsConfigDict(
         env_file=('.env', 'stack.env'),
         env_file_encoding='utf-8',
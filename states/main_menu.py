@@ -17,4 +17,9 @@ class MainMenu(StatesGroup):
     choose_genre = State()
     error_genre = State()
     show_found_movies = State()
+    search_list = State()
+    recommendations = State()
+    stats = State()
+    trending = State()
+    set_reminder = State()
 
@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+
+# The settings are read when the modules of the bot are imported, so the database of the tests
+# is configured before any of them.
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'tests.sqlite3')}"
+os.environ.setdefault("TOKEN", "123456789:tests")
+os.environ["TRACING_ENABLED"] = "false"
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from redis.exceptions import RedisError
+from requests import ConnectionError, HTTPError, Response
+
+from utils import circuit_breaker
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from utils.rate_limiter import RateLimitExceeded
+from utils.tmdb_client import TMDBClient, TMDBUnavailableError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def open_breaker(clock) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock[0] += 30
+    return breaker
+
+
+class FailingLimiter:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+    async def acquire(self) -> None:
+        raise self.error
+
+
+def http_error(status: int) -> HTTPError:
+    response = Response()
+    response.status_code = status
+    return HTTPError(response=response)
+
+
+def call_failing(breaker: CircuitBreaker, error: BaseException, rate_limiter=None):
+    def call(**params):
+        raise error
+
+    client = TMDBClient(rate_limiter=rate_limiter, circuit_breaker=breaker)
+    return asyncio.run(client._call("movie/info", call))
+
+
+def test_consecutive_failures_open_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=30)
+
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    clock[0] += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_single_trial_call_after_the_recovery_timeout(clock):
+    breaker = open_breaker(clock)
+
+    breaker.before_call()
+    assert breaker.state == CircuitState.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.failures == 0
+
+
+def test_failed_trial_call_opens_the_circuit_again(clock):
+    breaker = open_breaker(clock)
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_cancelled_trial_call_is_given_back(clock):
+    breaker = open_breaker(clock)
+
+    breaker.before_call()
+    breaker.cancel_trial()
+    assert breaker.state == CircuitState.OPEN
+
+    breaker.before_call()
+    assert breaker.state == CircuitState.HALF_OPEN
+
+
+@pytest.mark.parametrize("error", [http_error(503), http_error(429), ConnectionError(), ValueError()])
+def test_failed_requests_are_recorded(clock, error):
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30)
+
+    with pytest.raises((TMDBUnavailableError, ValueError)):
+        call_failing(breaker, error)
+
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_client_error_is_a_success(clock):
+    breaker = open_breaker(clock)
+
+    with pytest.raises(HTTPError):
+        call_failing(breaker, http_error(404))
+
+    assert breaker.state == CircuitState.CLOSED
+
+
+@pytest.mark.parametrize("error", [RateLimitExceeded(), RedisError("connection refused")])
+def test_failing_rate_limiter_is_not_recorded(clock, error):
+    breaker = open_breaker(clock)
+
+    with pytest.raises(TMDBUnavailableError):
+        call_failing(breaker, ValueError(), rate_limiter=FailingLimiter(error))
+
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.failures == 2
+    breaker.before_call()
+    assert breaker.state == CircuitState.HALF_OPEN
+
+
+def test_cancelled_request_is_not_recorded(clock):
+    breaker = open_breaker(clock)
+
+    with pytest.raises(asyncio.CancelledError):
+        call_failing(breaker, ValueError(), rate_limiter=FailingLimiter(asyncio.CancelledError()))
+
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.failures == 2
+    breaker.before_call()
+    assert breaker.state == CircuitState.HALF_OPEN
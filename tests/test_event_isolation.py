@@ -0,0 +1,91 @@
+import asyncio
+
+from aiogram.fsm.storage.base import StorageKey
+from fakeredis import FakeAsyncRedis
+
+from enums import IsolationMode
+from settings import settings
+from utils.event_isolation import LocalEventIsolation
+
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+
+def test_updates_of_a_chat_run_one_after_another():
+    isolation = LocalEventIsolation()
+    order = []
+    active = 0
+    peak = 0
+
+    async def handle(index: int) -> None:
+        nonlocal active, peak
+        async with isolation.lock(KEY):
+            active += 1
+            peak = max(peak, active)
+            order.append(index)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def main() -> None:
+        await asyncio.gather(*(handle(index) for index in range(5)))
+
+    asyncio.run(main())
+
+    assert peak == 1
+    assert order == [0, 1, 2, 3, 4]
+    assert isolation.locks == 0
+
+
+def test_lock_is_released_when_the_holder_is_cancelled():
+    isolation = LocalEventIsolation()
+
+    async def hold() -> None:
+        async with isolation.lock(KEY):
+            await asyncio.sleep(10)
+
+    async def main() -> None:
+        task = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert isolation.locks == 1
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        async with isolation.lock(KEY):
+            pass
+
+    asyncio.run(main())
+
+    assert isolation.locks == 0
+
+
+def test_close_while_a_lock_is_held():
+    isolation = LocalEventIsolation()
+
+    async def main() -> None:
+        async with isolation.lock(KEY):
+            await isolation.close()
+
+    asyncio.run(main())
+
+    assert isolation.locks == 0
+
+
+def test_dispatcher_uses_the_configured_isolation(monkeypatch):
+    import run
+
+    created = []
+    create_event_isolation = run.create_event_isolation
+
+    def spy(redis, key_builder):
+        created.append(create_event_isolation(redis, key_builder))
+        return created[-1]
+
+    monkeypatch.setattr(settings, "EVENT_ISOLATION", IsolationMode.LOCAL)
+    monkeypatch.setattr(run, "create_event_isolation", spy)
+
+    redis = FakeAsyncRedis()
+    dp = run.create_dispatcher(redis, run.create_tmdb_client(redis))
+
+    assert isinstance(created[0], LocalEventIsolation)
+    assert dp.fsm.events_isolation is created[0]
@@ -0,0 +1,34 @@
+import asyncio
+
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeAsyncRedisConnection
+from redis.asyncio import ConnectionPool
+
+from utils.metrics import InstrumentedRedis, UpdateStats, current_stats
+
+
+def test_redis_commands_of_pipelines_are_counted():
+    async def run() -> UpdateStats:
+        redis = InstrumentedRedis(connection_pool=ConnectionPool(connection_class=FakeAsyncRedisConnection,
+                                                                 server=FakeServer()))
+        stats = UpdateStats()
+        current_stats.set(stats)
+
+        await redis.set("views", 1)
+
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.incr("views")
+            pipe.expire("views", 60)
+            await pipe.execute()
+
+        async with redis.pipeline() as pipe:
+            await pipe.watch("views")
+            views = await pipe.get("views")
+            pipe.multi()
+            pipe.set("copy", views)
+            await pipe.execute()
+
+        await redis.aclose()
+        return stats
+
+    assert asyncio.run(run()).redis == 6
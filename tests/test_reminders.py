@@ -0,0 +1,68 @@
+import asyncio
+
+from datetime import datetime, timezone
+
+from fakeredis import FakeAsyncRedis
+
+from database.engine import async_session, create_db, drop_db, engine
+from database.requests import db_add_movie, db_add_user, db_get_due_reminders, db_set_reminder
+from jobs import reminders
+from jobs.reminders import ReminderScheduler
+
+
+NOW = datetime(2026, 10, 19, 12, 0, 30)
+USER_ID = 1
+OTHER_USER_ID = 2
+
+
+class Bot:
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        self.messages.append((chat_id, text))
+
+
+class Core:
+    @staticmethod
+    def get(key: str, locale: str, **kwargs) -> str:
+        return key
+
+
+def test_tick_sends_the_reminders_of_the_current_slot_one_message_per_user(monkeypatch):
+    monkeypatch.setattr(reminders.time, "time", lambda: NOW.replace(tzinfo=timezone.utc).timestamp())
+    monkeypatch.setattr(reminders, "utcnow", lambda: NOW)
+
+    async def run() -> None:
+        try:
+            await drop_db()
+            await create_db()
+
+            async with async_session() as session:
+                await db_add_user(session, {"tg_id": USER_ID, "user_name": "user"})
+                await db_add_user(session, {"tg_id": OTHER_USER_ID, "user_name": "other"})
+                for movie_id, name in ((603, "The Matrix"), (604, "The Matrix Reloaded"), (605, "Inception")):
+                    await db_add_movie(session, {"tmdb_id": movie_id, "movie_name": name})
+
+                await db_set_reminder(session, USER_ID, 603, "2026-10-20", 1, NOW.replace(second=0))
+                await db_set_reminder(session, USER_ID, 604, "2026-10-20", 1, NOW.replace(second=45))
+                await db_set_reminder(session, USER_ID, 605, "2026-10-20", 1, NOW.replace(minute=1, second=10))
+                await db_set_reminder(session, OTHER_USER_ID, 603, "2026-10-20", 1, NOW.replace(minute=0, second=0))
+
+            bot = Bot()
+            scheduler = ReminderScheduler(FakeAsyncRedis(), async_session, Core(), "en", batch_size=10,
+                                          max_sleep=300, rate=30)
+
+            assert await scheduler.tick(bot) == 40
+
+            assert sorted(chat_id for chat_id, _ in bot.messages) == [USER_ID, OTHER_USER_ID]
+            text = dict(bot.messages)[USER_ID]
+            assert "The Matrix<" in text and "The Matrix Reloaded" in text and "Inception" not in text
+
+            async with async_session() as session:
+                left = await db_get_due_reminders(session, until=NOW.replace(hour=13), limit=10)
+            assert [(reminder.user_tg_id, reminder.movie_tmdb_id) for reminder in left] == [(USER_ID, 605)]
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from database import requests
+from database.engine import async_session, create_db, drop_db, engine
+from database.requests import db_add_movie_to_user, db_add_user, db_delete_movie_from_user, db_search_users_movies
+
+
+USER_ID = 1
+OTHER_USER_ID = 2
+
+
+async def _fill_database() -> None:
+    await drop_db()
+    await create_db()
+
+    async with async_session() as session:
+        await db_add_user(session, {"tg_id": USER_ID, "user_name": "user"})
+        await db_add_user(session, {"tg_id": OTHER_USER_ID, "user_name": "other"})
+        await db_add_movie_to_user(session, USER_ID, {"tmdb_id": 603, "movie_name": "The Matrix",
+                                                      "titles": ["Матрица"], "original_title": "The Matrix"})
+        await db_add_movie_to_user(session, USER_ID, {"tmdb_id": 27205, "movie_name": "Inception"})
+        await db_add_movie_to_user(session, OTHER_USER_ID, {"tmdb_id": 604, "movie_name": "The Matrix Reloaded"})
+
+
+async def _search(query: str):
+    async with async_session() as session:
+        return [row.tmdb_id for row in await db_search_users_movies(session, USER_ID, query, "en", 10)]
+
+
+@pytest.fixture(params=["fts", "like"])
+def search_index(request, monkeypatch):
+    if request.param == "like":
+        monkeypatch.setattr(requests, "_has_search_index", lambda session: False)
+    return request.param
+
+
+def test_search_finds_the_movies_of_the_user_by_a_word_prefix(search_index):
+    async def run() -> None:
+        try:
+            await _fill_database()
+
+            assert await _search("matr") == [603]
+            assert await _search("the matrix") == [603]
+            assert await _search("incep") == [27205]
+            assert await _search("reloaded") == []
+            assert await _search("!!") == []
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_search_finds_the_localized_titles_with_the_index():
+    async def run() -> None:
+        try:
+            await _fill_database()
+
+            assert await _search("матр") == [603]
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_deleted_movie_is_not_found(search_index):
+    async def run() -> None:
+        try:
+            await _fill_database()
+
+            async with async_session() as session:
+                await db_delete_movie_from_user(session, USER_ID, 603)
+
+            assert await _search("matrix") == []
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,53 @@
+import asyncio
+
+from database.engine import async_session, create_db, drop_db, engine
+from database.requests import db_add_movie_to_user, db_add_user, db_delete_movie_from_user, db_get_user_stats, \
+    db_rebuild_user_stats, db_set_movie_genre_masks
+from utils.genres import genre_mask
+
+
+USER_ID = 1
+OTHER_USER_ID = 2
+
+
+async def _genre_counts(tg_id: int):
+    async with async_session() as session:
+        return (await db_get_user_stats(session, tg_id)).genre_counts
+
+
+async def _rebuilt_genre_counts(tg_id: int):
+    async with async_session() as session:
+        return (await db_rebuild_user_stats(session, tg_id)).genre_counts
+
+
+def test_genres_of_a_backfilled_mask_are_counted_once():
+    async def run() -> None:
+        try:
+            await drop_db()
+            await create_db()
+
+            async with async_session() as session:
+                await db_add_user(session, {"tg_id": USER_ID, "user_name": "user"})
+                await db_add_user(session, {"tg_id": OTHER_USER_ID, "user_name": "other"})
+                await db_add_movie_to_user(session, USER_ID, {"tmdb_id": 603, "movie_name": "The Matrix"})
+                await db_add_movie_to_user(session, USER_ID, {"tmdb_id": 27205, "movie_name": "Inception"})
+
+            assert await _genre_counts(USER_ID) == {}
+
+            async with async_session() as session:
+                await db_set_movie_genre_masks(session, {603: genre_mask([28, 878])})
+                await db_add_movie_to_user(session, OTHER_USER_ID, {"tmdb_id": 27205, "movie_name": "Inception",
+                                                                    "genre_mask": genre_mask([28])})
+
+            assert await _genre_counts(USER_ID) == {"28": 2, "878": 1}
+            assert await _genre_counts(OTHER_USER_ID) == {"28": 1}
+
+            async with async_session() as session:
+                await db_delete_movie_from_user(session, USER_ID, 603)
+
+            assert await _genre_counts(USER_ID) == {"28": 1}
+            assert await _rebuilt_genre_counts(USER_ID) == {"28": 1}
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+import ssl
+
+import certifi
+
+from aiogram import __version__
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiohttp import ClientSession, TCPConnector
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+
+
+class KeepAliveAiohttpSession(AiohttpSession):
+    """
+    This class is the aiohttp session of the Bot API, with a bounded connection pool whose idle connections
+    are kept alive for a configurable time.
+
+    `AiohttpSession` only exposes the size of the pool, so the client session and its connector
+    are built here. Proxies are not supported.
+    """
+
+    def __init__(self, limit: int, keepalive_timeout: float, **kwargs):
+        """
+        Initializes a new instance of the `KeepAliveAiohttpSession` class.
+
+        Args:
+            limit (int): The largest number of connections open at once.
+            keepalive_timeout (float): The number of seconds an idle connection is kept open.
+            **kwargs: The keyword arguments of `BaseSession`, e.g. `timeout`.
+        """
+        super().__init__(limit=limit, **kwargs)
+        self.limit = limit
+        self.keepalive_timeout = keepalive_timeout
+
+    def create_connector(self) -> TCPConnector:
+        """
+        Creates the connector of the client session.
+
+        Returns:
+            TCPConnector: The connector.
+        """
+        return TCPConnector(ssl=ssl.create_default_context(cafile=certifi.where()),
+                            limit=self.limit,
+                            keepalive_timeout=self.keepalive_timeout,
+                            ttl_dns_cache=3600)
+
+    async def create_session(self) -> ClientSession:
+        """
+        Returns the client session, creating it on the first call and after it was closed.
+
+        Returns:
+            ClientSession: The client session.
+        """
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(connector=self.create_connector(),
+                                          headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{__version__}"})
+
+        return self._session
@@ -0,0 +1,190 @@
+import asyncio
+import time
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from utils.logger import setup_logger
+
+
+logger = setup_logger(__name__)
+
+BATCH_SIZE = 100
+"""
+The largest number of updates the Bot API returns by a single `getUpdates` call.
+"""
+
+
+def get_update_chat_id(update: Update) -> Optional[int]:
+    """
+    Returns the chat an update belongs to, or the user for updates without a chat, such as inline queries.
+
+    Args:
+        update (Update): The update.
+
+    Returns:
+        Optional[int]: The id of the chat or the user, or None if the update has neither.
+    """
+    event = update.event
+    chat = getattr(event, "chat", None) or getattr(getattr(event, "message", None), "chat", None)
+    if chat:
+        return chat.id
+
+    user = getattr(event, "from_user", None)
+    return user.id if user else None
+
+
+def get_update_date(update: Update) -> Optional[datetime]:
+    """
+    Returns the time the user sent an update.
+
+    Callback queries carry only the date of the message the button belongs to, not the time of the click,
+    so they have no date.
+
+    Args:
+        update (Update): The update.
+
+    Returns:
+        Optional[datetime]: The time of the update, or None if it is unknown.
+    """
+    if update.callback_query:
+        return None
+
+    event = update.event
+    return getattr(event, "edit_date", None) or getattr(event, "date", None)
+
+
+class BacklogCatchUp:
+    """
+    This class processes the updates sent while the bot was down, before polling starts.
+
+    Its `run` method is registered as the last startup handler of the dispatcher. The backlog is fetched from
+    the Bot API in batches until it is empty, updates older than `max_age` are skipped and the others are handled
+    with at most `concurrency` handlers at once. Updates of the same chat are handled one after another in the order they were
+    sent, so a dialog sees the clicks and messages of its user in sequence. The offset of the last fetched update
+    is confirmed by the final empty fetch, so polling continues after the backlog.
+
+    A batch is handled before the next one is fetched, so a stop signal received meanwhile stops the catch-up
+    after the current batch, and the rest of the backlog is kept for the next start.
+    """
+
+    def __init__(self, max_age: float, concurrency: int, allowed_updates: Optional[List[str]] = None):
+        """
+        Initializes a new instance of the `BacklogCatchUp` class.
+
+        Args:
+            max_age (float): The age in seconds above which an update is skipped.
+            concurrency (int): The number of updates handled at once.
+            allowed_updates (Optional[List[str]]): The types of updates fetched. Defaults to the types polled before.
+        """
+        self.max_age = max_age
+        self.concurrency = concurrency
+        self.allowed_updates = allowed_updates
+
+    async def run(self, bot: Bot, dispatcher: Dispatcher) -> Dict[str, int]:
+        """
+        Fetches and handles the backlog, registered as a startup handler of the dispatcher.
+
+        Args:
+            bot (Bot): The bot.
+            dispatcher (Dispatcher): The dispatcher handling the updates.
+
+        Returns:
+            Dict[str, int]: The number of handled, skipped and failed updates.
+        """
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: List[bool] = []
+        skipped = 0
+        offset = None
+
+        while not self._stop_requested(dispatcher):
+            updates = await bot.get_updates(offset=offset, limit=BATCH_SIZE, timeout=0,
+                                            allowed_updates=self.allowed_updates)
+            if not updates:
+                break
+
+            offset = updates[-1].update_id + 1
+            now = datetime.now(timezone.utc)
+            last_tasks: Dict[Optional[int], asyncio.Task] = {}
+            tasks: List[asyncio.Task] = []
+
+            for update in updates:
+                date = get_update_date(update)
+                if date and (now - date).total_seconds() > self.max_age:
+                    skipped += 1
+                    continue
+
+                chat_id = get_update_chat_id(update)
+                task = asyncio.create_task(
+                    self._handle(bot, dispatcher, update, semaphore, previous=last_tasks.get(chat_id)))
+                tasks.append(task)
+                if chat_id is not None:
+                    last_tasks[chat_id] = task
+
+            results.extend(await asyncio.gather(*tasks) if tasks else [])
+        else:
+            if offset is not None:
+                # Confirms the handled batches, the update returned by this call is fetched again by the next run.
+                await bot.get_updates(offset=offset, limit=1, timeout=0, allowed_updates=self.allowed_updates)
+            logger.info("Stopping the catch-up, the rest of the backlog is handled on the next start")
+
+        stats = {"handled": sum(results), "skipped": skipped, "failed": len(results) - sum(results)}
+
+        if results or skipped:
+            logger.info("Caught up with %s updates in %.3f s: %s handled, %s skipped, %s failed",
+                        len(results) + skipped, time.perf_counter() - start,
+                        stats["handled"], stats["skipped"], stats["failed"])
+
+        return stats
+
+    @staticmethod
+    def _stop_requested(dispatcher: Dispatcher) -> bool:
+        """
+        Checks whether the dispatcher was asked to stop, by SIGINT or SIGTERM, while the backlog is handled.
+
+        aiogram sets its stop event from its signal handlers before the startup handlers run,
+        but does not expose it, so it is read defensively.
+
+        Args:
+            dispatcher (Dispatcher): The dispatcher.
+
+        Returns:
+            bool: True if polling is going to stop.
+        """
+        stop_signal = getattr(dispatcher, "_stop_signal", None)
+        return stop_signal is not None and stop_signal.is_set()
+
+    @staticmethod
+    async def _handle(bot: Bot, dispatcher: Dispatcher, update: Update, semaphore: asyncio.Semaphore,
+                      previous: Optional[asyncio.Task] = None) -> bool:
+        """
+        Handles an update after the previous update of its chat.
+
+        The update waits for its predecessor before taking a slot of the semaphore,
+        so waiting updates never block the other chats.
+
+        Args:
+            bot (Bot): The bot.
+            dispatcher (Dispatcher): The dispatcher handling the update.
+            update (Update): The update.
+            semaphore (asyncio.Semaphore): The semaphore bounding the number of handled updates.
+            previous (Optional[asyncio.Task]): The task handling the previous update of the chat. Defaults to None.
+
+        Returns:
+            bool: True if the update was handled without an error.
+        """
+        if previous:
+            await asyncio.wait([previous])
+
+        async with semaphore:
+            try:
+                await dispatcher.feed_update(bot, update)
+            except Exception:
+                logger.exception("Failed to handle update id=%s from the backlog", update.update_id)
+                return False
+
+        return True
@@ -0,0 +1,87 @@
+import time
+
+from enum import Enum
+
+
+class CircuitState(str, Enum):
+    """
+    Enum representing the states of a circuit breaker.
+
+    Attributes:
+        CLOSED: Calls pass through.
+        OPEN: Calls fail immediately.
+        HALF_OPEN: A single trial call is allowed to check whether the service recovered.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a call is rejected because the circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    This class is a circuit breaker protecting calls to an unreliable service.
+
+    After `failure_threshold` consecutive failures the circuit opens and every call is rejected
+    for `recovery_timeout` seconds. Then a single trial call is let through: its success closes the circuit,
+    its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float):
+        """
+        Initializes a new instance of the `CircuitBreaker` class.
+
+        Args:
+            failure_threshold (int): The number of consecutive failures opening the circuit.
+            recovery_timeout (float): The number of seconds the circuit stays open.
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def before_call(self) -> None:
+        """
+        Checks whether a call is allowed.
+
+        Raises:
+            CircuitOpenError: If the circuit is open or a trial call is already in progress.
+        """
+        if self.state == CircuitState.CLOSED:
+            return
+
+        if self.state == CircuitState.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = CircuitState.HALF_OPEN
+            return
+
+        raise CircuitOpenError("Circuit is open")
+
+    def record_success(self) -> None:
+        """
+        Records a successful call and closes the circuit.
+        """
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        """
+        Records a failed call and opens the circuit if the threshold is reached or the trial call failed.
+        """
+        self.failures += 1
+
+        if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+
+    def cancel_trial(self) -> None:
+        """
+        Gives back the trial call of a half-open circuit that was not made, so the next call becomes the trial.
+        """
+        if self.state == CircuitState.HALF_OPEN:
+            self.state = CircuitState.OPEN
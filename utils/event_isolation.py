@@ -0,0 +1,62 @@
+import asyncio
+
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict, Tuple
+
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+
+
+class LocalEventIsolation(BaseEventIsolation):
+    """
+    This class isolates the updates of a chat with an asyncio lock of the process, without a round trip to Redis.
+
+    Unlike `SimpleEventIsolation`, which keeps a lock for every chat it has ever seen, a lock is dropped
+    as soon as no update holds it or waits for it, so the memory is bounded by the number of updates in flight.
+    It only isolates the updates handled by this process, so the bot must run in a single process.
+    """
+
+    def __init__(self):
+        """
+        Initializes a new instance of the `LocalEventIsolation` class.
+        """
+        self._locks: Dict[StorageKey, Tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        """
+        Holds the lock of a key while the update is handled.
+
+        Args:
+            key (StorageKey): The storage key of the update.
+
+        Yields:
+            None: When the lock is held.
+        """
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+
+        try:
+            async with lock:
+                yield
+        finally:
+            entry = self._locks.get(key)
+            if entry is not None and entry[0] is lock:
+                if entry[1] > 1:
+                    self._locks[key] = (lock, entry[1] - 1)
+                else:
+                    del self._locks[key]
+
+    @property
+    def locks(self) -> int:
+        """
+        The number of locks held or waited for.
+        """
+        return len(self._locks)
+
+    async def close(self) -> None:
+        """
+        Drops the locks, the updates holding one release it on their own.
+        """
+        self._locks.clear()
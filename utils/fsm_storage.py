@@ -0,0 +1,101 @@
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+
+from utils.redis_snapshot import MISSING, snapshot_read, snapshot_write
+
+
+DIALOG_DESTINY_PREFIX = "aiogd:"
+"""
+The prefix of the destinies of the dialog stacks and contexts `aiogram_dialog` keeps in the FSM storage.
+"""
+
+
+class ExpiringRedisStorage(RedisStorage):
+    """
+    This class is the Redis FSM storage of the bot, with a TTL of its own for the dialog stacks and contexts.
+
+    `aiogram_dialog` writes the stack and the context of a dialog after every update it handles, so their TTL
+    is refreshed on every interaction and only the dialogs of inactive users expire. A user coming back
+    after that starts from /start, like a user whose dialog message is too old to edit.
+
+    The states and the data are read from the Redis snapshot of the update when it holds them,
+    and the writes are applied to it.
+    """
+
+    def __init__(self, *args: Any, dialog_ttl: Optional[int] = None, **kwargs: Any):
+        """
+        Initializes a new instance of the `ExpiringRedisStorage` class.
+
+        Args:
+            *args (Any): The arguments of `RedisStorage`, including `state_ttl` and `data_ttl`.
+            dialog_ttl (Optional[int]): The number of seconds the dialog stacks and contexts are kept after
+                their last write. Defaults to `data_ttl`.
+            **kwargs (Any): The keyword arguments of `RedisStorage`.
+        """
+        super().__init__(*args, **kwargs)
+        self.dialog_ttl = dialog_ttl if dialog_ttl is not None else self.data_ttl
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        """
+        Stores the data of a key, expiring the dialog stacks and contexts after `dialog_ttl` seconds.
+
+        Args:
+            key (StorageKey): The storage key.
+            data (Mapping[str, Any]): The data, empty data deletes the key.
+        """
+        redis_key = self.key_builder.build(key, "data")
+
+        if not key.destiny.startswith(DIALOG_DESTINY_PREFIX) or not data or not isinstance(data, dict):
+            await super().set_data(key, data)
+        else:
+            await self.redis.set(redis_key, self.json_dumps(data), ex=self.dialog_ttl)
+
+        snapshot_write(redis_key, self.json_dumps(data) if data else None)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        """
+        Reads the data of a key.
+
+        Args:
+            key (StorageKey): The storage key.
+
+        Returns:
+            Dict[str, Any]: The data, empty if the key does not exist.
+        """
+        value = await snapshot_read(self.redis, self.key_builder.build(key, "data"))
+        if value is MISSING:
+            return await super().get_data(key)
+        if value is None:
+            return {}
+
+        return self.json_loads(value.decode("utf-8") if isinstance(value, bytes) else value)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """
+        Stores the state of a key.
+
+        Args:
+            key (StorageKey): The storage key.
+            state (StateType): The state, None deletes the key.
+        """
+        await super().set_state(key, state)
+        snapshot_write(self.key_builder.build(key, "state"), state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """
+        Reads the state of a key.
+
+        Args:
+            key (StorageKey): The storage key.
+
+        Returns:
+            Optional[str]: The state, None if the key does not exist.
+        """
+        value = await snapshot_read(self.redis, self.key_builder.build(key, "state"))
+        if value is MISSING:
+            return await super().get_state(key)
+
+        return value.decode("utf-8") if isinstance(value, bytes) else value
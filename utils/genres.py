@@ -0,0 +1,40 @@
+from typing import Any, Dict, Iterable, List
+
+
+GENRE_IDS = (28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 10402, 9648, 10749, 878, 10770, 53, 10752, 37)
+"""
+The TMDB movie genre ids in the order of their bits in a genre mask.
+The order is stored in the database, so new genres may only be appended.
+"""
+
+GENRE_BITS: Dict[int, int] = {genre_id: 1 << bit for bit, genre_id in enumerate(GENRE_IDS)}
+
+
+def genre_mask(genre_ids: Iterable[Any]) -> int:
+    """
+    Builds the bitmask of a set of genres. Genres unknown to `GENRE_IDS` are ignored.
+
+    Args:
+        genre_ids (Iterable[Any]): The TMDB genre ids, as integers or strings.
+
+    Returns:
+        int: The bitmask with the bits of the genres set.
+    """
+    mask = 0
+    for genre_id in genre_ids:
+        mask |= GENRE_BITS.get(int(genre_id), 0)
+
+    return mask
+
+
+def mask_genre_ids(mask: int) -> List[int]:
+    """
+    Lists the genres of a bitmask.
+
+    Args:
+        mask (int): The bitmask.
+
+    Returns:
+        List[int]: The TMDB genre ids whose bits are set.
+    """
+    return [genre_id for genre_id, bit in GENRE_BITS.items() if mask & bit]
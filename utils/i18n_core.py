@@ -0,0 +1,19 @@
+import asyncio
+
+from aiogram_i18n.cores import FluentRuntimeCore
+
+
+class ThreadedFluentRuntimeCore(FluentRuntimeCore):
+    """
+    This class is a Fluent core loading the locale files once, in a worker thread.
+
+    The dispatcher calls `startup` when polling starts. Loading the locales earlier, concurrently with the other
+    startup work, turns that call into a no-op.
+    """
+
+    async def startup(self) -> None:
+        """
+        Loads the locale files, unless they are already loaded.
+        """
+        if not self.locales:
+            self.locales.update(await asyncio.to_thread(self.find_locales))
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import re
+import unicodedata
+
+from typing import Any, Dict, List, Optional
+
+from redis.asyncio import Redis
+
+from utils.tmdb_client import TMDBClient
+
+
+MOVIE_FIELDS = ("id", "title", "release_date", "vote_average", "overview", "poster_path")
+"""
+The fields of a found movie kept in the cache, the rest of the TMDB response is not shown inline.
+"""
+
+LATEST_QUERY_TTL = 60
+"""
+The number of seconds the sequence number of the latest inline query of a user is kept.
+"""
+
+
+def normalize_query(query: str, max_length: int = 64) -> str:
+    """
+    Normalizes an inline query, so queries differing only in case, spacing or Unicode form share a cache entry.
+
+    Args:
+        query (str): The query typed by the user.
+        max_length (int): The length the query is cut to. Defaults to 64.
+
+    Returns:
+        str: The normalized query.
+    """
+    query = unicodedata.normalize("NFKC", query).casefold()
+    return re.sub(r"\s+", " ", query).strip()[:max_length].rstrip()
+
+
+class InlineMovieSearch:
+    """
+    This class serves the movie searches of inline queries.
+
+    Results are cached in Redis per normalized query and locale. Telegram sends an inline query for every
+    keystroke, so on a cache miss the search waits `debounce` seconds and calls TMDB only if no newer query
+    of the same user arrived meanwhile. The superseded queries are left unanswered.
+    """
+
+    def __init__(self, redis: "Redis[Any]", tmdb_client: TMDBClient, cache_ttl: int, debounce: float):
+        """
+        Initializes a new instance of the `InlineMovieSearch` class.
+
+        Args:
+            redis (Redis[Any]): The Redis connection holding the cache and the latest query of every user.
+            tmdb_client (TMDBClient): The TMDB client.
+            cache_ttl (int): The number of seconds the results of a query are cached.
+            debounce (float): The number of seconds a query waits for a newer one before calling TMDB.
+        """
+        self.redis = redis
+        self.tmdb_client = tmdb_client
+        self.cache_ttl = cache_ttl
+        self.debounce = debounce
+
+    async def search(self, user_id: int, query: str, locale: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Searches movies for an inline query.
+
+        Args:
+            user_id (int): The ID of the user typing the query.
+            query (str): The query.
+            locale (str): The locale of the user.
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: The found movies, or None if a newer query of the user superseded this one.
+        """
+        normalized = normalize_query(query)
+        if not normalized:
+            return []
+
+        cache_key = f"inline:search:{locale}:{normalized}"
+        latest_key = f"inline:latest:{user_id}"
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.incr(latest_key)
+            pipe.expire(latest_key, LATEST_QUERY_TTL)
+            pipe.get(cache_key)
+            sequence, _, cached = await pipe.execute()
+
+        if cached is not None:
+            return json.loads(cached)
+
+        await asyncio.sleep(self.debounce)
+        if int(await self.redis.get(latest_key) or 0) != sequence:
+            return None
+
+        response = await self.tmdb_client.search_movie(query=normalized, language=locale)
+        movies = [{field: movie.get(field) for field in MOVIE_FIELDS} for movie in response["results"]]
+
+        await self.redis.set(cache_key, json.dumps(movies, ensure_ascii=False), ex=self.cache_ttl)
+        return movies
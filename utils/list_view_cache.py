@@ -0,0 +1,161 @@
+import time
+
+from typing import Any, List, Optional, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from utils.logger import setup_logger
+
+
+logger = setup_logger(__name__)
+
+
+class ListViewCache:
+    """
+    This class caches the sorted and filtered movie lists shown to the users, so flipping a page
+    reads a slice of a Redis list instead of sorting the whole list again.
+
+    Every view, a combination of a sorting type, a sorting order and a genre filter, is stored as a Redis list of
+    TMDB IDs under the current version of the user's list. The writes changing the list replace the version
+    with a new, never reused one, so the views of the previous version are never read again and expire
+    after `ttl` seconds. A view computed while the list changed is stored under the version read before
+    computing it, so a stale view is never served. The version of a list unchanged for `version_ttl` seconds
+    expires too, its views expired long before.
+
+    The cache fails open: when Redis fails, the views are computed from the database and not stored.
+    """
+
+    def __init__(self, redis: "Redis[Any]", ttl: int, version_ttl: int):
+        """
+        Initializes a new instance of the `ListViewCache` class.
+
+        Args:
+            redis (Redis[Any]): The Redis connection holding the views.
+            ttl (int): The number of seconds a view is kept, bounding how long changes of the TMDB ratings
+                take to show in the order.
+            version_ttl (int): The number of seconds the version of a list is kept after its last change,
+                longer than `ttl`.
+        """
+        self.redis = redis
+        self.ttl = ttl
+        self.version_ttl = max(version_ttl, ttl + 1)
+
+    @staticmethod
+    def _version_key(tg_id: int) -> str:
+        """
+        Returns the Redis key of the version of a user's list.
+
+        Args:
+            tg_id (int): The Telegram ID of the user.
+
+        Returns:
+            str: The key.
+        """
+        return f"listview:{tg_id}:version"
+
+    @staticmethod
+    def _view_key(tg_id: int, version: int, view: Tuple[Any, ...]) -> str:
+        """
+        Returns the Redis key of a view of a version of a user's list.
+
+        Args:
+            tg_id (int): The Telegram ID of the user.
+            version (int): The version of the user's list.
+            view (Tuple[Any, ...]): The sorting type, the sorting order and the filter of the view.
+
+        Returns:
+            str: The key.
+        """
+        return f"listview:{tg_id}:{version}:{':'.join(map(str, view))}"
+
+    async def version(self, tg_id: int) -> Optional[int]:
+        """
+        Returns the current version of a user's list.
+
+        Args:
+            tg_id (int): The Telegram ID of the user.
+
+        Returns:
+            Optional[int]: The version, or None if it could not be read, then the views are neither read nor stored.
+        """
+        try:
+            return int(await self.redis.get(self._version_key(tg_id)) or 0)
+        except RedisError:
+            logger.warning("Failed to read the list version of user tg_id=%s", tg_id, exc_info=True)
+            return None
+
+    async def get_page(self, tg_id: int, version: Optional[int], view: Tuple[Any, ...],
+                       start: int, stop: int) -> Optional[Tuple[List[int], int]]:
+        """
+        Reads a page of a cached view.
+
+        Args:
+            tg_id (int): The Telegram ID of the user.
+            version (Optional[int]): The version of the user's list.
+            view (Tuple[Any, ...]): The sorting type, the sorting order and the filter of the view.
+            start (int): The index of the first movie of the page.
+            stop (int): The index of the last movie of the page, inclusive.
+
+        Returns:
+            Optional[Tuple[List[int], int]]: The TMDB IDs of the movies of the page and the number of movies
+            in the view, or None if the view is not cached or could not be read.
+        """
+        if version is None:
+            return None
+
+        key = self._view_key(tg_id, version, view)
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.lrange(key, start, stop)
+                pipe.llen(key)
+                movie_ids, total = await pipe.execute()
+        except RedisError:
+            logger.warning("Failed to read a list view of user tg_id=%s", tg_id, exc_info=True)
+            return None
+
+        if not total:
+            return None
+
+        return [int(movie_id) for movie_id in movie_ids], total
+
+    async def store(self, tg_id: int, version: Optional[int], view: Tuple[Any, ...], movie_ids: List[int]) -> None:
+        """
+        Stores a view. Empty views are not stored, as Redis has no empty lists, and are cheap to compute.
+
+        Args:
+            tg_id (int): The Telegram ID of the user.
+            version (Optional[int]): The version of the user's list read before the view was computed.
+            view (Tuple[Any, ...]): The sorting type, the sorting order and the filter of the view.
+            movie_ids (List[int]): The TMDB IDs of the movies in the order of the view.
+        """
+        if not movie_ids or version is None:
+            return
+
+        key = self._view_key(tg_id, version, view)
+
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                pipe.rpush(key, *movie_ids)
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except RedisError:
+            logger.warning("Failed to store a list view of user tg_id=%s", tg_id, exc_info=True)
+
+    async def invalidate(self, tg_id: int) -> None:
+        """
+        Replaces the version of a user's list after a change, so the cached views are no longer read.
+
+        The version is the time of the change in nanoseconds rather than a counter, so a version starting over
+        after it expired never meets the views of an earlier one. A failure is logged and not raised,
+        as the change is already committed, the views of the list then show it once they expire.
+
+        Args:
+            tg_id (int): The Telegram ID of the user.
+        """
+        try:
+            await self.redis.set(self._version_key(tg_id), time.time_ns(), ex=self.version_ttl)
+        except RedisError:
+            logger.warning("Failed to invalidate the list views of user tg_id=%s", tg_id, exc_info=True)
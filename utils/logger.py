@@ -1,24 +1,199 @@
+import atexit
+import json
 import logging
 import sys
+import threading
+import time
 
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Dict, List, Optional, TextIO, Tuple
 
-def setup_logger():
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logger(name: Optional[str] = None) -> logging.Logger:
+    """
+    Returns the logger of a module.
+
+    The handlers, the format and the levels are configured once for the whole process by `configure_logging`.
+
+    Args:
+        name (Optional[str]): The name of the logger, usually `__name__` of the module. Defaults to this module.
+
+    Returns:
+        logging.Logger: The logger.
+    """
+    return logging.getLogger(name or __name__)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    This class formats log records as single line JSON objects.
     """
-    Sets up a logger with basic configuration.
 
-    The logger is set to log INFO level and higher messages. The format of the log message is:
-    [Time of Log] - [Log Level] - [Logger Name] - [Log Message]
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Formats a log record.
+
+        Args:
+            record (logging.LogRecord): The log record.
+
+        Returns:
+            str: The JSON object.
+        """
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            entry["suppressed"] = suppressed
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    This class rate limits chatty log lines.
+
+    Records are grouped by logger and message template, so the messages must be logged with lazy `%s` arguments
+    rather than pre-formatted strings. Every group passes at most `burst` records per `interval` seconds,
+    the following ones are dropped and their number is attached as `suppressed` to the first record of the next
+    interval. Records above `max_level` always pass.
+    """
+
+    MAX_GROUPS = 10_000
+
+    def __init__(self, burst: int, interval: float, max_level: int = logging.INFO):
+        """
+        Initializes a new instance of the `SamplingFilter` class.
+
+        Args:
+            burst (int): The number of records of a group passing per interval, 0 disables the sampling.
+            interval (float): The length of an interval in seconds.
+            max_level (int): The highest level sampled. Defaults to INFO.
+        """
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.max_level = max_level
+        self._groups: Dict[Tuple[str, object], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Decides whether a record is logged.
 
-    The log messages are outputted to stdout.
+        Args:
+            record (logging.LogRecord): The log record.
+
+        Returns:
+            bool: True if the record is logged.
+        """
+        if self.burst <= 0 or record.levelno > self.max_level:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+
+        with self._lock:
+            group = self._groups.get(key)
+
+            if group is None or now - group[0] >= self.interval:
+                if group is None and len(self._groups) >= self.MAX_GROUPS:
+                    self._groups.clear()
+                if group is not None and group[2]:
+                    record.suppressed = int(group[2])
+                self._groups[key] = [now, 1, 0]
+                return True
+
+            if group[1] < self.burst:
+                group[1] += 1
+                return True
+
+            group[2] += 1
+            return False
+
+
+def create_queue_handler(*handlers: logging.Handler) -> Tuple[QueueHandler, QueueListener]:
+    """
+    Creates a handler putting the records on a queue and a listener writing them with the given handlers
+    in a background thread, so the caller never waits for the output.
+
+    Args:
+        *handlers (logging.Handler): The handlers writing the records.
 
     Returns:
-        logging.Logger: The configured logger.
+        Tuple[QueueHandler, QueueListener]: The queue handler and the listener, which has to be started.
+    """
+    queue: SimpleQueue = SimpleQueue()
+    return QueueHandler(queue), QueueListener(queue, *handlers, respect_handler_level=True)
+
+
+def configure_logging(
+    level: str = "INFO",
+    levels: Optional[Dict[str, str]] = None,
+    json_output: bool = True,
+    sample_burst: int = 10,
+    sample_interval: float = 1.0,
+    stream: TextIO = sys.stdout,
+) -> None:
+    """
+    Configures the logging of the process.
+
+    The root logger gets a queue handler, a background thread formats the records and writes them to the stream.
+    Calling the function again replaces the previous configuration.
+
+    Args:
+        level (str): The level of the root logger. Defaults to "INFO".
+        levels (Optional[Dict[str, str]]): The levels of specific loggers by logger name. Defaults to None.
+        json_output (bool): Whether the records are written as JSON lines. Defaults to True.
+        sample_burst (int): The number of INFO records per message template passing per interval, 0 disables
+            the sampling. Defaults to 10.
+        sample_interval (float): The length of a sampling interval in seconds. Defaults to 1.0.
+        stream (TextIO): The stream the records are written to. Defaults to stdout.
+    """
+    global _listener
+
+    stop_logging()
+
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT))
+
+    queue_handler, _listener = create_queue_handler(output)
+    queue_handler.addFilter(SamplingFilter(sample_burst, sample_interval))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    for name, logger_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level.upper())
+
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """
+    Writes the queued records and stops the background writer thread, if it is running.
     """
-    logger = logging.getLogger(__name__)
+    global _listener
 
-    logging.basicConfig(level=logging.INFO,
-                        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-                        stream=sys.stdout)
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
-    return logger
 
+atexit.register(stop_logging)
@@ -0,0 +1,399 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    """
+    Escapes a label value for the Prometheus text format.
+
+    Args:
+        value (str): The label value.
+
+    Returns:
+        str: The escaped label value.
+    """
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    """
+    Formats label names and values for the Prometheus text format.
+
+    Args:
+        names (Iterable[str]): The label names.
+        values (Iterable[str]): The label values.
+
+    Returns:
+        str: The formatted labels, or an empty string if there are none.
+    """
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    This class is a monotonically increasing Prometheus counter.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        """
+        Initializes a new instance of the `Counter` class.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The help text of the metric.
+            labels (Iterable[str]): The label names of the metric. Defaults to no labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        """
+        Increments the counter.
+
+        Args:
+            *label_values (str): The values of the labels.
+            amount (float): The increment. Defaults to 1.
+        """
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        """
+        Renders the counter in the Prometheus text format.
+
+        Returns:
+            List[str]: The lines of the metric.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label_values, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class CollectedMetric:
+    """
+    This class is a Prometheus metric whose values are read from a callback at scrape time.
+    """
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Dict[LabelValues, float]],
+                 labels: Iterable[str] = (), metric_type: str = "gauge"):
+        """
+        Initializes a new instance of the `CollectedMetric` class.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The help text of the metric.
+            collect (Callable[[], Dict[LabelValues, float]]): The callback returning the values by label values.
+            labels (Iterable[str]): The label names of the metric. Defaults to no labels.
+            metric_type (str): The Prometheus type of the metric. Defaults to "gauge".
+        """
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        self.labels = tuple(labels)
+        self.metric_type = metric_type
+
+    def render(self) -> List[str]:
+        """
+        Renders the metric in the Prometheus text format.
+
+        Returns:
+            List[str]: The lines of the metric.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for label_values, value in self.collect().items():
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    This class is a Prometheus histogram with fixed buckets.
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initializes a new instance of the `Histogram` class.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The help text of the metric.
+            labels (Iterable[str]): The label names of the metric. Defaults to no labels.
+            buckets (Tuple[float, ...]): The upper bounds of the buckets. Defaults to `DEFAULT_BUCKETS`.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """
+        Records an observation.
+
+        The per-label state is a list of bucket counts followed by the sum and the count of observations.
+
+        Args:
+            value (float): The observed value.
+            *label_values (str): The values of the labels.
+        """
+        state = self.values.get(label_values)
+        if state is None:
+            state = self.values[label_values] = [0] * (len(self.buckets) + 2)
+
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            state[index] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def render(self) -> List[str]:
+        """
+        Renders the histogram in the Prometheus text format.
+
+        Returns:
+            List[str]: The lines of the metric.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+
+        for label_values, state in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, label_values + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, label_values + ('+Inf',))} {state[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {state[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {state[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    This class holds the metrics of the process and renders them in the Prometheus text format.
+    """
+
+    def __init__(self):
+        """
+        Initializes a new instance of the `MetricsRegistry` class.
+        """
+        self.metrics: List[Any] = []
+
+    def register(self, metric: Any) -> Any:
+        """
+        Registers a metric.
+
+        Args:
+            metric (Any): The counter, histogram or collected metric to register.
+
+        Returns:
+            Any: The registered metric.
+        """
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Renders all registered metrics.
+
+        Returns:
+            str: The metrics in the Prometheus text format.
+        """
+        lines = []
+        for metric in self.metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+@dataclass
+class UpdateStats:
+    """
+    Counters of the work done while handling a single update.
+
+    Attributes:
+        sql: Number of executed SQL statements.
+        tmdb: Number of TMDB requests.
+        redis: Number of Redis commands.
+        state: Dialog window state the update left the user in, None outside the dialogs.
+    """
+    sql: int = 0
+    tmdb: int = 0
+    redis: int = 0
+    state: Optional[str] = None
+
+
+current_stats: ContextVar[Optional[UpdateStats]] = ContextVar("current_stats", default=None)
+"""
+Counters of the update handled in the current context.
+"""
+
+registry = MetricsRegistry()
+
+update_latency = registry.register(Histogram(
+    "bot_update_duration_seconds", "Time spent handling an update.", labels=("handler", "state")))
+update_errors = registry.register(Counter(
+    "bot_update_errors_total", "Number of updates whose handling raised an exception.", labels=("handler", "state")))
+sql_statements = registry.register(Counter(
+    "bot_sql_statements_total", "Number of SQL statements executed while handling updates.",
+    labels=("handler", "state")))
+tmdb_calls = registry.register(Counter(
+    "bot_tmdb_calls_total", "Number of TMDB requests made while handling updates.", labels=("handler", "state")))
+redis_commands = registry.register(Counter(
+    "bot_redis_commands_total", "Number of Redis commands sent while handling updates.",
+    labels=("handler", "state")))
+callbacks_coalesced = registry.register(Counter(
+    "bot_callbacks_coalesced_total", "Number of button clicks whose render was skipped for a newer click."))
+bot_api_latency = registry.register(Histogram(
+    "bot_api_request_duration_seconds", "Time spent on a Bot API call, per attempt.", labels=("method",)))
+bot_api_errors = registry.register(Counter(
+    "bot_api_errors_total", "Number of failed Bot API calls.", labels=("method", "error")))
+bot_api_retries = registry.register(Counter(
+    "bot_api_retries_total", "Number of retried Bot API calls.", labels=("method", "reason")))
+
+
+def count_sql() -> None:
+    """
+    Counts an SQL statement for the current update.
+    """
+    stats = current_stats.get()
+    if stats is not None:
+        stats.sql += 1
+
+
+def count_tmdb() -> None:
+    """
+    Counts a TMDB request for the current update.
+    """
+    stats = current_stats.get()
+    if stats is not None:
+        stats.tmdb += 1
+
+
+def count_redis(amount: int = 1) -> None:
+    """
+    Counts Redis commands for the current update.
+
+    Args:
+        amount (int): The number of commands.
+    """
+    stats = current_stats.get()
+    if stats is not None:
+        stats.redis += amount
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Makes the engine count every executed SQL statement for the current update.
+
+    Args:
+        engine (AsyncEngine): The database engine.
+    """
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: count_sql())
+
+
+class InstrumentedPipeline(Pipeline):
+    """
+    This class is a Redis pipeline counting every command it sends for the current update,
+    including the queued ones sent in a single round trip.
+    """
+
+    async def immediate_execute_command(self, *args: Any, **options: Any) -> Any:
+        """
+        Counts a command sent while the pipeline is watching keys and executes it.
+
+        Args:
+            *args (Any): The command and its arguments.
+            **options (Any): The options of the command.
+
+        Returns:
+            Any: The response of the command.
+        """
+        count_redis()
+        return await super().immediate_execute_command(*args, **options)
+
+    async def execute(self, raise_on_error: bool = True) -> List[Any]:
+        """
+        Counts the queued commands and executes them.
+
+        Args:
+            raise_on_error (bool): Whether the first error of a command is raised.
+
+        Returns:
+            List[Any]: The responses of the commands.
+        """
+        count_redis(len(self.command_stack))
+        return await super().execute(raise_on_error)
+
+
+class InstrumentedRedis(Redis):
+    """
+    This class is a Redis client counting every command sent for the current update,
+    the commands of its pipelines included.
+    """
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> InstrumentedPipeline:
+        """
+        Creates a pipeline counting its commands.
+
+        Args:
+            transaction (bool): Whether the commands are executed atomically.
+            shard_hint (Optional[str]): The shard hint of the pipeline.
+
+        Returns:
+            InstrumentedPipeline: The pipeline.
+        """
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        """
+        Counts the command and executes it.
+
+        Args:
+            *args (Any): The command and its arguments.
+            **options (Any): The options of the command.
+
+        Returns:
+            Any: The response of the command.
+        """
+        count_redis()
+        return await super().execute_command(*args, **options)
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """
+    Starts an HTTP server exposing the metrics at `/metrics`.
+
+    Args:
+        host (str): The host to listen on.
+        port (int): The port to listen on.
+
+    Returns:
+        web.AppRunner: The runner of the server, used to stop it.
+    """
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    return runner
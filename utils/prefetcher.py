@@ -0,0 +1,104 @@
+import asyncio
+
+from typing import Collection, Dict, Iterable, Optional
+
+from utils.logger import setup_logger
+from utils.rate_limiter import RateLimitExceeded
+from utils.tmdb_client import TMDBClient, TMDBUnavailableError
+
+
+logger = setup_logger(__name__)
+
+
+class Prefetcher:
+    """
+    This class fetches the details of the movies a user is likely to open next into the cache of the TMDB client,
+    after a list of movies is shown.
+
+    Prefetching is speculative, so it never competes with the updates: every user has at most one prefetch
+    running, a newer list cancels it, the movies already cached are skipped, at most `concurrency` requests
+    of all prefetches run at once and nothing is prefetched while more than `max_in_flight` updates are handled.
+    Errors are ignored, the details are then fetched when the movie is opened.
+    """
+
+    def __init__(self, tmdb_client: TMDBClient, in_flight: Optional[Collection[asyncio.Task]],
+                 concurrency: int, max_in_flight: int):
+        """
+        Initializes a new instance of the `Prefetcher` class.
+
+        Args:
+            tmdb_client (TMDBClient): The TMDB client whose cache is warmed.
+            in_flight (Optional[Collection[asyncio.Task]]): The tasks handling an update right now,
+                measuring the load. Defaults to no load check.
+            concurrency (int): The largest number of prefetch requests running at once.
+            max_in_flight (int): The number of updates being handled above which nothing is prefetched.
+        """
+        self.tmdb_client = tmdb_client
+        self.in_flight = in_flight
+        self.max_in_flight = max_in_flight
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.tasks: Dict[int, asyncio.Task] = {}
+
+    @property
+    def overloaded(self) -> bool:
+        """
+        Whether the bot handles too many updates to prefetch.
+        """
+        return self.in_flight is not None and len(self.in_flight) > self.max_in_flight
+
+    def schedule(self, user_id: int, movie_ids: Iterable[int], language: Optional[str]) -> None:
+        """
+        Starts prefetching the details of movies for a user, cancelling the user's previous prefetch.
+
+        Args:
+            user_id (int): The Telegram ID of the user.
+            movie_ids (Iterable[int]): The TMDB IDs of the movies, the most likely to be opened first.
+            language (Optional[str]): The language of the details, the locale of the user.
+        """
+        previous = self.tasks.pop(user_id, None)
+        if previous:
+            previous.cancel()
+
+        if self.tmdb_client.cache is None or self.overloaded:
+            return
+
+        movie_ids = [int(movie_id) for movie_id in dict.fromkeys(movie_ids)
+                     if not self.tmdb_client.is_cached(int(movie_id), language)]
+        if not movie_ids:
+            return
+
+        task = asyncio.create_task(self._prefetch(movie_ids, language))
+        self.tasks[user_id] = task
+        task.add_done_callback(lambda done: self.tasks.pop(user_id, None) if self.tasks.get(user_id) is done
+                               else None)
+
+    async def _prefetch(self, movie_ids: Iterable[int], language: Optional[str]) -> None:
+        """
+        Fetches the details of movies in order, stopping once the bot gets busy.
+
+        Args:
+            movie_ids (Iterable[int]): The TMDB IDs of the movies.
+            language (Optional[str]): The language of the details.
+        """
+        for movie_id in movie_ids:
+            async with self.semaphore:
+                if self.overloaded:
+                    return
+
+                try:
+                    await self.tmdb_client.movie_info(movie_id, language=language)
+                except (TMDBUnavailableError, RateLimitExceeded):
+                    return
+                except Exception:
+                    logger.debug("Failed to prefetch movie tmdb_id=%s", movie_id, exc_info=True)
+
+    async def close(self) -> None:
+        """
+        Cancels the running prefetches, as a shutdown handler of the dispatcher.
+        """
+        tasks = list(self.tasks.values())
+        self.tasks.clear()
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
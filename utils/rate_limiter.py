@@ -0,0 +1,97 @@
+import asyncio
+
+from typing import Any
+
+from redis.asyncio import Redis
+
+
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'timestamp')
+local tokens = tonumber(bucket[1]) or capacity
+local timestamp = tonumber(bucket[2]) or now
+
+tokens = math.min(capacity, tokens + (now - timestamp) * rate / 1000)
+
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'timestamp', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+
+return wait
+"""
+"""
+Lua script atomically taking a token from the bucket. It returns 0 if a token was taken,
+otherwise the number of milliseconds until a token becomes available.
+"""
+
+
+BOT_SEND_RATE_KEY = "ratelimit:telegram:send"
+"""
+Redis key of the token bucket shared by the messages the bot sends on its own, outside of updates,
+so the reminders and the broadcasts stay together below the global limit of the Bot API.
+"""
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when a token could not be obtained within the allowed waiting time.
+    """
+
+
+class RedisTokenBucket:
+    """
+    This class is a token bucket rate limiter stored in Redis.
+
+    The state of the bucket lives in a single Redis hash and is updated by a Lua script using the Redis clock,
+    so every process sharing the key shares one request budget.
+    """
+
+    def __init__(self, redis: "Redis[Any]", key: str, rate: float, capacity: int, max_wait: float):
+        """
+        Initializes a new instance of the `RedisTokenBucket` class.
+
+        Args:
+            redis (Redis[Any]): The Redis connection.
+            key (str): The Redis key of the bucket.
+            rate (float): The number of tokens added to the bucket per second.
+            capacity (int): The maximum number of tokens in the bucket.
+            max_wait (float): The maximum number of seconds to wait for a token.
+        """
+        self.redis = redis
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self._script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(self) -> None:
+        """
+        Takes a token from the bucket, waiting for it if the bucket is empty.
+
+        Raises:
+            RateLimitExceeded: If no token became available within `max_wait` seconds.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while True:
+            wait = await self._script(keys=[self.key], args=[self.rate, self.capacity]) / 1000
+
+            if not wait:
+                return
+
+            if loop.time() + wait > deadline:
+                raise RateLimitExceeded(f"Rate limit of {self.key} exceeded")
+
+            await asyncio.sleep(wait)
@@ -1,4 +1,4 @@
-from typing import Any, Optional, Union, cast
+from typing import Any, Dict, Iterable, Optional, Union, cast
 
 from aiogram.types import User
 from aiogram_i18n.managers import BaseManager
@@ -6,17 +6,23 @@ from redis.asyncio import Redis
 from redis.asyncio.connection import ConnectionPool
 
 from enums import Language
+from utils.redis_snapshot import MISSING, snapshot_read, snapshot_write
 
 
 class RedisManager(BaseManager):
     """
     This class is a custom manager for handling internationalization (i18n) using Redis as a storage system.
     It is a subclass of `BaseManager` and overrides the `get_locale`, `get_locale_by_user_id`, and `set_locale` methods.
+
+    With a TTL, the locale of a user expires after the user has not used the bot for `ttl` seconds,
+    every read by the middleware refreshes it. A user whose locale expired gets the language of their
+    Telegram client again.
     """
     def __init__(
         self,
         redis: Union["Redis[Any]", ConnectionPool],
         default_locale: Optional[str] = None,
+        ttl: Optional[int] = None,
     ):
         """
         Initializes a new instance of the `RedisManager` class.
@@ -24,15 +30,30 @@ class RedisManager(BaseManager):
         Args:
             redis (Union["Redis[Any]", ConnectionPool]): The Redis connection or connection pool.
             default_locale (Optional[str]): The default locale. Defaults to None.
+            ttl (Optional[int]): The number of seconds the locale of an inactive user is kept. Defaults to forever.
         """
         super().__init__(default_locale=default_locale)
         if isinstance(redis, ConnectionPool):
             redis = Redis(connection_pool=redis)
         self.redis: "Redis[Any]" = redis
+        self.ttl = ttl
+
+    @staticmethod
+    def locale_key(user_id: int) -> str:
+        """
+        Returns the Redis key of the locale of a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            str: The key.
+        """
+        return f"i18n:{user_id}:locale"
 
     async def get_locale_by_user_id(self, user_id: int) -> Optional[str]:
         """
-        Retrieves the locale for the specified user ID from Redis.
+        Retrieves the locale for the specified user ID from the Redis snapshot of the update or from Redis.
 
         Args:
             user_id (int): The ID of the user.
@@ -40,14 +61,38 @@ class RedisManager(BaseManager):
         Returns:
             Optional[str]: The locale for the user, or None if no locale is set.
         """
-        redis_key = f"i18n:{user_id}:locale"
-        value = await self.redis.get(redis_key)
+        redis_key = self.locale_key(user_id)
+
+        value = await snapshot_read(self.redis, redis_key)
+        if value is MISSING:
+            value = await self.redis.getex(redis_key, ex=self.ttl) if self.ttl else await self.redis.get(redis_key)
 
         if isinstance(value, bytes):
             return value.decode("utf-8")
 
         return value
 
+    async def get_locales_by_user_ids(self, user_ids: Iterable[int]) -> Dict[int, str]:
+        """
+        Retrieves the locales of several users from Redis with a single `MGET`.
+
+        Args:
+            user_ids (Iterable[int]): The IDs of the users.
+
+        Returns:
+            Dict[int, str]: The locales by user ID, the default locale for the users who have not set one.
+        """
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+
+        values = await self.redis.mget([self.locale_key(user_id) for user_id in user_ids])
+
+        return {
+            user_id: (value.decode("utf-8") if isinstance(value, bytes) else value) or cast(str, self.default_locale)
+            for user_id, value in zip(user_ids, values)
+        }
+
     async def get_locale(self, event_from_user: User) -> str:
         """
         Retrieves the locale for the specified user from Redis.
@@ -76,7 +121,8 @@ class RedisManager(BaseManager):
             language (str): The locale to set.
             event_from_user (User): The user.
         """
-        redis_key = f"i18n:{event_from_user.id}:locale"
+        redis_key = self.locale_key(event_from_user.id)
 
-        await self.redis.set(redis_key, language)
+        await self.redis.set(redis_key, language, ex=self.ttl)
+        snapshot_write(redis_key, language)
 
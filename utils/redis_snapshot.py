@@ -0,0 +1,115 @@
+import asyncio
+
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+
+MISSING = object()
+"""
+Returned by `snapshot_read` for the keys the snapshot of the current update does not hold.
+"""
+
+
+class RedisSnapshot:
+    """
+    This class holds the values of the Redis keys an update is going to read, fetched together.
+
+    The keys are known before the update takes the lock of the user, but their values are read once it holds it,
+    by the first lookup of any of them, in a single pipelined round trip. The later lookups are served from
+    the snapshot and the writes of the update are applied to it, so it never serves a value older than the update.
+    """
+
+    def __init__(self, keys: Dict[str, Optional[int]]):
+        """
+        Initializes a new instance of the `RedisSnapshot` class.
+
+        Args:
+            keys (Dict[str, Optional[int]]): The keys to fetch, with the TTL refreshed by the read,
+                None to keep the TTL of the key.
+        """
+        self.keys = keys
+        self.values: Dict[str, Any] = {}
+        self._fetch: Optional[asyncio.Future] = None
+
+    async def get(self, redis: Any, key: str) -> Any:
+        """
+        Returns the value of a key of the snapshot, fetching the snapshot on the first lookup.
+
+        Args:
+            redis (Redis[Any]): The Redis connection.
+            key (str): The key.
+
+        Returns:
+            Any: The value of the key, None if the key does not exist.
+        """
+        if self._fetch is None:
+            self._fetch = asyncio.ensure_future(self._fetch_values(redis))
+        await self._fetch
+
+        return self.values.get(key)
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Applies a write of the update to the snapshot.
+
+        Args:
+            key (str): The key.
+            value (Any): The value written, None if the key was deleted.
+        """
+        if key in self.keys:
+            self.values[key] = value
+
+    async def _fetch_values(self, redis: Any) -> None:
+        """
+        Reads the values of the keys in a single round trip.
+
+        Args:
+            redis (Redis[Any]): The Redis connection.
+        """
+        async with redis.pipeline(transaction=False) as pipe:
+            for key, ttl in self.keys.items():
+                if ttl:
+                    pipe.getex(key, ex=ttl)
+                else:
+                    pipe.get(key)
+            values = await pipe.execute()
+
+        for key, value in zip(self.keys, values):
+            self.values.setdefault(key, value)
+
+
+current_snapshot: ContextVar[Optional[RedisSnapshot]] = ContextVar("current_snapshot", default=None)
+"""
+The snapshot of the update handled in the current context.
+"""
+
+
+async def snapshot_read(redis: Any, key: str) -> Any:
+    """
+    Reads a key from the snapshot of the current update.
+
+    Args:
+        redis (Redis[Any]): The Redis connection fetching the snapshot.
+        key (str): The key.
+
+    Returns:
+        Any: The value of the key, None if it does not exist, or `MISSING` if the snapshot does not hold the key.
+    """
+    snapshot = current_snapshot.get()
+    if snapshot is None or key not in snapshot.keys:
+        return MISSING
+
+    return await snapshot.get(redis, key)
+
+
+def snapshot_write(key: str, value: Any) -> None:
+    """
+    Applies a write to the snapshot of the current update.
+
+    Args:
+        key (str): The key.
+        value (Any): The value written, None if the key was deleted.
+    """
+    snapshot = current_snapshot.get()
+    if snapshot is not None:
+        snapshot.put(key, value)
@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from redis.asyncio import Redis
+
+
+class SingleFlight:
+    """
+    This class coalesces identical concurrent requests.
+
+    The first caller asking for a key starts the request, every caller asking for the same key while it is
+    in flight waits on the same shared task. When a Redis connection is given, the originating caller also takes
+    a short Redis lock, so callers in other processes wait for its result instead of repeating the request.
+    """
+
+    def __init__(self, redis: Optional["Redis[Any]"] = None, lock_timeout: float = 5.0, poll_interval: float = 0.05):
+        """
+        Initializes a new instance of the `SingleFlight` class.
+
+        Args:
+            redis (Optional[Redis[Any]]): The Redis connection used to coalesce across processes. Defaults to None.
+            lock_timeout (float): The number of seconds the Redis lock and the shared result live. Defaults to 5.0.
+            poll_interval (float): The number of seconds between two checks for a remote result. Defaults to 0.05.
+        """
+        self.redis = redis
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.originating = 0
+        self.coalesced = 0
+        self.remote_coalesced = 0
+        self._calls: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the counters of the coalescing layer.
+
+        Returns:
+            Dict[str, int]: The number of originating calls, of calls coalesced in this process
+            and of calls served by a request of another process.
+        """
+        return {
+            "originating": self.originating,
+            "coalesced": self.coalesced,
+            "remote_coalesced": self.remote_coalesced,
+        }
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Executes the request for the key, or waits for the identical request already in flight.
+
+        Every caller receives its own shallow copy of the response, so callers may add keys to it.
+
+        Args:
+            key (str): The key identifying the request.
+            func (Callable[[], Awaitable[Dict[str, Any]]]): The function performing the request.
+
+        Returns:
+            Dict[str, Any]: The response.
+        """
+        task = self._calls.get(key)
+
+        if task is None:
+            self.originating += 1
+            task = asyncio.ensure_future(self._execute(key, func))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+
+        return dict(await asyncio.shield(task))
+
+    def _forget(self, key: str, task: "asyncio.Task[Dict[str, Any]]") -> None:
+        """
+        Removes a finished request, so the next caller starts a new one.
+
+        Args:
+            key (str): The key identifying the request.
+            task (asyncio.Task[Dict[str, Any]]): The finished request.
+        """
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+        if not task.cancelled():
+            task.exception()
+
+    async def _execute(self, key: str, func: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Executes the request, coalescing it with other processes if Redis is configured.
+
+        Args:
+            key (str): The key identifying the request.
+            func (Callable[[], Awaitable[Dict[str, Any]]]): The function performing the request.
+
+        Returns:
+            Dict[str, Any]: The response.
+        """
+        if self.redis is None:
+            return await func()
+
+        lock_key, result_key = f"singleflight:{key}:lock", f"singleflight:{key}:result"
+        timeout_ms = int(self.lock_timeout * 1000)
+
+        locked = await self.redis.set(lock_key, 1, nx=True, px=timeout_ms)
+
+        if not locked:
+            result = await self._wait_for_remote(lock_key, result_key)
+            if result is not None:
+                self.remote_coalesced += 1
+                return result
+
+        try:
+            result = await func()
+            await self.redis.set(result_key, json.dumps(result), px=timeout_ms)
+            return result
+        finally:
+            if locked:
+                await self.redis.delete(lock_key)
+
+    async def _wait_for_remote(self, lock_key: str, result_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Waits until another process publishes the response or releases the lock.
+
+        Args:
+            lock_key (str): The Redis key of the lock.
+            result_key (str): The Redis key of the shared response.
+
+        Returns:
+            Optional[Dict[str, Any]]: The response, or None if the other process did not publish it in time.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_timeout
+
+        while loop.time() < deadline:
+            value = await self.redis.get(result_key)
+            if value is not None:
+                return json.loads(value)
+            if not await self.redis.exists(lock_key):
+                value = await self.redis.get(result_key)
+                return json.loads(value) if value is not None else None
+
+            await asyncio.sleep(self.poll_interval)
+
+        return None
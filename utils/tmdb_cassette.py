@@ -0,0 +1,228 @@
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+
+from typing import Any, Callable, Dict, Optional
+
+from requests import HTTPError, Response, Timeout
+
+from enums import CassetteMode
+
+
+LatencyDistribution = Callable[[random.Random], float]
+
+
+class CassetteMissError(LookupError):
+    """
+    Raised in replay mode when the cassette has no recording of a request.
+    """
+
+
+def parse_latency(spec: str) -> LatencyDistribution:
+    """
+    Parses a latency distribution, with all values in milliseconds:
+
+    - `fixed:<ms>`
+    - `uniform:<min ms>:<max ms>`
+    - `exponential:<mean ms>`
+    - `lognormal:<median ms>:<sigma>`, a long tailed distribution close to real network latencies.
+
+    Args:
+        spec (str): The distribution.
+
+    Returns:
+        LatencyDistribution: The function drawing a latency in seconds from a random generator.
+
+    Raises:
+        ValueError: If the distribution is unknown or malformed.
+    """
+    name, *values = spec.split(":")
+    try:
+        args = [float(value) for value in values]
+    except ValueError:
+        raise ValueError(f"Invalid latency distribution {spec!r}") from None
+
+    if name == "fixed" and len(args) == 1:
+        return lambda rng: args[0] / 1000
+    if name == "uniform" and len(args) == 2:
+        return lambda rng: rng.uniform(args[0], args[1]) / 1000
+    if name == "exponential" and len(args) == 1:
+        return lambda rng: rng.expovariate(1 / args[0]) / 1000 if args[0] else 0.0
+    if name == "lognormal" and len(args) == 2:
+        return lambda rng: rng.lognormvariate(math.log(args[0]), args[1]) / 1000
+
+    raise ValueError(f"Invalid latency distribution {spec!r}")
+
+
+class TMDBCassette:
+    """
+    This class records TMDB responses to a directory and replays them offline.
+
+    Every request is stored in its own JSON file named after the hash of its key, together with the key itself.
+    Client errors, such as an unknown movie id, are recorded as their status code. In replay mode the cassette
+    can delay responses according to a latency distribution and inject rate limiting responses and timeouts,
+    so the behaviour of the bot against a slow or failing TMDB can be measured.
+
+    The wrapped calls are blocking, like the `tmdbsimple` calls they replace, and run in the worker threads
+    of `TMDBClient`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        mode: CassetteMode,
+        latency: str = "fixed:0",
+        rate_limited_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout: float = 5.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initializes a new instance of the `TMDBCassette` class.
+
+        Args:
+            directory (str): The directory holding the recordings.
+            mode (CassetteMode): Whether responses are recorded or replayed.
+            latency (str): The latency distribution of replayed responses, see `parse_latency`. Defaults to "fixed:0".
+            rate_limited_rate (float): The share of replayed requests answered with a 429 status. Defaults to 0.0.
+            timeout_rate (float): The share of replayed requests timing out. Defaults to 0.0.
+            timeout (float): The number of seconds a timed out request takes. Defaults to 5.0.
+            seed (Optional[int]): The seed of the injected latencies and faults. Defaults to None.
+        """
+        self.directory = directory
+        self.mode = CassetteMode(mode)
+        self.latency = parse_latency(latency)
+        self.rate_limited_rate = rate_limited_rate
+        self.timeout_rate = timeout_rate
+        self.timeout = timeout
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        if self.mode == CassetteMode.RECORD:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        """
+        Returns the path of the recording of a request.
+
+        Args:
+            key (str): The key identifying the request.
+
+        Returns:
+            str: The path of the recording.
+        """
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def wrap(self, key: str, call: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+        """
+        Wraps a `tmdbsimple` call to record or replay its response.
+
+        Args:
+            key (str): The key identifying the request.
+            call (Callable[..., Dict[str, Any]]): The `tmdbsimple` method performing the request.
+
+        Returns:
+            Callable[..., Dict[str, Any]]: The wrapped call.
+        """
+        if self.mode == CassetteMode.RECORD:
+            return lambda **params: self._record(key, call, **params)
+
+        return lambda **params: self._replay(key)
+
+    def _record(self, key: str, call: Callable[..., Dict[str, Any]], **params: Any) -> Dict[str, Any]:
+        """
+        Performs the request and saves its response or its client error.
+
+        Args:
+            key (str): The key identifying the request.
+            call (Callable[..., Dict[str, Any]]): The `tmdbsimple` method performing the request.
+            **params (Any): The query parameters of the request.
+
+        Returns:
+            Dict[str, Any]: The decoded JSON response.
+        """
+        try:
+            response = call(**params)
+        except HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status is not None and 400 <= status < 500 and status != 429:
+                self._save(key, {"key": key, "status": status})
+            raise
+
+        self._save(key, {"key": key, "status": 200, "response": response})
+        return response
+
+    def _save(self, key: str, recording: Dict[str, Any]) -> None:
+        """
+        Writes a recording atomically, so concurrent readers never see a partial file.
+
+        Args:
+            key (str): The key identifying the request.
+            recording (Dict[str, Any]): The recording.
+        """
+        path = self.path(key)
+        temporary_path = f"{path}.{threading.get_ident()}.tmp"
+
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(recording, file, ensure_ascii=False)
+        os.replace(temporary_path, path)
+
+    def _replay(self, key: str) -> Dict[str, Any]:
+        """
+        Serves a recorded response after the injected latency, or fails with an injected fault.
+
+        Args:
+            key (str): The key identifying the request.
+
+        Returns:
+            Dict[str, Any]: The recorded response.
+
+        Raises:
+            CassetteMissError: If the request was not recorded.
+            HTTPError: If a rate limiting response is injected or the recorded request failed.
+            Timeout: If a timeout is injected.
+        """
+        with self._random_lock:
+            draw = self._random.random()
+            latency = self.latency(self._random)
+
+        if draw < self.timeout_rate:
+            time.sleep(self.timeout)
+            raise Timeout(f"Injected timeout of {key}")
+
+        time.sleep(latency)
+
+        if draw < self.timeout_rate + self.rate_limited_rate:
+            raise self._http_error(key, 429)
+
+        try:
+            with open(self.path(key), encoding="utf-8") as file:
+                recording = json.load(file)
+        except FileNotFoundError:
+            raise CassetteMissError(f"No recording of {key} in {self.directory}") from None
+
+        if recording["status"] != 200:
+            raise self._http_error(key, recording["status"])
+
+        return recording["response"]
+
+    @staticmethod
+    def _http_error(key: str, status: int) -> HTTPError:
+        """
+        Builds the error `tmdbsimple` raises for a response with an error status.
+
+        Args:
+            key (str): The key identifying the request.
+            status (int): The status of the response.
+
+        Returns:
+            HTTPError: The error.
+        """
+        response = Response()
+        response.status_code = status
+        response.url = key
+        return HTTPError(f"{status} Client Error for {key}", response=response)
@@ -0,0 +1,303 @@
+import asyncio
+
+from datetime import date
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import tmdbsimple as tmdb
+
+from redis.exceptions import RedisError
+from requests import HTTPError, RequestException
+
+from settings import settings
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.metrics import count_tmdb
+from utils.rate_limiter import RateLimitExceeded, RedisTokenBucket
+from utils.single_flight import SingleFlight
+from utils.tmdb_cassette import TMDBCassette
+from utils.tracing import span
+from utils.ttl_cache import TTLCache
+
+
+tmdb.API_KEY = settings.TMDB_API_KEY.get_secret_value()
+tmdb.REQUESTS_TIMEOUT = settings.TMDB_TIMEOUT
+
+T = TypeVar("T")
+
+CACHED_ENDPOINTS = frozenset({"movie/info", "search/movie", "discover/movie", "genre/movie/list"})
+"""
+The endpoints whose responses are cached, the change feed read by the metadata refresher is not.
+"""
+
+
+class TMDBUnavailableError(Exception):
+    """
+    Raised when TMDB cannot serve a request: it is rate limited, times out, fails or the circuit is open.
+    """
+
+
+class TMDBClient:
+    """
+    This class is an asynchronous facade over `tmdbsimple`.
+
+    `tmdbsimple` performs blocking HTTP requests, so every call is executed in a worker thread
+    to keep the event loop responsive. All requests go through the `_request` method, which coalesces identical
+    requests in flight, takes a token from the shared rate limiter and reports the outcome to the circuit breaker.
+    With a cache, the responses of `CACHED_ENDPOINTS` are kept for a short time, which also lets the prefetcher
+    fetch the details a user is likely to open next.
+    With a cassette, responses are recorded to or replayed from a local directory instead.
+    """
+
+    def __init__(
+        self,
+        rate_limiter: Optional[RedisTokenBucket] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        single_flight: Optional[SingleFlight] = None,
+        base_url: Optional[str] = None,
+        cassette: Optional[TMDBCassette] = None,
+        cache: Optional[TTLCache] = None,
+    ):
+        """
+        Initializes a new instance of the `TMDBClient` class.
+
+        Args:
+            rate_limiter (Optional[RedisTokenBucket]): The limiter shared by all processes. Defaults to None.
+            circuit_breaker (Optional[CircuitBreaker]): The circuit breaker of the client. Defaults to None.
+            single_flight (Optional[SingleFlight]): The coalescing layer of the client. Defaults to a local one.
+            base_url (Optional[str]): The base URL of the TMDB API. Defaults to the one of `tmdbsimple`.
+            cassette (Optional[TMDBCassette]): The cassette recording or replaying the responses. Defaults to None.
+            cache (Optional[TTLCache]): The cache of the responses. Defaults to None.
+        """
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.single_flight = single_flight or SingleFlight()
+        self.base_url = base_url
+        self.cassette = cassette
+        self.cache = cache
+
+    def _resource(self, resource_class: Callable[..., T], **kwargs: Any) -> T:
+        """
+        Creates a `tmdbsimple` resource pointing to the configured base URL.
+
+        Args:
+            resource_class (Callable[..., T]): The `tmdbsimple` resource class.
+            **kwargs (Any): The arguments of the resource.
+
+        Returns:
+            T: The resource.
+        """
+        resource = resource_class(**kwargs)
+        if self.base_url:
+            resource.base_uri = self.base_url
+        return resource
+
+    async def _request(self, endpoint: str, call: Callable[..., Dict[str, Any]],
+                       resource_id: Optional[int] = None, **params: Any) -> Dict[str, Any]:
+        """
+        Executes a TMDB request, sharing the response with identical requests already in flight.
+
+        Args:
+            endpoint (str): The name of the TMDB endpoint.
+            call (Callable[..., Dict[str, Any]]): The `tmdbsimple` method performing the request.
+            resource_id (Optional[int]): The id of the requested resource, if the endpoint has one. Defaults to None.
+            **params (Any): The query parameters of the request.
+
+        Returns:
+            Dict[str, Any]: The decoded JSON response.
+        """
+        key = self.request_key(endpoint, resource_id, **params)
+
+        cache = self.cache if endpoint in CACHED_ENDPOINTS else None
+        if cache:
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+        if self.cassette:
+            call = self.cassette.wrap(key, call)
+
+        with span("tmdb", endpoint=endpoint, resource_id=resource_id, params=params):
+            response = await self.single_flight.do(key, lambda: self._call(endpoint, call, **params))
+
+        if cache:
+            cache.set(key, response)
+
+        return response
+
+    @staticmethod
+    def request_key(endpoint: str, resource_id: Optional[int] = None, **params: Any) -> str:
+        """
+        Builds the key identifying a request, shared by the coalescing layer, the cache and the cassette.
+
+        Args:
+            endpoint (str): The name of the TMDB endpoint.
+            resource_id (Optional[int]): The id of the requested resource, if the endpoint has one. Defaults to None.
+            **params (Any): The query parameters of the request.
+
+        Returns:
+            str: The key.
+        """
+        query = "&".join(f"{name}={value}" for name, value in sorted(params.items()) if value is not None)
+        return f"{endpoint}:{resource_id or ''}?{query}"
+
+    def is_cached(self, movie_id: int, language: Optional[str] = None) -> bool:
+        """
+        Checks whether the details of a movie are cached.
+
+        Args:
+            movie_id (int): The TMDB ID of the movie.
+            language (Optional[str]): The language of the details. Defaults to None.
+
+        Returns:
+            bool: True if `movie_info` would be served from the cache.
+        """
+        return self.cache is not None and \
+            self.request_key("movie/info", movie_id, language=language) in self.cache
+
+    async def _call(self, endpoint: str, call: Callable[..., Dict[str, Any]], **params: Any) -> Dict[str, Any]:
+        """
+        Executes a TMDB request in a worker thread.
+
+        Rate limiting, timeouts, server errors and an open circuit are reported as `TMDBUnavailableError`.
+        Other client errors, such as an unknown movie id, are raised as is. Every outcome is reported
+        to the circuit breaker, except an exhausted or failing rate limiter and a cancellation,
+        which say nothing about the health of TMDB.
+
+        Args:
+            endpoint (str): The name of the TMDB endpoint, used for identification of the request.
+            call (Callable[..., Dict[str, Any]]): The `tmdbsimple` method performing the request.
+            **params (Any): The query parameters of the request.
+
+        Returns:
+            Dict[str, Any]: The decoded JSON response.
+
+        Raises:
+            TMDBUnavailableError: If TMDB cannot serve the request now.
+        """
+        breaker = self.circuit_breaker
+
+        try:
+            if breaker:
+                breaker.before_call()
+        except CircuitOpenError as e:
+            raise TMDBUnavailableError(f"TMDB circuit is open, {endpoint} rejected") from e
+
+        try:
+            if self.rate_limiter:
+                await self.rate_limiter.acquire()
+
+            # Counted here, by the update leading the coalesced requests, only when the request is sent.
+            count_tmdb()
+            response = await asyncio.to_thread(call, **params)
+        except RateLimitExceeded as e:
+            # The request never reached TMDB, so it says nothing about its health.
+            if breaker:
+                breaker.cancel_trial()
+            raise TMDBUnavailableError(f"TMDB {endpoint} rejected, the rate limit is exhausted") from e
+        except HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status == 429 or status is None or status >= 500:
+                self._record_failure()
+                raise TMDBUnavailableError(f"TMDB {endpoint} failed with status {status}") from e
+            if breaker:
+                breaker.record_success()
+            raise
+        except RequestException as e:
+            self._record_failure()
+            raise TMDBUnavailableError(f"TMDB {endpoint} failed: {e}") from e
+        except RedisError as e:
+            # The rate limiter failed, the request never reached TMDB.
+            if breaker:
+                breaker.cancel_trial()
+            raise TMDBUnavailableError(f"TMDB {endpoint} rejected, the rate limiter failed: {e}") from e
+        except asyncio.CancelledError:
+            if breaker:
+                breaker.cancel_trial()
+            raise
+        except BaseException:
+            # Any other outcome must end the trial call of a half-open circuit.
+            self._record_failure()
+            raise
+
+        if breaker:
+            breaker.record_success()
+
+        return response
+
+    def _record_failure(self) -> None:
+        """
+        Reports a failed request to the circuit breaker, if there is one.
+        """
+        if self.circuit_breaker:
+            self.circuit_breaker.record_failure()
+
+    async def movie_info(self, movie_id: int, language: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Fetches the details of a movie.
+
+        Args:
+            movie_id (int): The TMDB ID of the movie.
+            language (Optional[str]): The language of the details. Defaults to None.
+
+        Returns:
+            Dict[str, Any]: The details of the movie.
+        """
+        return await self._request("movie/info", self._resource(tmdb.Movies, id=movie_id).info,
+                                   resource_id=movie_id,
+                                   language=language)
+
+    async def search_movie(self, query: str, language: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Searches movies by title.
+
+        Args:
+            query (str): The searched title.
+            language (Optional[str]): The language of the results. Defaults to None.
+
+        Returns:
+            Dict[str, Any]: The first page of the found movies.
+        """
+        return await self._request("search/movie", self._resource(tmdb.Search).movie,
+                                   query=query,
+                                   language=language)
+
+    async def discover_movies(self, **params: Any) -> Dict[str, Any]:
+        """
+        Discovers movies matching the given filters.
+
+        Args:
+            **params (Any): The filters of the TMDB discover endpoint.
+
+        Returns:
+            Dict[str, Any]: The page of the discovered movies.
+        """
+        return await self._request("discover/movie", self._resource(tmdb.Discover).movie, **params)
+
+    async def movie_genres(self, language: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Fetches the list of movie genres.
+
+        Args:
+            language (Optional[str]): The language of the genre names. Defaults to None.
+
+        Returns:
+            Dict[str, Any]: The list of the genres.
+        """
+        return await self._request("genre/movie/list", self._resource(tmdb.Genres).movie_list,
+                                   language=language)
+
+    async def movie_changes(self, start_date: date, end_date: date, page: int = 1) -> Dict[str, Any]:
+        """
+        Fetches one page of the ids of movies changed on TMDB in the given period.
+
+        Args:
+            start_date (date): The start of the period.
+            end_date (date): The end of the period.
+            page (int): The page of the results. Defaults to 1.
+
+        Returns:
+            Dict[str, Any]: The page of the changed movies.
+        """
+        return await self._request("movie/changes", self._resource(tmdb.Changes).movie,
+                                   start_date=start_date.isoformat(),
+                                   end_date=end_date.isoformat(),
+                                   page=page)
@@ -0,0 +1,332 @@
+import atexit
+import functools
+import json
+import logging
+import random
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from itertools import count
+from logging.handlers import RotatingFileHandler
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from utils.logger import create_queue_handler
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class Span:
+    """
+    A timed operation inside a trace.
+
+    Attributes:
+        name: Name of the operation.
+        span_id: ID of the span, unique within the trace.
+        parent_id: ID of the enclosing span, or None for the root span.
+        start: Value of `time.perf_counter()` when the span started.
+        end: Value of `time.perf_counter()` when the span ended, or None while it is running.
+        attributes: Additional information about the operation.
+        error: Representation of the exception raised inside the span, if any.
+    """
+    name: str
+    span_id: int
+    parent_id: Optional[int]
+    start: float
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+class Trace:
+    """
+    This class collects the spans recorded while handling a single update.
+    """
+
+    def __init__(self, max_spans: int):
+        """
+        Initializes a new instance of the `Trace` class.
+
+        Args:
+            max_spans (int): The maximum number of spans recorded, further spans are dropped.
+        """
+        self.trace_id = uuid4().hex
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self._ids = count(1)
+
+    def start_span(self, name: str, parent_id: Optional[int], attributes: Dict[str, Any]) -> Optional[Span]:
+        """
+        Starts a new span in the trace.
+
+        Args:
+            name (str): The name of the operation.
+            parent_id (Optional[int]): The ID of the enclosing span.
+            attributes (Dict[str, Any]): Additional information about the operation.
+
+        Returns:
+            Optional[Span]: The started span, or None if the trace is full.
+        """
+        if len(self.spans) >= self.max_spans:
+            self.dropped_spans += 1
+            return None
+
+        span = Span(name=name, span_id=next(self._ids), parent_id=parent_id, start=time.perf_counter(),
+                    attributes=attributes)
+        self.spans.append(span)
+        return span
+
+    @property
+    def duration_ms(self) -> float:
+        """
+        Returns the duration of the root span in milliseconds.
+        """
+        root = self.spans[0] if self.spans else None
+        end = root.end if root and root.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Converts the trace to a dictionary, with span times relative to the start of the trace.
+
+        Returns:
+            Dict[str, Any]: Dictionary representation of the trace.
+        """
+        return {
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "dropped_spans": self.dropped_spans,
+            "spans": [
+                {
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "name": span.name,
+                    "offset_ms": round((span.start - self.start) * 1000, 3),
+                    "duration_ms": round(((span.end or span.start) - span.start) * 1000, 3),
+                    "attributes": span.attributes,
+                    "error": span.error,
+                }
+                for span in self.spans
+            ],
+        }
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+"""
+Trace of the update handled in the current context.
+"""
+
+current_span_id: ContextVar[Optional[int]] = ContextVar("current_span_id", default=None)
+"""
+ID of the innermost open span in the current context.
+"""
+
+
+def start_span(name: str, **attributes: Any) -> Optional[Span]:
+    """
+    Starts a span in the current trace without making it the parent of the following spans.
+
+    Args:
+        name (str): The name of the operation.
+        **attributes (Any): Additional information about the operation.
+
+    Returns:
+        Optional[Span]: The started span, or None if there is no trace in the current context.
+    """
+    trace = current_trace.get()
+    if trace is None:
+        return None
+
+    return trace.start_span(name, current_span_id.get(), attributes)
+
+
+def end_span(span: Optional[Span], error: Optional[BaseException] = None) -> None:
+    """
+    Ends a span started with `start_span`.
+
+    Args:
+        span (Optional[Span]): The span to end.
+        error (Optional[BaseException]): The exception raised inside the span. Defaults to None.
+    """
+    if span is None:
+        return
+
+    span.end = time.perf_counter()
+    if error is not None:
+        span.error = repr(error)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Records the enclosed block as a span, nesting the spans started inside it.
+
+    Args:
+        name (str): The name of the operation.
+        **attributes (Any): Additional information about the operation.
+
+    Yields:
+        Optional[Span]: The span, or None if there is no trace in the current context.
+    """
+    current = start_span(name, **attributes)
+    if current is None:
+        yield None
+        return
+
+    token = current_span_id.set(current.span_id)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        current_span_id.reset(token)
+        end_span(current)
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """
+    Decorates a coroutine function to record every call as a span.
+
+    Args:
+        name (Optional[str]): The name of the span. Defaults to the name of the function.
+
+    Returns:
+        Callable: The decorator.
+    """
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with span(span_name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class JsonLinesExporter:
+    """
+    This class writes kept traces as JSON lines to a rotating local file from a background thread.
+    """
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int):
+        """
+        Initializes a new instance of the `JsonLinesExporter` class.
+
+        Args:
+            path (str): The path of the file.
+            max_bytes (int): The size of the file triggering a rotation.
+            backup_count (int): The number of rotated files kept.
+        """
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                      encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        queue_handler, self.listener = create_queue_handler(handler)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+        self.logger = logging.getLogger("tracing.exporter")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(queue_handler)
+
+    def export(self, trace: Trace) -> None:
+        """
+        Writes the trace to the file.
+
+        Args:
+            trace (Trace): The trace to write.
+        """
+        self.logger.info(json.dumps(trace.to_dict(), ensure_ascii=False, default=str))
+
+
+class Tracer:
+    """
+    This class starts traces and decides which of them are exported.
+
+    A finished trace is kept with the probability `sample_rate`, and always if it took longer
+    than `slow_threshold_ms` or ended with an exception.
+    """
+
+    def __init__(self, exporter: JsonLinesExporter, sample_rate: float, slow_threshold_ms: float,
+                 max_spans: int = 1000):
+        """
+        Initializes a new instance of the `Tracer` class.
+
+        Args:
+            exporter (JsonLinesExporter): The exporter of the kept traces.
+            sample_rate (float): The share of traces kept regardless of their duration.
+            slow_threshold_ms (float): The duration in milliseconds above which a trace is always kept.
+            max_spans (int): The maximum number of spans of a trace. Defaults to 1000.
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_threshold_ms = slow_threshold_ms
+        self.max_spans = max_spans
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Trace]:
+        """
+        Records the enclosed block as a new trace with a root span.
+
+        Args:
+            name (str): The name of the root span.
+            **attributes (Any): Additional information about the traced operation.
+
+        Yields:
+            Trace: The trace.
+        """
+        trace = Trace(self.max_spans)
+        trace_token = current_trace.set(trace)
+        span_token = current_span_id.set(None)
+        failed = False
+
+        try:
+            with span(name, **attributes):
+                yield trace
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            current_span_id.reset(span_token)
+            current_trace.reset(trace_token)
+
+            if failed or trace.duration_ms >= self.slow_threshold_ms or random.random() < self.sample_rate:
+                self.exporter.export(trace)
+
+
+def trace_engine(engine: AsyncEngine) -> None:
+    """
+    Makes the engine record every executed SQL statement as a span of the current trace.
+
+    Args:
+        engine (AsyncEngine): The database engine.
+    """
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._tracing_span = start_span("sql", statement=statement)
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        end_span(getattr(context, "_tracing_span", None))
+
+    def handle_error(exception_context):
+        end_span(getattr(exception_context.execution_context, "_tracing_span", None),
+                 error=exception_context.original_exception)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", handle_error)
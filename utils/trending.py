@@ -0,0 +1,144 @@
+import time
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from utils.logger import setup_logger
+
+
+logger = setup_logger(__name__)
+
+BUCKET_SECONDS = 3600
+"""
+The length in seconds of the time buckets the events are counted in.
+"""
+
+WINDOWS: Dict[str, Tuple[int, float]] = {
+    "day": (24, 6 * 3600.0),
+    "week": (7 * 24, 2 * 24 * 3600.0),
+}
+"""
+The number of buckets merged by every trending window and the half-life in seconds of the events in it.
+"""
+
+RETENTION_BUCKETS = max(buckets for buckets, _ in WINDOWS.values())
+
+MERGE_TTL = 60
+"""
+The number of seconds a merged window is reused, so the events of the current bucket show up within a minute.
+"""
+
+ADD_WEIGHT = 1.0
+WATCHED_WEIGHT = 0.5
+
+
+class TrendingTracker:
+    """
+    This class keeps the movies trending among the users of the bot in Redis sorted sets.
+
+    Every event of a movie, a save to a list, a removal or a watched toggle, increments the score of the movie
+    in the sorted set of the hour it happened in, which expires once no window covers it. A window is read by
+    merging its hourly sets with `ZUNIONSTORE`, weighted by an exponential decay of their age, into a set
+    reused for `MERGE_TTL` seconds. Reading the top of a merged set takes O(log n + k) and the lists of the users
+    are never scanned.
+
+    The sets are updated after the database transaction is committed and Redis errors are only logged,
+    so the trending view may lag behind the lists but never blocks them.
+    """
+
+    def __init__(self, redis: "Redis[Any]", prefix: str = "trending"):
+        """
+        Initializes a new instance of the `TrendingTracker` class.
+
+        Args:
+            redis (Redis[Any]): The Redis connection holding the sorted sets.
+            prefix (str): The prefix of the keys. Defaults to "trending".
+        """
+        self.redis = redis
+        self.prefix = prefix
+
+    @staticmethod
+    def bucket(at: Optional[datetime] = None) -> int:
+        """
+        Returns the bucket of a time.
+
+        Args:
+            at (Optional[datetime]): The time, naive times are taken as UTC. Defaults to now.
+
+        Returns:
+            int: The number of the bucket.
+        """
+        if at is None:
+            return int(time.time() // BUCKET_SECONDS)
+
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+
+        return int(at.timestamp() // BUCKET_SECONDS)
+
+    async def record(self, movie_id: int, weight: float, at: Optional[datetime] = None) -> None:
+        """
+        Adds a weight to the score of a movie in the bucket of a time.
+
+        Events in buckets no window covers anymore are ignored, so removing a movie saved long ago
+        does not lower its score.
+
+        Args:
+            movie_id (int): The TMDB ID of the movie.
+            weight (float): The weight added, negative to cancel an earlier event.
+            at (Optional[datetime]): The time of the event being recorded or cancelled. Defaults to now.
+        """
+        bucket = self.bucket(at)
+        age = self.bucket() - bucket
+        if age >= RETENTION_BUCKETS:
+            return
+
+        key = f"{self.prefix}:bucket:{bucket}"
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zincrby(key, weight, str(movie_id))
+                pipe.expire(key, (RETENTION_BUCKETS - age + 1) * BUCKET_SECONDS)
+                await pipe.execute()
+        except RedisError:
+            logger.warning("Failed to record a trending event of movie tmdb_id=%s", movie_id, exc_info=True)
+
+    async def top(self, window: str, limit: int) -> List[Tuple[int, float]]:
+        """
+        Returns the movies with the highest decayed scores in a window.
+
+        Args:
+            window (str): The name of the window, a key of `WINDOWS`.
+            limit (int): The largest number of movies returned.
+
+        Returns:
+            List[Tuple[int, float]]: The TMDB IDs and the scores of the movies, from the highest score.
+        """
+        current = self.bucket()
+        merged_key = f"{self.prefix}:{window}:{current}"
+
+        if not await self.redis.exists(merged_key):
+            await self._merge(window, current, merged_key)
+
+        movies = await self.redis.zrevrangebyscore(merged_key, "+inf", "(0", start=0, num=limit, withscores=True)
+        return [(int(movie_id), score) for movie_id, score in movies]
+
+    async def _merge(self, window: str, current: int, merged_key: str) -> None:
+        """
+        Merges the buckets of a window into a sorted set, weighting every bucket by the decay of its age.
+
+        Args:
+            window (str): The name of the window.
+            current (int): The current bucket.
+            merged_key (str): The key of the merged sorted set.
+        """
+        buckets, half_life = WINDOWS[window]
+        weights = {f"{self.prefix}:bucket:{current - age}": 0.5 ** (age * BUCKET_SECONDS / half_life)
+                   for age in range(buckets)}
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zunionstore(merged_key, weights, aggregate="SUM")
+            pipe.expire(merged_key, MERGE_TTL)
+            await pipe.execute()
@@ -0,0 +1,75 @@
+import time
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class TTLCache:
+    """
+    This class is an in-process cache of TMDB responses, evicting the least recently used entries
+    above `max_size` entries and the entries older than `ttl` seconds.
+
+    Every reader gets its own shallow copy of a response, so readers may add keys to it.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        """
+        Initializes a new instance of the `TTLCache` class.
+
+        Args:
+            max_size (int): The largest number of entries kept.
+            ttl (float): The number of seconds an entry is kept.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a copy of a cached response.
+
+        Args:
+            key (str): The key of the response.
+
+        Returns:
+            Optional[Dict[str, Any]]: The response, or None if it is not cached or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(entry[1])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Caches a response.
+
+        Args:
+            key (str): The key of the response.
+            value (Dict[str, Any]): The response.
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, dict(value))
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        """
+        Checks whether a response is cached, without counting a hit or a miss.
+
+        Args:
+            key (str): The key of the response.
+
+        Returns:
+            bool: True if the response is cached and not expired.
+        """
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] >= time.monotonic()